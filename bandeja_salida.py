@@ -0,0 +1,292 @@
+"""
+Bandeja de salida
+=================
+
+Pedidos de compartir que no llegaron a n8n (webhook caído, sin red, proxy sin
+destino) quedan guardados en un archivo SQLite en lugar de perderse. El
+operador sigue trabajando y un hilo en segundo plano los reenvía cuando n8n
+vuelve a responder:
+
+- Solo se encolan las consultas con `RespuestaN8n.error == ERROR_SIN_CONEXION`,
+  las que seguro no llegaron al workflow; reenviarlas no duplica nada.
+- Un mismo pedido (intención, texto y parámetros) no se encola dos veces
+  mientras siga pendiente.
+- Cada pasada prueba primero con el pedido más antiguo; si n8n sigue sin
+  responder, todos esperan `BANDEJA_ESPERA_INICIAL` segundos, el doble en el
+  siguiente intento y así hasta `BANDEJA_ESPERA_MAXIMA`. Si responde, se
+  envían hasta `BANDEJA_LOTE` pedidos de una vez, con prioridad de lote.
+- Lo pendiente sobrevive a un reinicio de la aplicación.
+
+Al terminar cada pedido (entregado o rechazado por n8n) se deja un aviso que
+la interfaz muestra entre una acción y la siguiente (`tomar_avisos`). Quien
+necesite registrar algo cuando un pedido se entrega (por ejemplo, el registro
+de archivos ya compartidos) lo indica con `al_entregar`.
+
+Funciones públicas:
+    - encolar: Guarda un pedido que no llegó a n8n
+    - al_entregar: Función a llamar cuando n8n acepta un pedido de una intención
+    - iniciar_bandeja / detener_bandeja: Hilo que vacía la bandeja
+    - vaciar_bandeja: Una pasada de envío (la usa el hilo)
+    - tomar_avisos: Resultados de los pedidos terminados desde la última vez
+    - pedidos_pendientes: Cantidad de pedidos en espera
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from config import BANDEJA_PATH, BANDEJA_ESPERA_INICIAL, BANDEJA_ESPERA_MAXIMA, BANDEJA_LOTE
+from data_models import SolicitudN8n, RespuestaN8n
+from n8n_client import enviar_consulta, enviar_archivo, ERROR_SIN_CONEXION
+from utils.planificador import PRIORIDAD_LOTE
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_ENTREGADO = "entregado"
+ESTADO_RECHAZADO = "rechazado"
+
+# Pedidos que se envían a la vez cuando n8n vuelve (el planificador limita el resto)
+_PARALELOS = 4
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pedidos (
+	id INTEGER PRIMARY KEY AUTOINCREMENT,
+	clave TEXT NOT NULL,
+	descripcion TEXT NOT NULL,
+	solicitud TEXT NOT NULL,
+	ruta_archivo TEXT,
+	estado TEXT NOT NULL,
+	intentos INTEGER NOT NULL DEFAULT 0,
+	proximo_intento REAL NOT NULL,
+	ultimo_error TEXT,
+	creado_en REAL NOT NULL,
+	resuelto_en REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pedidos_pendientes ON pedidos (clave) WHERE estado = 'pendiente';
+"""
+
+_lock = threading.Lock()
+_avisos: list[dict] = []
+_despertar = threading.Event()
+_detenido = threading.Event()
+_hilo: threading.Thread | None = None
+_fallos_seguidos = 0
+# Por intención: se llama con (solicitud, respuesta) cuando n8n acepta un pedido reenviado
+_al_entregar: dict[str, Callable[[SolicitudN8n, RespuestaN8n], None]] = {}
+
+
+def _conectar(path: str = BANDEJA_PATH) -> sqlite3.Connection:
+	"""Abre la bandeja y crea el esquema si no existe."""
+	directorio = os.path.dirname(path)
+	if directorio:
+		os.makedirs(directorio, exist_ok=True)
+	conn = sqlite3.connect(path)
+	conn.executescript(_ESQUEMA)
+	return conn
+
+
+def _clave(solicitud: SolicitudN8n, ruta_archivo: str | None) -> str:
+	"""Identifica pedidos equivalentes: misma intención, texto, parámetros y archivo."""
+	base = {
+		"intent": solicitud.intencion,
+		"chatInput": solicitud.entrada_chat,
+		"params": solicitud.parametros,
+		"archivo": ruta_archivo,
+	}
+	return hashlib.sha256(json.dumps(base, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def encolar(solicitud: SolicitudN8n, descripcion: str, ruta_archivo: str | None = None) -> bool:
+	"""
+	Guarda un pedido que no llegó a n8n para reenviarlo más tarde.
+
+	Args:
+		solicitud (SolicitudN8n): Pedido tal como se intentó enviar.
+		descripcion (str): Texto para el aviso al operador (ej: "el reporte de envíos fallidos").
+		ruta_archivo (str, opcional): Archivo a subir con `enviar_archivo`.
+
+	Returns:
+		bool: True si se encoló; False si el mismo pedido ya estaba pendiente.
+	"""
+	datos = {
+		"entrada_chat": solicitud.entrada_chat,
+		"id_sesion": solicitud.id_sesion,
+		"intencion": solicitud.intencion,
+		"parametros": solicitud.parametros,
+	}
+	ahora = time.time()
+	conn = _conectar()
+	with conn:
+		cursor = conn.execute(
+			"INSERT OR IGNORE INTO pedidos (clave, descripcion, solicitud, ruta_archivo, estado, proximo_intento, creado_en) "
+			"VALUES (?, ?, ?, ?, ?, ?, ?)",
+			(
+				_clave(solicitud, ruta_archivo), descripcion, json.dumps(datos, ensure_ascii=False, default=str),
+				ruta_archivo, ESTADO_PENDIENTE, ahora + BANDEJA_ESPERA_INICIAL, ahora,
+			),
+		)
+		nuevo = cursor.rowcount == 1
+	conn.close()
+	if nuevo:
+		_despertar.set()
+	return nuevo
+
+
+def al_entregar(intencion: str, funcion: Callable[[SolicitudN8n, RespuestaN8n], None]) -> None:
+	"""
+	Registra `funcion(solicitud, respuesta)` para los pedidos de `intencion` que n8n acepta.
+
+	Se llama desde el hilo de la bandeja, antes de dejar el aviso.
+	"""
+	_al_entregar[intencion] = funcion
+
+
+def pedidos_pendientes() -> int:
+	"""Cantidad de pedidos que esperan ser enviados."""
+	conn = _conectar()
+	try:
+		return conn.execute("SELECT COUNT(*) FROM pedidos WHERE estado = ?", (ESTADO_PENDIENTE,)).fetchone()[0]
+	finally:
+		conn.close()
+
+
+def tomar_avisos() -> list[dict]:
+	"""
+	Devuelve y descarta los avisos de pedidos terminados.
+
+	Returns:
+		list[dict]: Un aviso por pedido con "descripcion", "ok", "mensaje" y
+		"datos" (los de la respuesta de n8n, con la URL si la hay).
+	"""
+	with _lock:
+		avisos = list(_avisos)
+		_avisos.clear()
+	return avisos
+
+
+def _enviar(fila: tuple) -> RespuestaN8n:
+	"""Reenvía un pedido guardado con prioridad de lote."""
+	_, _, datos, ruta_archivo = fila
+	solicitud = SolicitudN8n(**json.loads(datos), prioridad=PRIORIDAD_LOTE)
+	if ruta_archivo:
+		return enviar_archivo(solicitud, ruta_archivo)
+	return enviar_consulta(solicitud)
+
+
+def _espera() -> float:
+	"""Espera hasta el próximo reintento: exponencial con un poco de azar para no sincronizar terminales."""
+	base = min(BANDEJA_ESPERA_MAXIMA, BANDEJA_ESPERA_INICIAL * 2 ** max(0, _fallos_seguidos - 1))
+	return base * random.uniform(0.8, 1.0)
+
+
+def _resolver(conn: sqlite3.Connection, fila: tuple, res: RespuestaN8n) -> bool:
+	"""
+	Registra el resultado de un envío.
+
+	Returns:
+		bool: False si n8n seguía sin responder (el pedido queda pendiente).
+	"""
+	id_pedido, descripcion, datos, _ = fila
+	ahora = time.time()
+	if not res.ok and res.error == ERROR_SIN_CONEXION:
+		conn.execute(
+			"UPDATE pedidos SET intentos = intentos + 1, ultimo_error = ? WHERE id = ?",
+			(res.mensaje, id_pedido),
+		)
+		return False
+
+	# Un rechazo de n8n no se reintenta: volvería a fallar igual
+	estado = ESTADO_ENTREGADO if res.ok else ESTADO_RECHAZADO
+	conn.execute(
+		"UPDATE pedidos SET estado = ?, intentos = intentos + 1, ultimo_error = ?, resuelto_en = ? WHERE id = ?",
+		(estado, None if res.ok else res.mensaje, ahora, id_pedido),
+	)
+	solicitud = SolicitudN8n(**json.loads(datos))
+	if res.ok and solicitud.intencion in _al_entregar:
+		_al_entregar[solicitud.intencion](solicitud, res)
+	with _lock:
+		_avisos.append({"descripcion": descripcion, "ok": res.ok, "mensaje": res.mensaje, "datos": res.datos})
+	return True
+
+
+def vaciar_bandeja() -> float | None:
+	"""
+	Envía los pedidos cuyo reintento ya venció.
+
+	Returns:
+		float | None: Segundos hasta el próximo pedido a reintentar, o None si
+		la bandeja quedó vacía.
+	"""
+	global _fallos_seguidos
+	conn = _conectar()
+	try:
+		filas = conn.execute(
+			"SELECT id, descripcion, solicitud, ruta_archivo FROM pedidos "
+			"WHERE estado = ? AND proximo_intento <= ? ORDER BY id LIMIT ?",
+			(ESTADO_PENDIENTE, time.time(), max(1, BANDEJA_LOTE)),
+		).fetchall()
+
+		if filas:
+			# El más antiguo sirve de prueba: si n8n sigue caído no se insiste con el resto
+			with conn:
+				disponible = _resolver(conn, filas[0], _enviar(filas[0]))
+			resto = filas[1:] if disponible else []
+			if resto:
+				with ThreadPoolExecutor(max_workers=_PARALELOS) as pool:
+					respuestas = list(pool.map(_enviar, resto))
+				with conn:
+					disponible = all([_resolver(conn, fila, res) for fila, res in zip(resto, respuestas)])
+
+			_fallos_seguidos = 0 if disponible else _fallos_seguidos + 1
+			if not disponible:
+				with conn:
+					conn.execute(
+						"UPDATE pedidos SET proximo_intento = ? WHERE estado = ? AND proximo_intento <= ?",
+						(time.time() + _espera(), ESTADO_PENDIENTE, time.time()),
+					)
+
+		proximo = conn.execute(
+			"SELECT MIN(proximo_intento) FROM pedidos WHERE estado = ?", (ESTADO_PENDIENTE,)
+		).fetchone()[0]
+	finally:
+		conn.close()
+	return None if proximo is None else max(0.0, proximo - time.time())
+
+
+def _vaciar_periodicamente() -> None:
+	espera = 0.0
+	while not _detenido.is_set():
+		_despertar.wait(espera)
+		_despertar.clear()
+		if _detenido.is_set():
+			break
+		try:
+			espera = vaciar_bandeja()
+		except sqlite3.Error:
+			# Archivo bloqueado o dañado: se vuelve a intentar más tarde
+			espera = BANDEJA_ESPERA_MAXIMA
+
+
+def iniciar_bandeja() -> None:
+	"""Arranca (una sola vez) el hilo que vacía la bandeja, incluidos los pedidos de ejecuciones anteriores."""
+	global _hilo
+	if _hilo is not None:
+		return
+	_detenido.clear()
+	_hilo = threading.Thread(target=_vaciar_periodicamente, name="bandeja-salida", daemon=True)
+	_hilo.start()
+
+
+def detener_bandeja() -> None:
+	"""Detiene el hilo; lo pendiente queda guardado para la próxima ejecución."""
+	global _hilo
+	hilo, _hilo = _hilo, None
+	if hilo is None:
+		return
+	_detenido.set()
+	_despertar.set()
+	hilo.join(timeout=5)
@@ -0,0 +1,114 @@
+"""
+Catálogo de localidades y repartidores
+======================================
+
+Listas de nombres tal como figuran en la base, traídas de n8n con la intención
+`catalogo_nombres` y guardadas en `CATALOGO_PATH` durante `CATALOGO_TTL`
+segundos. Con ellas se arman índices de prefijos y trigramas
+(`utils.indice_nombres`) que los formularios usan para autocompletar y para
+proponer "¿quisiste decir?" antes de enviar un reporte filtrado.
+
+Si todos los nombres de un filtro salen del catálogo, el reporte se pide con
+`exacto=True` y el workflow los compara por igualdad: no hay viajes a n8n que
+terminan en "sin datos" por un error de tipeo ni búsquedas `ILIKE '%...%'`
+que recorren toda la vista.
+
+Si n8n no responde se usa el último catálogo guardado, aunque esté vencido;
+sin ninguno, los formularios aceptan los nombres tal cual (como antes).
+
+Funciones públicas:
+    - obtener_catalogo: Índices por filtro ("localidad", "repartidor"), con caché
+"""
+import json
+import os
+import time
+
+from config import CATALOGO_PATH, CATALOGO_TTL
+from data_models import SolicitudN8n
+from n8n_client import enviar_consulta
+from utils.indice_nombres import IndiceNombres
+
+INTENCION_CATALOGO = "catalogo_nombres"
+
+# Filtro de los reportes → lista que lo alimenta en la respuesta del workflow
+_LISTAS = {"localidad": "localidades", "repartidor": "repartidores"}
+
+_catalogo: dict[str, IndiceNombres] | None = None
+_generado_en = 0.0
+
+
+def _leer_guardado() -> dict | None:
+	try:
+		with open(CATALOGO_PATH, encoding="utf-8") as archivo:
+			guardado = json.load(archivo)
+	except (OSError, ValueError):
+		return None
+	return guardado if isinstance(guardado, dict) else None
+
+
+def _guardar(datos: dict) -> None:
+	directorio = os.path.dirname(CATALOGO_PATH)
+	try:
+		if directorio:
+			os.makedirs(directorio, exist_ok=True)
+		with open(CATALOGO_PATH, "w", encoding="utf-8") as archivo:
+			json.dump(datos, archivo, ensure_ascii=False)
+	except OSError:
+		# Sin disco el catálogo sirve igual hasta cerrar la aplicación
+		pass
+
+
+def _pedir(session_id: str) -> dict | None:
+	"""Trae las listas desde n8n; None si no respondió o la ruta no existe."""
+	req = SolicitudN8n(
+		entrada_chat = "Catálogo de localidades y repartidores",
+		id_sesion = session_id,
+		intencion = INTENCION_CATALOGO,
+	)
+	res = enviar_consulta(req)
+	if not res.ok or not isinstance(res.datos, dict):
+		return None
+	if not all(isinstance(res.datos.get(lista), list) for lista in _LISTAS.values()):
+		return None
+	datos = {lista: [str(n) for n in res.datos[lista] if n] for lista in _LISTAS.values()}
+	datos["generado_en"] = time.time()
+	return datos
+
+
+def _vigente(generado_en: float) -> bool:
+	return time.time() - generado_en < CATALOGO_TTL
+
+
+def _armar(datos: dict) -> dict[str, IndiceNombres]:
+	return {filtro: IndiceNombres(datos.get(lista) or []) for filtro, lista in _LISTAS.items()}
+
+
+def obtener_catalogo(session_id: str, forzar: bool = False) -> dict[str, IndiceNombres] | None:
+	"""
+	Índices de nombres por filtro, pidiéndolos a n8n solo cuando vencieron.
+
+	Args:
+		session_id (str): ID de sesión del operador.
+		forzar (bool): Pide el catálogo aunque el guardado siga vigente.
+
+	Returns:
+		dict[str, IndiceNombres] | None: {"localidad": ..., "repartidor": ...},
+		o None si nunca se pudo obtener un catálogo.
+	"""
+	global _catalogo, _generado_en
+	if not forzar and _catalogo is not None and _vigente(_generado_en):
+		return _catalogo
+
+	guardado = _leer_guardado()
+	generado = float(guardado.get("generado_en") or 0) if guardado else 0.0
+	if forzar or guardado is None or not _vigente(generado):
+		nuevo = _pedir(session_id)
+		if nuevo is not None:
+			_guardar(nuevo)
+			guardado, generado = nuevo, nuevo["generado_en"]
+
+	if guardado is None:
+		return _catalogo
+	if _catalogo is None or generado != _generado_en:
+		_catalogo, _generado_en = _armar(guardado), generado
+	return _catalogo
@@ -12,18 +12,205 @@ variable de entorno 'N8N_WEBHOOK_URL'. Si no se define, se usa una URL
 local por defecto.
 
 ```
+N8N_STREAM_URL (str): Webhook de n8n en modo streaming usado por el chat
+    para mostrar la respuesta de Piki a medida que se genera. Vacío
+    (por defecto) desactiva el streaming.
+
 API_KEY (str): Clave opcional para autenticación en n8n. Proviene de la
     variable de entorno 'API_KEY'.
 
 TIMEOUT (float): Tiempo máximo permitido para esperar una respuesta HTTP.
     Se obtiene desde la variable de entorno 'TIMEOUT'; si no existe, se
-    usa 500.0 segundos como valor de seguridad.
+    usa 500.0 segundos como valor de seguridad. Con plazos adaptativos
+    (`utils.plazos`), se usa para las intenciones que todavía no tienen
+    suficientes muestras.
+
+TIMEOUT_CONEXION (float): Segundos para establecer la conexión con n8n.
+
+TIMEOUT_MINIMO / TIMEOUT_MAXIMO (float): Cotas del plazo de lectura
+    aprendido por intención. Los reportes usan `TIMEOUT` como cota inferior.
+
+TIMEOUT_FACTOR (float): El plazo aprendido es este factor por el percentil
+    95 de la duración observada de la intención.
+
+TIMEOUT_MUESTRAS_MINIMAS (int): Consultas exitosas de una intención
+    necesarias antes de usar su plazo aprendido.
+
+TIMEOUTS_POR_INTENCION (str): Plazos fijados a mano, "intencion=segundos"
+    separados por coma ("agente" = mensajes sin intención). Tienen prioridad
+    sobre los aprendidos.
+
+PLAZOS_PATH (str): Archivo JSON con las duraciones recientes por intención.
 
 REPORTS_DIR (str): Directorio donde se guardarán reportes generados.
     Configurable mediante 'REPORTS_DIR'. El valor por defecto es './reports'.
 
 SESSION_PREFIX (str): Prefijo estándar usado para la generación de IDs de
     sesión en las conversaciones. Configurable por variable de entorno.
+
+REPLICA_HABILITADA (bool): Activa la réplica local (SQLite) de envíos para
+    responder consultas de estado sin depender del enlace con n8n.
+    Variable de entorno 'REPLICA_HABILITADA' ("1", "true", "si").
+
+REPLICA_PATH (str): Archivo SQLite de la réplica. Por defecto
+    './reports/replica_envios.sqlite3'.
+
+REPLICA_LOTE (int): Cantidad máxima de filas por lote de sincronización.
+
+REPLICA_MAX_ANTIGUEDAD (float): Segundos a partir de los cuales la réplica
+    se considera desactualizada y se advierte al operador.
+
+COMPARTIDOS_PATH (str): Registro JSON de archivos ya compartidos (por hash
+    de contenido) para no subir dos veces el mismo reporte.
+
+BANDEJA_PATH (str): Archivo SQLite de la bandeja de salida, donde quedan los
+    pedidos de compartir que no llegaron a n8n hasta que se puedan enviar.
+    Por defecto './reports/bandeja_salida.sqlite3'.
+
+BANDEJA_ESPERA_INICIAL (float): Segundos hasta el primer reintento de la
+    bandeja cuando n8n no responde; se duplica en cada intento fallido.
+
+BANDEJA_ESPERA_MAXIMA (float): Tope en segundos de la espera entre reintentos.
+
+BANDEJA_LOTE (int): Pedidos de la bandeja que se envían por pasada cuando n8n
+    vuelve a estar disponible.
+
+CONSULTAS_GUARDADAS_PATH (str): Biblioteca JSON de consultas guardadas
+    (pregunta + SQL del agente) que se repiten sin pasar por el LLM.
+
+ROUTER_LOCAL_HABILITADO (bool): Resuelve en el cliente los mensajes del chat
+    que tienen una ruta estructurada (estado de un código, reportes de
+    fallidos, repartidor o localidad) sin pasar por el agente. Por defecto
+    activado; '0' envía todo a Piki.
+
+CONTEXTO_MAX_BYTES (int): Tamaño máximo (en bytes de JSON) del resumen de
+    resultados recientes que el chat envía como `params.context`.
+
+CONTEXTO_MAX_RESULTADOS (int): Cantidad de resultados recientes que se
+    resumen por sesión.
+
+GATEWAY_URL (str): URL del gateway local multi-operador (ej.
+    'http://192.168.0.10:8765'). Si se define, las consultas se envían al
+    gateway en lugar de directamente a n8n.
+
+GATEWAY_HOST / GATEWAY_PUERTO: Dirección en la que escucha `gateway.py`.
+
+GATEWAY_SESION_TTL (float): Segundos de inactividad tras los cuales el
+    gateway da por vencida una sesión.
+
+GATEWAY_CACHE_TTL (float): Segundos que el gateway reutiliza una respuesta
+    de las intenciones cacheables.
+
+VISOR_UMBRAL (int): A partir de esta cantidad de registros, el chat y las
+    consultas personalizadas muestran los resultados en el visor paginado
+    en lugar de imprimirlos uno por uno.
+
+VISOR_FILAS_POR_PAGINA (int): Filas por página del visor (0 = según el alto
+    de la terminal).
+
+VISOR_ANCHO_COLUMNA (int): Ancho máximo de cada columna del visor.
+
+TABLERO_INTERVALO (int): Segundos entre consultas del tablero en vivo de
+    envíos fallidos.
+
+TABLERO_LIMITE (int): Localidades y repartidores que muestra el tablero (los
+    de mayor cantidad; el resto se suma en "Otros").
+
+PAQUETE_MATUTINO_LOCALIDADES (str): Localidades que el "paquete de la mañana"
+    propone revisar, separadas por coma (ej. "Quilmes,Bernal,Avellaneda").
+
+PAQUETE_MATUTINO_CODIGOS (str): Códigos de envío cuyo estado propone revisar
+    el paquete de la mañana, separados por coma.
+
+CATALOGO_PATH (str): Archivo JSON donde se guardan las listas de localidades
+    y repartidores traídas de n8n (intención `catalogo_nombres`).
+
+CATALOGO_TTL (float): Segundos que se reutiliza el catálogo antes de volver
+    a pedirlo. Si n8n no responde se sigue usando el último guardado.
+
+NOTIFICACIONES_PUERTO (int): Puerto del receptor local al que n8n envía los
+    envíos que cambian (intención `suscribir_eventos`). 0 (por defecto)
+    desactiva las notificaciones.
+
+NOTIFICACIONES_HOST (str): Dirección donde escucha el receptor. Para que n8n
+    lo alcance desde otra máquina debe ser una interfaz accesible (por ejemplo
+    "0.0.0.0").
+
+NOTIFICACIONES_URL (str): URL que se registra en n8n cuando no coincide con
+    la del receptor (túnel, proxy o NAT). Vacía = http://host:puerto/eventos.
+
+NOTIFICACIONES_TTL (int): Segundos de vigencia de la suscripción; el cliente
+    la renueva a mitad de ese tiempo mientras está abierto.
+
+TABLERO_INTERVALO_CON_EVENTOS (int): Segundos entre consultas del tablero
+    cuando las notificaciones están activas (el tablero se actualiza al
+    recibir cada aviso; la consulta periódica queda como respaldo).
+
+PLANIFICADOR_CONCURRENCIA (int): Consultas a n8n en vuelo a la vez desde
+    esta terminal.
+
+PLANIFICADOR_RESERVA_INTERACTIVA (int): Lugares de la concurrencia que
+    quedan reservados a las consultas interactivas (lotes, compartir y tareas
+    de fondo no pueden ocuparlos).
+
+PLANIFICADOR_MAX_EN_ESPERA (int): Consultas que cada clase no interactiva
+    puede tener esperando turno; al superarlo, quien las genera se bloquea.
+
+PLANIFICADOR_LIMITES (str): Cubos de tokens por clase (interactiva,
+    compartir, lote, fondo) o por intención, como "clave=tasa:capacidad"
+    separados por coma (tasa en consultas por segundo). "agente" limita los
+    mensajes que llegan al LLM; su valor por defecto respeta la cuota de 15
+    pedidos por minuto de Gemini.
+
+COSTOS_PATH (str): Archivo JSON con los tokens y tiempos del agente de cada
+    día, por intención (ver `utils.costos`).
+
+PRESUPUESTO_TOKENS_DIA (int): Tokens de Gemini que esta terminal puede usar
+    por día. 0 (por defecto) = sin límite.
+
+PRESUPUESTO_TOKENS_SESION (int): Tokens que puede usar una sesión de chat.
+    0 (por defecto) = sin límite.
+
+PRESUPUESTO_AVISO (float): Fracción del presupuesto a partir de la cual el
+    chat advierte antes de cada consulta al agente (0.8 = 80%).
+
+PRESUPUESTO_DESVIAR (bool): Con el presupuesto agotado, responde los pedidos
+    del chat por caminos sin LLM (ruteo local, consultas guardadas con la
+    misma pregunta) y pide confirmación antes de usar el agente. '0' solo
+    advierte.
+
+TRAZAS_PATH (str): Archivo JSON Lines donde se exportan los spans del
+    cliente en formato OTLP/JSON (`resourceSpans`). Vacío (por defecto) = no
+    se guardan.
+
+TRAZAS_URL (str): Colector OpenTelemetry OTLP/HTTP al que se envían los
+    mismos spans (ej. 'http://localhost:4318/v1/traces'). Vacío = ninguno.
+
+TRAZAS_SERVICIO (str): `service.name` con el que se identifican los spans
+    (conviene distinguir terminal y gateway).
+
+GRABACION_PATH (str): Archivo JSON Lines donde se graba cada consulta a n8n
+    (cuerpo, intención, estado HTTP, tamaños y tiempos) para reproducirla
+    luego con `python -m demos.reproducir_grabacion`. Vacío (por defecto)
+    desactiva la grabación.
+
+REPORTE_PROCESOS (int): Procesos usados para escribir reportes en segundo
+    plano (0 = uno por núcleo).
+
+REPORTE_FILAS_POR_BLOQUE (int): Filas que se aplanan por vez en un reporte
+    en segundo plano (cada bloque avanza su progreso).
+
+REPORTE_UMBRAL_SEGUNDO_PLANO (int): A partir de esta cantidad de filas, los
+    reportes CSV locales se generan en segundo plano sin bloquear la consola
+    (los Excel se escriben siempre en segundo plano).
+
+REPORTE_FRAGMENTO_DIAS (int): Días que cubre cada fragmento cuando un reporte
+    con rango de fechas se pide por partes.
+
+REPORTE_FRAGMENTOS_PARALELOS (int): Fragmentos que se piden a la vez.
+
+REPORTE_FRAGMENTO_REINTENTOS (int): Reintentos de un fragmento que falla
+    antes de abandonar el reporte.
 ```
 
 """
@@ -34,6 +221,10 @@ import os
 
 N8N_WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL", "http://localhost:5678/webhook/piki")
 
+# Webhook en modo streaming para el chat (vacío = sin streaming)
+
+N8N_STREAM_URL = os.getenv("N8N_STREAM_URL", "")
+
 # API Key opcional para autenticación (string vacío si no está definida)
 API_KEY = os.getenv("API_KEY", "")
 
@@ -41,6 +232,20 @@ API_KEY = os.getenv("API_KEY", "")
 
 TIMEOUT = float(os.getenv("TIMEOUT", "120.0"))
 
+# Plazos adaptativos por intención (TIMEOUT se usa hasta tener muestras)
+
+TIMEOUT_CONEXION = float(os.getenv("TIMEOUT_CONEXION", "5"))
+
+TIMEOUT_MINIMO = float(os.getenv("TIMEOUT_MINIMO", "10"))
+
+TIMEOUT_MAXIMO = float(os.getenv("TIMEOUT_MAXIMO", "600"))
+
+TIMEOUT_FACTOR = float(os.getenv("TIMEOUT_FACTOR", "3"))
+
+TIMEOUT_MUESTRAS_MINIMAS = int(os.getenv("TIMEOUT_MUESTRAS_MINIMAS", "5"))
+
+TIMEOUTS_POR_INTENCION = os.getenv("TIMEOUTS_POR_INTENCION", "")
+
 # Carpeta donde se almacenarán reportes generados
 
 REPORTS_DIR = os.getenv("REPORTS_DIR", "./reports")
@@ -48,3 +253,145 @@ REPORTS_DIR = os.getenv("REPORTS_DIR", "./reports")
 # Prefijo usado para generar IDs únicos de sesión
 
 SESSION_PREFIX = os.getenv("SESSION_PREFIX", "session_")
+
+# Duraciones recientes por intención (aprendizaje de los plazos adaptativos)
+
+PLAZOS_PATH = os.getenv("PLAZOS_PATH", os.path.join(REPORTS_DIR, "plazos_intenciones.json"))
+
+# Réplica local de envíos (SQLite) para consultas sin conexión
+
+REPLICA_HABILITADA = os.getenv("REPLICA_HABILITADA", "0").strip().lower() in ("1", "true", "si", "sí")
+
+REPLICA_PATH = os.getenv("REPLICA_PATH", os.path.join(REPORTS_DIR, "replica_envios.sqlite3"))
+
+REPLICA_LOTE = int(os.getenv("REPLICA_LOTE", "500"))
+
+REPLICA_MAX_ANTIGUEDAD = float(os.getenv("REPLICA_MAX_ANTIGUEDAD", "900"))
+
+# Registro de reportes locales ya compartidos (deduplicación por hash)
+
+COMPARTIDOS_PATH = os.getenv("COMPARTIDOS_PATH", os.path.join(REPORTS_DIR, "compartidos.json"))
+
+# Bandeja de salida (pedidos de compartir pendientes mientras n8n no responde)
+
+BANDEJA_PATH = os.getenv("BANDEJA_PATH", os.path.join(REPORTS_DIR, "bandeja_salida.sqlite3"))
+
+BANDEJA_ESPERA_INICIAL = float(os.getenv("BANDEJA_ESPERA_INICIAL", "5"))
+
+BANDEJA_ESPERA_MAXIMA = float(os.getenv("BANDEJA_ESPERA_MAXIMA", "300"))
+
+BANDEJA_LOTE = int(os.getenv("BANDEJA_LOTE", "20"))
+
+# Consultas guardadas (SQL del agente reutilizable sin LLM)
+
+CONSULTAS_GUARDADAS_PATH = os.getenv("CONSULTAS_GUARDADAS_PATH", os.path.join(REPORTS_DIR, "consultas_guardadas.json"))
+
+# Ruteo local del chat (pedidos reconocibles no pasan por el agente)
+
+ROUTER_LOCAL_HABILITADO = os.getenv("ROUTER_LOCAL_HABILITADO", "1").strip().lower() in ("1", "true", "si", "sí")
+
+# Resumen de resultados recientes enviado como contexto al agente
+
+CONTEXTO_MAX_BYTES = int(os.getenv("CONTEXTO_MAX_BYTES", "2048"))
+
+CONTEXTO_MAX_RESULTADOS = int(os.getenv("CONTEXTO_MAX_RESULTADOS", "3"))
+
+# Gateway local multi-operador (vacío = cada terminal habla directo con n8n)
+
+GATEWAY_URL = os.getenv("GATEWAY_URL", "").rstrip("/")
+
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
+
+GATEWAY_PUERTO = int(os.getenv("GATEWAY_PUERTO", "8765"))
+
+GATEWAY_SESION_TTL = float(os.getenv("GATEWAY_SESION_TTL", "28800"))
+
+GATEWAY_CACHE_TTL = float(os.getenv("GATEWAY_CACHE_TTL", "60"))
+
+# Visor paginado de resultados grandes
+
+VISOR_UMBRAL = int(os.getenv("VISOR_UMBRAL", "20"))
+
+VISOR_FILAS_POR_PAGINA = int(os.getenv("VISOR_FILAS_POR_PAGINA", "0"))
+
+VISOR_ANCHO_COLUMNA = int(os.getenv("VISOR_ANCHO_COLUMNA", "30"))
+
+# Tablero en vivo de envíos fallidos
+
+TABLERO_INTERVALO = int(os.getenv("TABLERO_INTERVALO", "10"))
+
+TABLERO_LIMITE = int(os.getenv("TABLERO_LIMITE", "15"))
+
+# Paquete de la mañana (fallidos, localidades y estados en una sola llamada)
+
+PAQUETE_MATUTINO_LOCALIDADES = os.getenv("PAQUETE_MATUTINO_LOCALIDADES", "")
+
+PAQUETE_MATUTINO_CODIGOS = os.getenv("PAQUETE_MATUTINO_CODIGOS", "")
+
+# Catálogo de localidades y repartidores (autocompletado y "¿quisiste decir?")
+
+CATALOGO_PATH = os.getenv("CATALOGO_PATH", os.path.join(REPORTS_DIR, "catalogo_nombres.json"))
+
+CATALOGO_TTL = float(os.getenv("CATALOGO_TTL", "86400"))
+
+# Notificaciones de cambios desde n8n (puerto 0 = desactivadas)
+
+NOTIFICACIONES_PUERTO = int(os.getenv("NOTIFICACIONES_PUERTO", "0"))
+
+NOTIFICACIONES_HOST = os.getenv("NOTIFICACIONES_HOST", "127.0.0.1")
+
+NOTIFICACIONES_URL = os.getenv("NOTIFICACIONES_URL", "")
+
+NOTIFICACIONES_TTL = int(os.getenv("NOTIFICACIONES_TTL", "600"))
+
+TABLERO_INTERVALO_CON_EVENTOS = int(os.getenv("TABLERO_INTERVALO_CON_EVENTOS", "120"))
+
+# Planificador de consultas (prioridades y límites de ritmo)
+
+PLANIFICADOR_CONCURRENCIA = int(os.getenv("PLANIFICADOR_CONCURRENCIA", "4"))
+
+PLANIFICADOR_RESERVA_INTERACTIVA = int(os.getenv("PLANIFICADOR_RESERVA_INTERACTIVA", "1"))
+
+PLANIFICADOR_MAX_EN_ESPERA = int(os.getenv("PLANIFICADOR_MAX_EN_ESPERA", "16"))
+
+PLANIFICADOR_LIMITES = os.getenv("PLANIFICADOR_LIMITES", "agente=0.25:3,lote=2:4,fondo=0.5:2")
+
+# Consumo del agente y presupuestos de tokens (0 = sin límite)
+
+COSTOS_PATH = os.getenv("COSTOS_PATH", os.path.join(REPORTS_DIR, "costos_agente.json"))
+
+PRESUPUESTO_TOKENS_DIA = int(os.getenv("PRESUPUESTO_TOKENS_DIA", "0"))
+
+PRESUPUESTO_TOKENS_SESION = int(os.getenv("PRESUPUESTO_TOKENS_SESION", "0"))
+
+PRESUPUESTO_AVISO = float(os.getenv("PRESUPUESTO_AVISO", "0.8"))
+
+PRESUPUESTO_DESVIAR = os.getenv("PRESUPUESTO_DESVIAR", "1").strip().lower() in ("1", "true", "si", "sí")
+
+# Trazas OpenTelemetry de las consultas (vacíos = sin exportar)
+
+TRAZAS_PATH = os.getenv("TRAZAS_PATH", "")
+
+TRAZAS_URL = os.getenv("TRAZAS_URL", "")
+
+TRAZAS_SERVICIO = os.getenv("TRAZAS_SERVICIO", "tracking-envios")
+
+# Grabación del tráfico hacia n8n (vacío = sin grabar)
+
+GRABACION_PATH = os.getenv("GRABACION_PATH", "")
+
+# Generación de reportes grandes en procesos separados
+
+REPORTE_PROCESOS = int(os.getenv("REPORTE_PROCESOS", "0"))
+
+REPORTE_FILAS_POR_BLOQUE = int(os.getenv("REPORTE_FILAS_POR_BLOQUE", "20000"))
+
+REPORTE_UMBRAL_SEGUNDO_PLANO = int(os.getenv("REPORTE_UMBRAL_SEGUNDO_PLANO", "50000"))
+
+# Reportes por fragmentos de fechas (consultas en paralelo)
+
+REPORTE_FRAGMENTO_DIAS = int(os.getenv("REPORTE_FRAGMENTO_DIAS", "31"))
+
+REPORTE_FRAGMENTOS_PARALELOS = int(os.getenv("REPORTE_FRAGMENTOS_PARALELOS", "4"))
+
+REPORTE_FRAGMENTO_REINTENTOS = int(os.getenv("REPORTE_FRAGMENTO_REINTENTOS", "2"))
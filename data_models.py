@@ -1,3 +1,6 @@
+import uuid
+
+
 class SolicitudN8n:
     """
     Representa una solicitud enviada al sistema n8n.
@@ -7,7 +10,7 @@ class SolicitudN8n:
     y metadatos opcionales como la intención detectada o parámetros adicionales.
     """
 
-    def __init__(self, entrada_chat, id_sesion, intencion=None, parametros=None):
+    def __init__(self, entrada_chat, id_sesion, intencion=None, parametros=None, columnar=False, prioridad="interactiva", id_traza=None):
         """
         Inicializa una nueva instancia de SolicitudN8n.
 
@@ -16,6 +19,14 @@ class SolicitudN8n:
             id_sesion (str): Identificador único que mantiene el contexto de la conversación.
             intencion (str, opcional): Intención detectada o asignada para el mensaje.
             parametros (dict, opcional): Conjunto de parámetros adicionales que n8n pueda necesitar.
+            columnar (bool, opcional): Pide los registros en formato columnar
+                ({"columns": [...], "rows": [[...]]}), que el cliente decodifica
+                directamente a un DataFrame. Pensado para reportes grandes.
+            prioridad (str, opcional): Clase con la que el planificador ordena la
+                consulta: "interactiva" (por defecto), "compartir", "lote" o "fondo".
+                No viaja a n8n.
+            id_traza (str, opcional): ID de traza (32 caracteres hex) que viaja a n8n
+                en `traceparent` y en el cuerpo. Si no se indica, se genera uno.
 
         Notes:
             Si no se envían parámetros, se inicializa un diccionario vacío
@@ -25,6 +36,9 @@ class SolicitudN8n:
         self.id_sesion = id_sesion
         self.intencion = intencion
         self.parametros = parametros if parametros is not None else {}
+        self.columnar = columnar
+        self.prioridad = prioridad
+        self.id_traza = id_traza or uuid.uuid4().hex
 
 
 class RespuestaN8n:
@@ -35,7 +49,19 @@ class RespuestaN8n:
     n8n devuelva un mensaje estructurado, datos adicionales o un error.
     """
 
-    def __init__(self, ok, mensaje=None, datos=None, error=None, intencion=None):
+    def __init__(
+        self,
+        ok,
+        mensaje=None,
+        datos=None,
+        error=None,
+        intencion=None,
+        query_sql=None,
+        consulta_id=None,
+        metricas=None,
+        id_traza=None,
+        id_ejecucion=None,
+    ):
         """
         Inicializa una respuesta proveniente de n8n.
 
@@ -45,9 +71,21 @@ class RespuestaN8n:
             datos (any, opcional): Información devuelta por el workflow, puede ser dict, lista o valor primitivo.
             error (str, opcional): Descripción del error si la operación falló.
             intencion (str, opcional): Intención estructurada detectada por n8n (ej: "reporte_local", "compartir").
+            query_sql (str, opcional): Consulta SQL que usó el agente para obtener los datos.
+            consulta_id (str, opcional): Id con el que el workflow registró esa consulta
+                (lo usa `sql_directo` para repetirla).
+            metricas (dict, opcional): Tiempo y tokens que consumió el agente
+                (t_agente_ms, llamadas_sql, tokens_entrada, tokens_salida, tokens_estimados).
+            id_traza (str, opcional): ID de traza de la solicitud que originó la respuesta.
+            id_ejecucion (str, opcional): Número de ejecución de n8n (`X-N8n-Execution-Id`).
         """
         self.ok = ok
         self.mensaje = mensaje
         self.datos = datos
         self.error = error
         self.intencion = intencion
+        self.query_sql = query_sql
+        self.consulta_id = consulta_id
+        self.metricas = metricas
+        self.id_traza = id_traza
+        self.id_ejecucion = id_ejecucion
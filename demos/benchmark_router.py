@@ -0,0 +1,75 @@
+"""
+Benchmark del ruteo local del chat.
+
+Pasa un corpus de mensajes grabados por `utils.router_local.rutear_mensaje` y
+muestra cuántos se resuelven sin el agente, por intención, y lo que cuesta
+decidirlo. El ahorro se estima con las latencias medias de una respuesta de
+Piki y de una ruta estructurada, que conviene medir en el entorno propio y
+pasar por parámetro.
+
+Ejecutar: python -m demos.benchmark_router [--corpus demos/corpus_chat.txt]
+          [--agente 6.0] [--directo 0.4] [-v]
+"""
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+
+from utils.router_local import rutear_mensaje
+
+CORPUS = Path(__file__).with_name("corpus_chat.txt")
+REPETICIONES = 200
+
+
+def _leer_corpus(path: Path) -> list[str]:
+	"""Un mensaje por línea; se ignoran las vacías y las que empiezan con #."""
+	lineas = (linea.strip() for linea in path.read_text(encoding="utf-8").splitlines())
+	return [linea for linea in lineas if linea and not linea.startswith("#")]
+
+
+def _percentil(valores: list[float], p: float) -> float:
+	ordenados = sorted(valores)
+	return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("--corpus", type=Path, default=CORPUS)
+	parser.add_argument("--agente", type=float, default=6.0, help="Segundos medios de una respuesta de Piki")
+	parser.add_argument("--directo", type=float, default=0.4, help="Segundos medios de una ruta estructurada")
+	parser.add_argument("-v", "--detalle", action="store_true", help="Muestra la ruta de cada mensaje")
+	args = parser.parse_args()
+
+	mensajes = _leer_corpus(args.corpus)
+	rutas = [rutear_mensaje(m) for m in mensajes]
+
+	tiempos = []
+	for mensaje in mensajes:
+		inicio = time.perf_counter()
+		for _ in range(REPETICIONES):
+			rutear_mensaje(mensaje)
+		tiempos.append((time.perf_counter() - inicio) / REPETICIONES * 1e6)
+
+	if args.detalle:
+		for mensaje, ruta in zip(mensajes, rutas):
+			print(f"{(ruta[0] if ruta else 'agente'):<30} {mensaje}")
+		print()
+
+	por_intencion = Counter(ruta[0] if ruta else "agente" for ruta in rutas)
+	resueltos = len(mensajes) - por_intencion["agente"]
+	print(f"Mensajes: {len(mensajes)}")
+	for intencion, cantidad in por_intencion.most_common():
+		print(f"  {intencion:<30}{cantidad:>5}")
+	print(f"Resueltos sin el agente: {resueltos} ({100 * resueltos / len(mensajes):.0f}%)")
+	print(f"Costo del ruteo (µs): media {sum(tiempos) / len(tiempos):.1f}, p95 {_percentil(tiempos, 0.95):.1f}")
+
+	antes = len(mensajes) * args.agente
+	despues = resueltos * args.directo + (len(mensajes) - resueltos) * args.agente
+	print(
+		f"Espera estimada (agente {args.agente:g} s, directo {args.directo:g} s): "
+		f"{antes:.0f} s → {despues:.0f} s ({100 * (1 - despues / antes):.0f}% menos)"
+	)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de tipos compactos en los reportes de envíos.
+
+Compara memoria y tiempos (aplanado, vista previa y exportación a CSV) de un
+DataFrame con las columnas como objetos Python contra el mismo DataFrame con
+los tipos de `report_generator.ESQUEMA_ENVIOS`.
+
+Ejecutar: python -m demos.benchmark_tipos [filas]
+"""
+import io
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from report_generator import _aplanar_bloque, _optimizar_tipos, _preview
+
+ESTADOS = ["En preparación", "En tránsito", "En distribución", "Entregado", "Fallido"]
+LOCALIDADES = ["La Plata", "Quilmes", "Berazategui", "Avellaneda", "Lanús", "Lomas de Zamora", "Banfield", "Adrogué"]
+REPARTIDORES = [f"Repartidor {i}" for i in range(1, 41)]
+
+
+def _envios_sinteticos(filas: int) -> list[dict]:
+	"""Genera registros con la forma de vw_tracking."""
+	aleatorio = random.Random(6)
+	return [
+		{
+			"codigo_envio": f"ENV{i:08d}",
+			"peso": round(aleatorio.uniform(0.1, 30), 2),
+			"tipo_envio": aleatorio.choice(["Estándar", "Express"]),
+			"fecha_creacion": f"2025-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}T10:00:00Z",
+			"localidad_destino": aleatorio.choice(LOCALIDADES),
+			"provincia_destino": "Buenos Aires",
+			"estado_actual": aleatorio.choice(ESTADOS),
+			"repartidor_actual": aleatorio.choice(REPARTIDORES),
+			"fecha_ultimo_movimiento": f"2025-12-{aleatorio.randint(1, 28):02d}T15:30:00Z",
+		}
+		for i in range(filas)
+	]
+
+
+def _medir(funcion, *args) -> tuple[float, object]:
+	"""Ejecuta la función y devuelve (segundos, resultado)."""
+	inicio = time.perf_counter()
+	resultado = funcion(*args)
+	return time.perf_counter() - inicio, resultado
+
+
+def _exportar_csv(df: pd.DataFrame) -> None:
+	df.to_csv(io.StringIO(), index=False)
+
+
+def _vista_previa(df: pd.DataFrame) -> None:
+	with redirect_stdout(io.StringIO()):
+		_preview(df)
+
+
+def main() -> None:
+	filas = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+	registros = _envios_sinteticos(filas)
+
+	t_aplanar, crudo = _medir(_aplanar_bloque, registros)
+	t_tipos, optimizado = _medir(_optimizar_tipos, crudo.copy())
+
+	print(f"Filas: {filas}")
+	print(f"{'':<22}{'original':>12}{'optimizado':>12}")
+	mem_crudo = crudo.memory_usage(deep=True).sum() / 1e6
+	mem_opt = optimizado.memory_usage(deep=True).sum() / 1e6
+	print(f"{'Memoria (MB)':<22}{mem_crudo:>12.1f}{mem_opt:>12.1f}")
+	print(f"{'Aplanado (s)':<22}{t_aplanar:>12.3f}{t_aplanar + t_tipos:>12.3f}")
+	for etiqueta, funcion in (("Vista previa (s)", _vista_previa), ("Exportar CSV (s)", _exportar_csv)):
+		t_crudo, _ = _medir(funcion, crudo)
+		t_opt, _ = _medir(funcion, optimizado)
+		print(f"{etiqueta:<22}{t_crudo:>12.3f}{t_opt:>12.3f}")
+	print(f"\nReducción de memoria: {100 * (1 - mem_opt / mem_crudo):.0f}%")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,184 @@
+"""
+Reproduce una grabación de tráfico (`GRABACION_PATH`) contra un webhook.
+
+Vuelve a enviar cada consulta grabada respetando los intervalos originales a
+velocidad real (1x), acelerados (Nx) o sin esperas (máxima velocidad), con un
+límite de consultas simultáneas. Al final informa la distribución de
+latencias por intención, comparada con la grabada, y los errores.
+
+Para no mezclar la memoria del agente con conversaciones reales, cada sesión
+grabada se reproduce con un ID de sesión nuevo (salvo `--mismas-sesiones`).
+
+Ejecutar:
+    python -m demos.reproducir_grabacion trafico.jsonl --url http://127.0.0.1:5679/webhook/piki
+        [--velocidad 1 | 10 | 0 (máxima)] [--concurrencia 8] [--url-stream URL]
+        [--intencion reporte_fallidos ...] [--mismas-sesiones]
+"""
+import argparse
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config import API_KEY, N8N_WEBHOOK_URL, TIMEOUT
+from utils.grabacion import leer_grabacion
+
+_sesiones_http = threading.local()
+
+
+def _cliente() -> requests.Session:
+	"""Una sesión HTTP (pool de conexiones) por hilo."""
+	if not hasattr(_sesiones_http, "cliente"):
+		_sesiones_http.cliente = requests.Session()
+	return _sesiones_http.cliente
+
+
+def _percentil(valores: list[float], p: float) -> float:
+	ordenados = sorted(valores)
+	return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def _enviar(url: str, carga: dict, streaming: bool) -> dict:
+	"""Envía una consulta y devuelve su resultado medido."""
+	encabezados = {"Content-Type": "application/json"}
+	if API_KEY:
+		encabezados["Authorization"] = f"Bearer {API_KEY}"
+	marca = time.perf_counter()
+	try:
+		with _cliente().post(url, json=carga, headers=encabezados, timeout=TIMEOUT, stream=streaming) as respuesta_http:
+			tamano = sum(len(bloque) for bloque in respuesta_http.iter_content(65536))
+			total = time.perf_counter() - marca
+			if respuesta_http.status_code >= 400:
+				return {"total_s": total, "error": f"HTTP {respuesta_http.status_code}", "bytes": tamano}
+			return {"total_s": total, "error": None, "bytes": tamano}
+	except requests.RequestException as error:
+		return {"total_s": time.perf_counter() - marca, "error": type(error).__name__, "bytes": 0}
+
+
+def reproducir(
+	registros: list[dict],
+	url: str,
+	velocidad: float = 1.0,
+	concurrencia: int = 8,
+	url_stream: str | None = None,
+	mismas_sesiones: bool = False,
+) -> list[dict]:
+	"""
+	Reenvía las consultas grabadas y devuelve un resultado por consulta.
+
+	Args:
+		registros: Grabación ordenada por momento de envío.
+		url: Webhook destino.
+		velocidad: 1 = intervalos originales, N = N veces más rápido, 0 = sin esperas.
+		concurrencia: Máximo de consultas en vuelo; si se alcanza, las demás esperan
+			(la demora queda registrada como `retraso_s`).
+		url_stream: Webhook de streaming para las consultas grabadas por streaming;
+			si no se indica, se envían a `url`.
+		mismas_sesiones: Reutiliza los IDs de sesión grabados.
+
+	Returns:
+		list[dict]: Intención, latencia grabada y medida, retraso, bytes y error.
+	"""
+	sesiones: dict[str, str] = {}
+	resultados: list[dict] = []
+	lock = threading.Lock()
+	t0 = registros[0].get("t") or 0 if registros else 0
+	inicio = time.perf_counter()
+
+	def tarea(registro: dict, carga: dict, previsto: float) -> None:
+		retraso = max(0.0, time.perf_counter() - previsto)
+		streaming = registro.get("destino") == "streaming"
+		resultado = _enviar(url_stream if streaming and url_stream else url, carga, streaming)
+		resultado.update(
+			intent=registro.get("intent") or "agente",
+			grabado_s=registro.get("total_s"),
+			retraso_s=retraso,
+		)
+		with lock:
+			resultados.append(resultado)
+
+	with ThreadPoolExecutor(max_workers=max(1, concurrencia)) as pool:
+		for registro in registros:
+			carga = dict(registro["carga"])
+			if not mismas_sesiones and carga.get("sessionId"):
+				original = carga["sessionId"]
+				sesiones.setdefault(original, f"replay_{uuid.uuid4().hex}")
+				carga["sessionId"] = sesiones[original]
+
+			previsto = inicio
+			if velocidad > 0:
+				previsto = inicio + ((registro.get("t") or t0) - t0) / velocidad
+				espera = previsto - time.perf_counter()
+				if espera > 0:
+					time.sleep(espera)
+			pool.submit(tarea, registro, carga, previsto)
+
+	return resultados
+
+
+def _imprimir_informe(resultados: list[dict], duracion: float) -> None:
+	"""Latencias por intención (medidas y grabadas), errores y rendimiento."""
+	por_intencion: dict[str, list[dict]] = defaultdict(list)
+	for resultado in resultados:
+		por_intencion[resultado["intent"]].append(resultado)
+
+	print(f"\nConsultas: {len(resultados)} en {duracion:.1f} s ({len(resultados) / max(duracion, 1e-9):.1f}/s)")
+	print(f"{'intención':<30}{'n':>6}{'err':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'máx':>9}{'p50 grab.':>11}")
+	for intencion, grupo in sorted(por_intencion.items(), key=lambda par: -len(par[1])):
+		tiempos = [r["total_s"] for r in grupo if not r["error"]] or [0.0]
+		grabados = [r["grabado_s"] for r in grupo if r["grabado_s"] is not None]
+		errores = sum(1 for r in grupo if r["error"])
+		grabado = f"{_percentil(grabados, 0.5):>11.3f}" if grabados else f"{'-':>11}"
+		print(
+			f"{intencion:<30}{len(grupo):>6}{errores:>6}"
+			f"{_percentil(tiempos, 0.5):>9.3f}{_percentil(tiempos, 0.9):>9.3f}"
+			f"{_percentil(tiempos, 0.99):>9.3f}{max(tiempos):>9.3f}{grabado}"
+		)
+
+	retrasos = [r["retraso_s"] for r in resultados]
+	if retrasos:
+		print(f"\nRetraso por concurrencia: p50 {_percentil(retrasos, 0.5):.3f} s, máx {max(retrasos):.3f} s")
+	errores = Counter(r["error"] for r in resultados if r["error"])
+	if errores:
+		print("Errores:")
+		for error, cantidad in errores.most_common():
+			print(f"  {error}: {cantidad}")
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Reproduce una grabación de tráfico contra un webhook")
+	parser.add_argument("grabacion", help="Archivo JSONL grabado con GRABACION_PATH")
+	parser.add_argument("--url", default=N8N_WEBHOOK_URL, help="Webhook destino")
+	parser.add_argument("--url-stream", help="Webhook destino de las consultas por streaming")
+	parser.add_argument("--velocidad", type=float, default=1.0, help="1 = tiempo real, N = N veces más rápido, 0 = máxima")
+	parser.add_argument("--concurrencia", type=int, default=8, help="Consultas simultáneas como máximo")
+	parser.add_argument("--intencion", action="append", help="Reproduce solo estas intenciones ('agente' = sin intención)")
+	parser.add_argument("--mismas-sesiones", action="store_true", help="Reutiliza los IDs de sesión grabados")
+	args = parser.parse_args()
+
+	registros = leer_grabacion(args.grabacion)
+	if args.intencion:
+		registros = [r for r in registros if (r.get("intent") or "agente") in args.intencion]
+	if not registros:
+		print("La grabación no tiene consultas para reproducir.")
+		return
+
+	ritmo = "máxima velocidad" if args.velocidad <= 0 else f"{args.velocidad:g}x"
+	print(f"Reproduciendo {len(registros)} consultas contra {args.url} ({ritmo}, concurrencia {args.concurrencia})")
+	inicio = time.perf_counter()
+	resultados = reproducir(
+		registros,
+		args.url,
+		velocidad=args.velocidad,
+		concurrencia=args.concurrencia,
+		url_stream=args.url_stream,
+		mismas_sesiones=args.mismas_sesiones,
+	)
+	_imprimir_informe(resultados, time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,279 @@
+"""
+Servidor simulado del webhook de n8n.
+
+Responde cualquier POST con el formato de "Visualizar - Extrae los datos e
+intención" sin tocar la base ni el agente. Sirve como destino local para
+`demos.reproducir_grabacion` y para probar el cliente sin n8n.
+
+Si se le pasa una grabación, imita por intención la latencia mediana y el
+tamaño mediano de respuesta registrados; si no, responde con `--demora`
+segundos y unos pocos registros.
+
+También acepta la intención `suscribir_eventos` como el workflow: con
+`--eventos-cada N`, cada N segundos envía a los receptores suscriptos un aviso
+con cambios de estado sintéticos, para probar las notificaciones sin n8n. Los
+paquetes (intención `paquete`) se resuelven solicitud por solicitud, hasta 4 a
+la vez, con una respuesta por cada una. `catalogo_nombres` devuelve las
+localidades y repartidores simulados.
+
+Ejecutar: python -m demos.servidor_simulado [--puerto 5679] [--grabacion trafico.jsonl]
+          [--demora 0.05] [--errores 0.0] [--eventos-cada 5]
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.grabacion import leer_grabacion
+
+# Tamaño aproximado (bytes JSON) de cada registro sintético
+_BYTES_POR_REGISTRO = 160
+
+_ESTADOS_SIMULADOS = ["En preparación", "En tránsito", "En distribución", "Entregado", "Fallido"]
+_LOCALIDADES_SIMULADAS = ["Quilmes", "Bernal", "Avellaneda", "La Plata"]
+_REPARTIDORES_SIMULADOS = ["Repartidor simulado", "Juan Pérez", "María González"]
+
+# Intenciones que en el workflow resuelve el agente (sus respuestas traen `metricas`)
+_INTENCIONES_DEL_AGENTE = {None, "consulta_personalizada"}
+
+# Números de ejecución simulados
+_ejecuciones = itertools.count(1)
+
+
+class PerfilRespuestas:
+	"""Latencia y tamaño de respuesta a imitar para cada intención."""
+
+	def __init__(self, demora: float, registros: int = 3):
+		self.demora = demora
+		self.registros = registros
+		self._por_intencion: dict[str | None, tuple[float, int]] = {}
+
+	@classmethod
+	def desde_grabacion(cls, path: str, demora: float) -> "PerfilRespuestas":
+		"""Medianas de `total_s` y `bytes_respuesta` por intención de una grabación."""
+		muestras: dict[str | None, list[dict]] = defaultdict(list)
+		for registro in leer_grabacion(path):
+			if registro.get("ok"):
+				muestras[registro.get("intent")].append(registro)
+		perfil = cls(demora)
+		for intencion, registros in muestras.items():
+			perfil._por_intencion[intencion] = (
+				statistics.median(r.get("total_s") or 0 for r in registros),
+				int(statistics.median(r.get("bytes_respuesta") or 0 for r in registros)),
+			)
+		return perfil
+
+	def para(self, intencion: str | None) -> tuple[float, int]:
+		"""Devuelve (segundos de demora, cantidad de registros) para la intención."""
+		if intencion in self._por_intencion:
+			demora, tamano = self._por_intencion[intencion]
+			return demora, max(1, tamano // _BYTES_POR_REGISTRO)
+		return self.demora, self.registros
+
+
+def _registros_sinteticos(cantidad: int) -> list[dict]:
+	return [
+		{
+			"codigo_envio": f"SIM{i:08d}",
+			"estado_actual": "En tránsito",
+			"localidad_destino": "Quilmes",
+			"repartidor_actual": "Repartidor simulado",
+			"fecha_ultimo_movimiento": "2025-01-01T12:00:00Z",
+		}
+		for i in range(cantidad)
+	]
+
+
+class Suscriptores:
+	"""Receptores registrados con `suscribir_eventos` (URL → token)."""
+
+	def __init__(self):
+		self._tokens: dict[str, str] = {}
+		self._lock = threading.Lock()
+
+	def registrar(self, params: dict) -> dict:
+		"""Aplica una suscripción o cancelación y devuelve el `data` de la respuesta."""
+		url = str(params.get("url") or "")
+		with self._lock:
+			if params.get("cancelar"):
+				self._tokens.pop(url, None)
+				return {"suscripto": False}
+			self._tokens[url] = str(params.get("token") or "")
+			cantidad = len(self._tokens)
+		vence = datetime.fromtimestamp(time.time() + float(params.get("ttl") or 600), timezone.utc)
+		return {"suscripto": True, "vence": vence.isoformat(), "suscriptores": cantidad}
+
+	def todos(self) -> list[tuple[str, str]]:
+		with self._lock:
+			return list(self._tokens.items())
+
+
+def _eventos_sinteticos() -> list[dict]:
+	"""Uno a tres envíos con un cambio de estado, con el formato de `vw_tracking`."""
+	ahora = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+	return [
+		{
+			"codigo_envio": f"SIM{random.randint(0, 99):08d}",
+			"estado_actual": random.choice(_ESTADOS_SIMULADOS),
+			"localidad_destino": random.choice(_LOCALIDADES_SIMULADAS),
+			"repartidor_actual": "Repartidor simulado",
+			"fecha_ultimo_movimiento": ahora,
+			"marca_sync": ahora,
+		}
+		for _ in range(random.randint(1, 3))
+	]
+
+
+def emitir_eventos(suscriptores: Suscriptores, cada: float, detenido: threading.Event) -> None:
+	"""Envía cambios sintéticos a cada receptor suscripto cada `cada` segundos."""
+	while not detenido.wait(cada):
+		eventos = _eventos_sinteticos()
+		cuerpo = json.dumps({"tipo": "cambios_envios", "marca": {"fecha": eventos[-1]["marca_sync"]}, "eventos": eventos}).encode("utf-8")
+		for url, token in suscriptores.todos():
+			aviso = urllib.request.Request(
+				url, data=cuerpo, method="POST",
+				headers={"Content-Type": "application/json", "X-Token": token},
+			)
+			try:
+				urllib.request.urlopen(aviso, timeout=5).close()
+			except OSError:
+				# Igual que en el workflow: un receptor caído no frena a los demás
+				pass
+
+
+def crear_manejador(
+	perfil: PerfilRespuestas,
+	tasa_errores: float,
+	suscriptores: Suscriptores | None = None,
+) -> type[BaseHTTPRequestHandler]:
+	"""Arma la clase manejadora con el perfil y la tasa de errores indicados."""
+	suscriptores = suscriptores or Suscriptores()
+
+	def atender(carga: dict) -> tuple[int, object]:
+		"""(estado HTTP, cuerpo) con que el workflow respondería una solicitud."""
+		intencion = carga.get("intent")
+		if intencion == "suscribir_eventos":
+			return 200, [{"intencion": intencion, "data": suscriptores.registrar(carga.get("params") or {})}]
+		if intencion == "catalogo_nombres":
+			catalogo = {
+				"localidades": _LOCALIDADES_SIMULADAS,
+				"repartidores": _REPARTIDORES_SIMULADOS,
+				"generado": datetime.now(timezone.utc).isoformat(),
+			}
+			return 200, [{"intencion": intencion, "data": catalogo}]
+		demora, cantidad = perfil.para(intencion)
+		time.sleep(demora)
+
+		if random.random() < tasa_errores:
+			return 500, {"message": "Error simulado"}
+		respuesta = {
+			"data": _registros_sinteticos(cantidad),
+			"intencion": intencion,
+			"mensaje_ia": f"Respuesta simulada ({cantidad} registros).",
+		}
+		if intencion in _INTENCIONES_DEL_AGENTE:
+			respuesta["metricas"] = {
+				"t_agente_ms": round(demora * 900),
+				"llamadas_sql": 1,
+				"tokens_entrada": 1500 + len(str(carga.get("chatInput", ""))) // 4,
+				"tokens_salida": 40 + cantidad * _BYTES_POR_REGISTRO // 4,
+				"tokens_estimados": True,
+			}
+		return 200, [respuesta]
+
+	def atender_en_paquete(carga) -> dict:
+		"""Resultado de una solicitud del paquete, como lo arma el nodo "Paquete - Ejecuta las solicitudes"."""
+		if not isinstance(carga, dict) or carga.get("intent") == "paquete":
+			return {"ok": False, "estado": 400, "error": "Solicitud inválida dentro del paquete"}
+		inicio = time.perf_counter()
+		estado, cuerpo = atender(carga)
+		resultado = {
+			"ok": estado < 400,
+			"estado": estado,
+			"cuerpo": cuerpo,
+			"ejecucion": str(next(_ejecuciones)),
+			"duracion_ms": round((time.perf_counter() - inicio) * 1000),
+		}
+		if estado >= 400:
+			resultado["error"] = f"HTTP {estado}"
+		return resultado
+
+	class ManejadorSimulado(BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+		# Encabezados y cuerpo van en escrituras separadas: sin esto, Nagle y el
+		# ACK demorado suman ~40 ms a cada respuesta
+		disable_nagle_algorithm = True
+
+		def do_POST(self) -> None:
+			largo = int(self.headers.get("Content-Length") or 0)
+			try:
+				carga = json.loads(self.rfile.read(largo) or b"{}")
+			except ValueError:
+				carga = {}
+			if not isinstance(carga, dict):
+				carga = {}
+			self._traza = carga.get("traceId")
+			if carga.get("intent") == "paquete":
+				solicitudes = (carga.get("params") or {}).get("solicitudes") or []
+				with ThreadPoolExecutor(max_workers=4) as pool:
+					resultados = list(pool.map(atender_en_paquete, solicitudes))
+				self._responder(200, [{"resultados": resultados}])
+				return
+			self._responder(*atender(carga))
+
+		def _responder(self, estado: int, cuerpo) -> None:
+			datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+			self.send_response(estado)
+			self.send_header("Content-Type", "application/json; charset=utf-8")
+			self.send_header("Content-Length", str(len(datos)))
+			# Como los nodos "Respond to Webhook" del workflow
+			self.send_header("X-Trace-Id", getattr(self, "_traza", None) or "")
+			self.send_header("X-N8n-Execution-Id", str(next(_ejecuciones)))
+			self.end_headers()
+			self.wfile.write(datos)
+
+		def log_message(self, formato: str, *args) -> None:
+			pass
+
+	return ManejadorSimulado
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Servidor simulado del webhook de n8n")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--puerto", type=int, default=5679)
+	parser.add_argument("--grabacion", help="Grabación JSONL de la que tomar latencias y tamaños")
+	parser.add_argument("--demora", type=float, default=0.05, help="Segundos de demora por defecto")
+	parser.add_argument("--errores", type=float, default=0.0, help="Fracción de respuestas con error 500")
+	parser.add_argument("--eventos-cada", type=float, default=0.0, help="Segundos entre avisos sintéticos a los suscriptos (0 = ninguno)")
+	args = parser.parse_args()
+
+	if args.grabacion:
+		perfil = PerfilRespuestas.desde_grabacion(args.grabacion, args.demora)
+	else:
+		perfil = PerfilRespuestas(args.demora)
+	suscriptores = Suscriptores()
+	servidor = ThreadingHTTPServer((args.host, args.puerto), crear_manejador(perfil, args.errores, suscriptores))
+	detenido = threading.Event()
+	if args.eventos_cada > 0:
+		threading.Thread(target=emitir_eventos, args=(suscriptores, args.eventos_cada, detenido), daemon=True).start()
+	print(f"Servidor simulado escuchando en http://{args.host}:{args.puerto}/ (Ctrl+C para salir)")
+	try:
+		servidor.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		detenido.set()
+		servidor.server_close()
+
+
+if __name__ == "__main__":
+	main()
@@ -7,6 +7,8 @@ Este módulo centraliza:
 - Procesamiento de datos y mensajes
 """
 
+import pandas as pd
+
 from data_models import RespuestaN8n
 from utils.helpers import obtener_mensaje_desde_data
 from utils.formateo import normalizar_registros_respuesta
@@ -44,7 +46,7 @@ MSG_PROCESADO_CORRECTAMENTE = "n8n procesó la solicitud correctamente."
 # FUNCIONES DE VALIDACIÓN
 # ============================================================================
 
-def validar_respuesta_n8n(res: RespuestaN8n, mensaje_sin_datos: str) -> tuple[bool, list, str | None]:
+def validar_respuesta_n8n(res: RespuestaN8n, mensaje_sin_datos: str) -> tuple[bool, list | pd.DataFrame, str | None]:
     """
     Valida la respuesta de n8n y retorna si es válida, los registros y el mensaje.
     
@@ -60,7 +62,8 @@ def validar_respuesta_n8n(res: RespuestaN8n, mensaje_sin_datos: str) -> tuple[bo
     Returns:
         tuple[bool, list, str | None]: 
             - bool: True si la validación es exitosa, False en caso contrario
-            - list: Lista de registros normalizados (vacía si no hay datos)
+            - list | pd.DataFrame: Lista de registros normalizados (vacía si no
+              hay datos), o el DataFrame si la respuesta fue columnar
             - str | None: Mensaje extraído de los datos (si existe)
     
     Ejemplos:
@@ -75,6 +78,13 @@ def validar_respuesta_n8n(res: RespuestaN8n, mensaje_sin_datos: str) -> tuple[bo
         print(f"Error: {res.mensaje or ERROR_N8N_SIN_RESPUESTA}")
         return False, [], None
     
+    # Respuesta columnar: ya viene como DataFrame
+    if isinstance(res.datos, pd.DataFrame):
+        if res.datos.empty:
+            print(mensaje_sin_datos)
+            return False, [], None
+        return True, res.datos, None
+
     # Normalizar y extraer registros
     registros = normalizar_registros_respuesta(res.datos)
     mensaje = obtener_mensaje_desde_data(res.datos)
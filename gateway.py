@@ -0,0 +1,266 @@
+"""
+Gateway local multi-operador
+============================
+
+Proceso de larga duración que atiende a varias terminales (cada una con su
+copia de la interfaz de consola) y centraliza su comunicación con n8n:
+
+- Emite IDs de sesión sin colisiones (UUID) y los vence por inactividad.
+- Comparte un único pool de conexiones HTTP hacia n8n.
+- Comparte una caché de respuestas para las intenciones estructuradas.
+- Agrupa consultas idénticas simultáneas en una sola llamada ("single-flight").
+
+Las terminales lo usan definiendo `GATEWAY_URL`; el cliente de n8n envía
+entonces las consultas al gateway en lugar de hacerlo directamente.
+
+API (JSON):
+    POST /sesiones  → {"sessionId": "...", "expira_en": <epoch>}
+    POST /consulta  → mismo cuerpo que el webhook de n8n; devuelve los campos de RespuestaN8n
+    GET  /estado    → sesiones activas, tamaño de la caché y llamadas agrupadas
+
+Uso:
+    python gateway.py
+"""
+import gzip
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+from config import GATEWAY_HOST, GATEWAY_PUERTO, GATEWAY_SESION_TTL, GATEWAY_CACHE_TTL, SESSION_PREFIX
+from data_models import SolicitudN8n, RespuestaN8n
+from n8n_client import enviar_consulta_directa
+
+# Intenciones cuyas respuestas no dependen de la memoria del agente y pueden compartirse
+INTENCIONES_CACHEABLES = {"consultar_estado", "reporte_fallidos", "reporte_repartidor_localidad", "catalogo_nombres"}
+
+# Las respuestas más chicas que esto no se comprimen (no compensa)
+_MIN_BYTES_GZIP = 1024
+
+
+class RegistroSesiones:
+	"""Sesiones emitidas por el gateway, con vencimiento por inactividad."""
+
+	def __init__(self, ttl: float = GATEWAY_SESION_TTL):
+		self.ttl = ttl
+		self._vencimientos: dict[str, float] = {}
+		self._lock = threading.Lock()
+
+	def emitir(self) -> tuple[str, float]:
+		"""Crea una sesión nueva y devuelve (id, momento de vencimiento)."""
+		id_sesion = f"{SESSION_PREFIX}_{uuid.uuid4().hex}"
+		return id_sesion, self.tocar(id_sesion)
+
+	def tocar(self, id_sesion: str) -> float:
+		"""
+		Registra actividad en una sesión y extiende su vencimiento.
+
+		Las sesiones desconocidas (por ejemplo, generadas localmente cuando el
+		gateway no estaba disponible) se adoptan: al ser UUID no colisionan.
+		"""
+		vence = time.time() + self.ttl
+		with self._lock:
+			self._purgar()
+			self._vencimientos[id_sesion] = vence
+		return vence
+
+	def activas(self) -> int:
+		"""Cantidad de sesiones vigentes."""
+		with self._lock:
+			self._purgar()
+			return len(self._vencimientos)
+
+	def _purgar(self) -> None:
+		ahora = time.time()
+		for id_sesion in [s for s, vence in self._vencimientos.items() if vence < ahora]:
+			del self._vencimientos[id_sesion]
+
+
+class CacheRespuestas:
+	"""Caché en memoria con vencimiento por tiempo."""
+
+	def __init__(self, ttl: float = GATEWAY_CACHE_TTL):
+		self.ttl = ttl
+		self._entradas: dict[str, tuple[float, dict]] = {}
+		self._lock = threading.Lock()
+
+	def obtener(self, clave: str) -> dict | None:
+		with self._lock:
+			entrada = self._entradas.get(clave)
+			if entrada is None:
+				return None
+			if entrada[0] < time.time():
+				del self._entradas[clave]
+				return None
+			return entrada[1]
+
+	def guardar(self, clave: str, valor: dict) -> None:
+		with self._lock:
+			self._entradas[clave] = (time.time() + self.ttl, valor)
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._entradas)
+
+
+class UnSoloVuelo:
+	"""Agrupa llamadas idénticas simultáneas: solo la primera llega a n8n, el resto espera su resultado."""
+
+	def __init__(self):
+		self._en_curso: dict[str, tuple[threading.Event, dict]] = {}
+		self._lock = threading.Lock()
+		self.agrupadas = 0
+
+	def ejecutar(self, clave: str, funcion: Callable[[], dict]) -> dict:
+		with self._lock:
+			en_curso = self._en_curso.get(clave)
+			if en_curso is None:
+				evento, resultado = threading.Event(), {}
+				self._en_curso[clave] = (evento, resultado)
+				lider = True
+			else:
+				evento, resultado = en_curso
+				self.agrupadas += 1
+				lider = False
+
+		if not lider:
+			evento.wait()
+			return resultado["valor"]
+
+		try:
+			resultado["valor"] = funcion()
+		except Exception as error:  # el resto de las terminales no debe quedar esperando
+			resultado["valor"] = vars(RespuestaN8n(ok=False, mensaje=f"Error en el gateway: {error}"))
+		finally:
+			with self._lock:
+				del self._en_curso[clave]
+			evento.set()
+		return resultado["valor"]
+
+
+sesiones = RegistroSesiones()
+cache = CacheRespuestas()
+un_solo_vuelo = UnSoloVuelo()
+
+
+def _clave(carga: dict) -> str:
+	"""
+	Clave que identifica consultas equivalentes (sin la sesión para las cacheables).
+
+	El ID de traza es distinto en cada consulta y nunca forma parte de la clave:
+	las terminales agrupadas reciben la respuesta (y el número de ejecución de n8n)
+	de la primera.
+	"""
+	intencion = carga.get("intent")
+	ignorados = {"traceId", "sessionId"} if intencion in INTENCIONES_CACHEABLES else {"traceId"}
+	base = {k: v for k, v in carga.items() if k not in ignorados}
+	return json.dumps(base, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def atender_consulta(carga: dict) -> dict:
+	"""
+	Resuelve una consulta de una terminal usando caché y single-flight.
+
+	Args:
+		carga (dict): Cuerpo con `chatInput`, `sessionId`, `intent` y `params`.
+
+	Returns:
+		dict: Campos de la `RespuestaN8n` resultante.
+	"""
+	id_sesion = carga.get("sessionId") or sesiones.emitir()[0]
+	sesiones.tocar(id_sesion)
+
+	clave = _clave(carga)
+	cacheable = carga.get("intent") in INTENCIONES_CACHEABLES
+	if cacheable:
+		guardada = cache.obtener(clave)
+		if guardada is not None:
+			return guardada
+
+	def consultar() -> dict:
+		solicitud = SolicitudN8n(
+			entrada_chat = carga.get("chatInput"),
+			id_sesion = id_sesion,
+			intencion = carga.get("intent"),
+			parametros = carga.get("params"),
+			columnar = carga.get("formato") == "columnar",
+			id_traza = carga.get("traceId"),
+		)
+		respuesta = vars(enviar_consulta_directa(solicitud))
+		if cacheable and respuesta.get("ok"):
+			cache.guardar(clave, respuesta)
+		return respuesta
+
+	return un_solo_vuelo.ejecutar(clave, consultar)
+
+
+class ManejadorGateway(BaseHTTPRequestHandler):
+	"""Endpoints HTTP/JSON del gateway."""
+
+	def _responder(self, estado: int, cuerpo: Any) -> None:
+		contenido = json.dumps(cuerpo, ensure_ascii=False, default=str).encode("utf-8")
+		comprimir = len(contenido) > _MIN_BYTES_GZIP and "gzip" in (self.headers.get("Accept-Encoding") or "")
+		if comprimir:
+			contenido = gzip.compress(contenido)
+		self.send_response(estado)
+		self.send_header("Content-Type", "application/json; charset=utf-8")
+		if comprimir:
+			self.send_header("Content-Encoding", "gzip")
+		self.send_header("Content-Length", str(len(contenido)))
+		self.end_headers()
+		self.wfile.write(contenido)
+
+	def _leer_json(self) -> dict | None:
+		largo = int(self.headers.get("Content-Length") or 0)
+		if not largo:
+			return {}
+		try:
+			cuerpo = json.loads(self.rfile.read(largo))
+		except ValueError:
+			return None
+		return cuerpo if isinstance(cuerpo, dict) else None
+
+	def do_POST(self) -> None:
+		if self.path == "/sesiones":
+			id_sesion, vence = sesiones.emitir()
+			self._responder(200, {"sessionId": id_sesion, "expira_en": vence})
+			return
+		if self.path == "/consulta":
+			carga = self._leer_json()
+			if carga is None or not carga.get("chatInput"):
+				self._responder(400, {"ok": False, "mensaje": "Solicitud inválida: se requiere entrada de usuario."})
+				return
+			self._responder(200, atender_consulta(carga))
+			return
+		self._responder(404, {"ok": False, "mensaje": "Ruta desconocida."})
+
+	def do_GET(self) -> None:
+		if self.path == "/estado":
+			self._responder(200, {
+				"sesiones_activas": sesiones.activas(),
+				"respuestas_en_cache": len(cache),
+				"consultas_agrupadas": un_solo_vuelo.agrupadas,
+			})
+			return
+		self._responder(404, {"ok": False, "mensaje": "Ruta desconocida."})
+
+	def log_message(self, formato: str, *args) -> None:
+		print(f"[gateway] {self.address_string()} - {formato % args}")
+
+
+def iniciar_gateway(host: str = GATEWAY_HOST, puerto: int = GATEWAY_PUERTO) -> ThreadingHTTPServer:
+	"""Crea el servidor del gateway (sin iniciarlo)."""
+	return ThreadingHTTPServer((host, puerto), ManejadorGateway)
+
+
+if __name__ == "__main__":
+	servidor = iniciar_gateway()
+	print(f"Gateway escuchando en http://{GATEWAY_HOST}:{GATEWAY_PUERTO} (Ctrl+C para detener)")
+	try:
+		servidor.serve_forever()
+	except KeyboardInterrupt:
+		print("\nGateway detenido.")
+	finally:
+		servidor.server_close()
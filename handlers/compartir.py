@@ -2,9 +2,27 @@
 handlers.compartir
 Contiene `enviar_reporte_compartir` y `manejar_menu_compartir` movidos desde `main.py`.
 """
-from n8n_client import enviar_consulta
-from data_models import SolicitudN8n
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import report_generator
+from config import COMPARTIDOS_PATH
+from n8n_client import enviar_consulta, enviar_archivo, ERROR_SIN_CONEXION
+from data_models import SolicitudN8n, RespuestaN8n
+from bandeja_salida import encolar, al_entregar, tomar_avisos, pedidos_pendientes
+from catalogo import obtener_catalogo
+from utils.planificador import PRIORIDAD_COMPARTIR
+from error_handler import (
+	validar_respuesta_n8n,
+	MSG_SIN_DATOS_CONSULTA,
+	MSG_SIN_DATOS_FILTRO,
+	MSG_SIN_ENVIOS_FALLIDOS,
+)
 from ui.validaciones import (
+	PLATAFORMAS_COMPARTIR,
 	seleccionar_plataforma_compartir,
 	solicitar_email_destino,
 	solicitar_filtros_reparto,
@@ -16,35 +34,113 @@ from ui.console_utils import (
 	print_url,
 	print_error,
 	print_exito,
-	print_info
+	print_info,
+	print_warning,
 )
 
+# Intención y texto con los que se generan los datos antes de compartirlos
+# en varias plataformas. None usa la consulta escrita por el usuario.
+SOLICITUD_DATOS_POR_TIPO = {
+	"fallidos": ("reporte_fallidos", "Generar reporte de envíos fallidos"),
+	"repartidores": ("reporte_repartidor_localidad", "Generar reporte de localidad o repartidor"),
+	"personalizado": ("consulta_personalizada", None),
+}
 
-def enviar_reporte_compartir(session_id: str, chat_input: str, descripcion: str, tipo: str, intencion: str, params_extra = None) -> None:
-	"""Envía un reporte a n8n para ser compartido en una plataforma externa."""
+# Aviso cuando el reporte no trae filas, el mismo que al generarlo localmente
+MSG_SIN_DATOS_POR_TIPO = {
+	"fallidos": MSG_SIN_ENVIOS_FALLIDOS,
+	"repartidores": MSG_SIN_DATOS_FILTRO,
+	"personalizado": MSG_SIN_DATOS_CONSULTA,
+}
+
+# El registro de compartidos lo escriben la consola y el hilo de la bandeja de salida
+_lock_compartidos = threading.Lock()
+
+
+def _extraer_url(datos) -> str | None:
+	"""Busca la URL del recurso compartido en los campos que usan Drive y n8n."""
+	if not isinstance(datos, dict):
+		return None
+	return datos.get("url") or datos.get("link") or datos.get("webViewLink") or datos.get("webContentLink")
+
+
+def _dejar_en_bandeja(res: RespuestaN8n, req: SolicitudN8n, descripcion: str, ruta_archivo: str | None = None) -> bool:
+	"""
+	Si la consulta no llegó a n8n, la guarda en la bandeja de salida para reenviarla sola.
+
+	Returns:
+		bool: True si quedó (o ya estaba) en la bandeja.
+	"""
+	if res.ok or res.error != ERROR_SIN_CONEXION:
+		return False
+	if encolar(req, descripcion, ruta_archivo):
+		print_warning(f"n8n no está disponible: {descripcion} quedó en la bandeja de salida y se enviará cuando vuelva.")
+	else:
+		print_info(f"{descripcion.capitalize()} ya estaba en la bandeja de salida esperando a n8n.")
+	return True
+
+
+def mostrar_avisos_bandeja() -> None:
+	"""Informa los pedidos de la bandeja de salida que terminaron desde la última vez."""
+	avisos = tomar_avisos()
+	for aviso in avisos:
+		mensaje = obtener_mensaje_desde_data(aviso["datos"]) or aviso["mensaje"]
+		if aviso["ok"]:
+			print_exito(f"📤 Bandeja de salida: se compartió {aviso['descripcion']}. {mensaje or ''}".rstrip())
+			url = _extraer_url(aviso["datos"])
+			if url:
+				print_url(url)
+		else:
+			print_error(f"📤 Bandeja de salida: n8n rechazó {aviso['descripcion']}: {mensaje}")
+	if avisos:
+		pendientes = pedidos_pendientes()
+		if pendientes:
+			print_info(f"Quedan {pendientes} pedido(s) en la bandeja de salida.")
+
+
+def _texto_compartir(descripcion: str, plataforma: str, tipo: str | None = None, consulta: str | None = None) -> str:
+	"""
+	Texto de un pedido de compartir. En los personalizados es la consulta del
+	operador, que n8n necesita para volver a generar el reporte.
+	"""
+	if tipo == "personalizado" and consulta:
+		return consulta
+	return f"Compartir {descripcion} mediante {plataforma}"
+
+
+def _solicitud_compartir(session_id: str, chat_input: str, tipo: str, plataforma: str, params_extra = None) -> SolicitudN8n:
+	"""Arma la intención `compartir_<tipo>`: n8n genera el reporte y lo comparte en la plataforma."""
 	parametros = {
 		"tipo": tipo,
-		"intencion": intencion,
+		"intencion": plataforma,
 	}
 	if params_extra:
 		parametros.update({k: v for k, v in params_extra.items() if v is not None})
 
-	req = SolicitudN8n(
+	return SolicitudN8n(
 		entrada_chat = chat_input,
 		id_sesion = session_id,
 		intencion = f"compartir_{tipo}",
 		parametros = parametros,
+		prioridad = PRIORIDAD_COMPARTIR,
 	)
+
+
+def enviar_reporte_compartir(session_id: str, chat_input: str, descripcion: str, tipo: str, intencion: str, params_extra = None) -> None:
+	"""Envía un reporte a n8n para ser compartido en una plataforma externa."""
+	req = _solicitud_compartir(session_id, chat_input, tipo, intencion, params_extra)
 	
 	with spinner_procesando(f"Generando {descripcion} para compartir"):
 		res = enviar_consulta(req)
+	if _dejar_en_bandeja(res, req, descripcion):
+		return
 	if res.ok:
 		mensaje = obtener_mensaje_desde_data(res.datos) or res.mensaje
 		if mensaje:
 			print_mensaje_n8n(mensaje)
 		if res.datos:
 			if isinstance(res.datos, dict):
-				url = res.datos.get("url") or res.datos.get("link") or res.datos.get("webViewLink") or res.datos.get("webContentLink")
+				url = _extraer_url(res.datos)
 				if url:
 					print_url(url)
 				descripcion_extra = res.datos.get("descripcion")
@@ -58,6 +154,267 @@ def enviar_reporte_compartir(session_id: str, chat_input: str, descripcion: str,
 		print_error(f"Error al compartir el reporte: {res.mensaje}")
 
 
+def _compartir_en_plataforma(session_id: str, descripcion: str, plataforma: str, registros: list, params_extra = None) -> dict:
+	"""Envía datos ya generados a una plataforma mediante la intención `compartir_directo`."""
+	# El correo del destinatario solo le sirve a Gmail
+	excluidos = ("consulta",) if plataforma == "gmail" else ("consulta", "email_destinatario")
+	parametros = {k: v for k, v in (params_extra or {}).items() if v is not None and k not in excluidos}
+	parametros.update({"plataforma": plataforma, "datos": registros})
+
+	req = SolicitudN8n(
+		entrada_chat = _texto_compartir(descripcion, plataforma),
+		id_sesion = session_id,
+		intencion = "compartir_directo",
+		parametros = parametros,
+		prioridad = PRIORIDAD_COMPARTIR,
+	)
+	res = enviar_consulta(req)
+	en_bandeja = not res.ok and res.error == ERROR_SIN_CONEXION
+	if en_bandeja:
+		encolar(req, f"{descripcion} en {plataforma}")
+	return {
+		"ok": res.ok,
+		"url": _extraer_url(res.datos) if res.ok else None,
+		"mensaje": (obtener_mensaje_desde_data(res.datos) or res.mensaje),
+		"en_bandeja": en_bandeja,
+	}
+
+
+def enviar_reporte_multiplataforma(session_id: str, chat_input: str, descripcion: str, tipo: str, plataformas, params_extra = None) -> dict[str, dict]:
+	"""
+	Genera un reporte una sola vez y lo comparte en varias plataformas en paralelo.
+
+	Los datos se piden a n8n una única vez (un solo ciclo de PIKI + SQL) y luego
+	se envían de forma concurrente a cada plataforma reutilizando esa misma
+	carga, en lugar de regenerar el reporte por cada destino.
+
+	Args:
+		session_id: ID de sesión del operador.
+		chat_input: Texto de la consulta (usado en reportes personalizados).
+		descripcion: Descripción del reporte para los mensajes en consola.
+		tipo: "fallidos", "repartidores" o "personalizado".
+		plataformas: Plataformas destino (ej: ["drive", "gmail"]).
+		params_extra: Filtros del reporte y email del destinatario.
+
+	Si n8n no está disponible, cada plataforma queda en la bandeja de salida
+	como un pedido `compartir_<tipo>` independiente.
+
+	Returns:
+		dict[str, dict]: Resultado por plataforma con las claves "ok", "url",
+		"mensaje" y "en_bandeja".
+	"""
+	intencion_datos, entrada_datos = SOLICITUD_DATOS_POR_TIPO[tipo]
+	filtros = {
+		k: v for k, v in (params_extra or {}).items()
+		if v is not None and k not in ("email_destinatario", "consulta")
+	}
+	req = SolicitudN8n(
+		entrada_chat = entrada_datos or chat_input,
+		id_sesion = session_id,
+		intencion = intencion_datos,
+		parametros = filtros,
+		prioridad = PRIORIDAD_COMPARTIR,
+	)
+	with spinner_procesando(f"Generando {descripcion}"):
+		res = enviar_consulta(req)
+	if not res.ok and res.error == ERROR_SIN_CONEXION:
+		for plataforma in plataformas:
+			params_plataforma = dict(params_extra or {})
+			if plataforma != "gmail":
+				params_plataforma.pop("email_destinatario", None)
+			_dejar_en_bandeja(
+				res,
+				_solicitud_compartir(
+					session_id,
+					_texto_compartir(descripcion, plataforma, tipo, params_plataforma.get("consulta")),
+					tipo,
+					plataforma,
+					params_plataforma,
+				),
+				f"{descripcion} en {plataforma}",
+			)
+		return {
+			plataforma: {"ok": False, "url": None, "mensaje": res.mensaje, "en_bandeja": True}
+			for plataforma in plataformas
+		}
+	valido, registros, _ = validar_respuesta_n8n(res, MSG_SIN_DATOS_POR_TIPO[tipo])
+	if not valido:
+		return {}
+
+	with spinner_procesando(f"Compartiendo {descripcion} en {', '.join(plataformas)}"):
+		with ThreadPoolExecutor(max_workers=len(plataformas)) as pool:
+			futuros = {
+				plataforma: pool.submit(_compartir_en_plataforma, session_id, descripcion, plataforma, registros, params_extra)
+				for plataforma in plataformas
+			}
+			resultados = {plataforma: futuro.result() for plataforma, futuro in futuros.items()}
+
+	for plataforma, resultado in resultados.items():
+		if resultado["ok"]:
+			print_exito(f"{plataforma.capitalize()}: {resultado['mensaje'] or 'reporte compartido.'}")
+			if resultado["url"]:
+				print_url(resultado["url"], label=f"Acceso directo ({plataforma})")
+		elif resultado["en_bandeja"]:
+			print_warning(f"{plataforma.capitalize()}: n8n no está disponible; quedó en la bandeja de salida.")
+		else:
+			print_error(f"{plataforma.capitalize()}: {resultado['mensaje']}")
+	return resultados
+
+
+def _hash_archivo(ruta: str) -> str:
+	"""Calcula el SHA-256 del archivo leyéndolo por bloques."""
+	digest = hashlib.sha256()
+	with open(ruta, "rb") as archivo:
+		for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+			digest.update(bloque)
+	return digest.hexdigest()
+
+
+def _cargar_compartidos() -> dict:
+	"""Lee el registro de archivos ya compartidos (vacío si no existe o está dañado)."""
+	try:
+		with open(COMPARTIDOS_PATH, encoding="utf-8") as archivo:
+			return json.load(archivo)
+	except (OSError, ValueError):
+		return {}
+
+
+def _clave_compartido(sha256: str, plataforma: str, email_destinatario: str | None) -> str:
+	"""Identifica un archivo compartido: contenido, plataforma y destinatario."""
+	return f"{sha256}|{plataforma}|{email_destinatario or ''}"
+
+
+def _resultado_compartido(res: RespuestaN8n) -> dict:
+	return {
+		"ok": res.ok,
+		"url": _extraer_url(res.datos) if res.ok else None,
+		"mensaje": (obtener_mensaje_desde_data(res.datos) or res.mensaje),
+	}
+
+
+def _registrar_compartido(clave: str, resultado: dict) -> None:
+	"""Agrega un envío exitoso al registro de archivos compartidos."""
+	with _lock_compartidos:
+		compartidos = _cargar_compartidos()
+		compartidos[clave] = resultado
+		directorio = os.path.dirname(COMPARTIDOS_PATH)
+		if directorio:
+			os.makedirs(directorio, exist_ok=True)
+		with open(COMPARTIDOS_PATH, "w", encoding="utf-8") as archivo:
+			json.dump(compartidos, archivo, ensure_ascii=False, indent=2)
+
+
+def _registrar_archivo_entregado(solicitud: SolicitudN8n, res: RespuestaN8n) -> None:
+	"""Registra un archivo que la bandeja de salida terminó de subir, para no volver a subirlo."""
+	parametros = solicitud.parametros
+	if not parametros.get("sha256"):
+		return
+	clave = _clave_compartido(parametros["sha256"], parametros.get("plataforma"), parametros.get("email_destinatario"))
+	try:
+		_registrar_compartido(clave, _resultado_compartido(res))
+	except OSError:
+		# Sin registro, el próximo intento de compartirlo lo sube de nuevo
+		pass
+
+
+al_entregar("compartir_archivo", _registrar_archivo_entregado)
+
+
+def compartir_archivo_local(session_id: str, ruta: str, plataforma: str, email_destinatario: str | None = None, forzar: bool = False) -> dict:
+	"""
+	Comparte un reporte ya generado localmente subiendo el archivo a n8n.
+
+	El workflow adjunta o sube el archivo tal cual, sin repetir el ciclo de
+	PIKI + SQL + conversión a .xlsx. Los envíos se deduplican por el hash del
+	contenido: si el mismo archivo ya se compartió en la misma plataforma (y al
+	mismo destinatario), se devuelve el resultado anterior.
+
+	Args:
+		session_id: ID de sesión del operador.
+		ruta: Ruta del archivo a compartir.
+		plataforma: "drive" o "gmail".
+		email_destinatario: Correo destino (solo Gmail).
+		forzar: Si es True, reenvía aunque ya se haya compartido.
+
+	Si n8n no está disponible, el envío queda en la bandeja de salida con la
+	ruta del archivo.
+
+	Returns:
+		dict: Resultado con las claves "ok", "url", "mensaje", "repetido" y "en_bandeja".
+	"""
+	sha256 = _hash_archivo(ruta)
+	clave = _clave_compartido(sha256, plataforma, email_destinatario)
+	anterior = _cargar_compartidos().get(clave)
+	if anterior and not forzar:
+		return {**anterior, "repetido": True, "en_bandeja": False}
+
+	nombre = os.path.basename(ruta)
+	parametros = {
+		"plataforma": plataforma,
+		"nombre_archivo": nombre,
+		"sha256": sha256,
+	}
+	if email_destinatario:
+		parametros["email_destinatario"] = email_destinatario
+
+	req = SolicitudN8n(
+		entrada_chat = f"Compartir el archivo {nombre} mediante {plataforma}",
+		id_sesion = session_id,
+		intencion = "compartir_archivo",
+		parametros = parametros,
+		prioridad = PRIORIDAD_COMPARTIR,
+	)
+	with spinner_procesando(f"Subiendo {nombre} a {plataforma}"):
+		res = enviar_archivo(req, ruta)
+
+	resultado = _resultado_compartido(res)
+	if res.ok:
+		_registrar_compartido(clave, resultado)
+	en_bandeja = not res.ok and res.error == ERROR_SIN_CONEXION
+	if en_bandeja:
+		encolar(req, f"el archivo {nombre} en {plataforma}", ruta)
+	return {**resultado, "repetido": False, "en_bandeja": en_bandeja}
+
+
+def compartir_ultimo_reporte(session_id: str) -> bool:
+	"""Comparte el último reporte generado en esta sesión sin regenerarlo en n8n."""
+	ruta = report_generator.LAST_REPORT_PATH
+	if not ruta or not os.path.isfile(ruta):
+		print_info("Todavía no se generó ningún reporte local en esta sesión.")
+		return True
+
+	print_info(f"Último reporte: {ruta}")
+	plataforma = seleccionar_plataforma_compartir()
+	if plataforma == "volver":
+		return True
+	if plataforma == "salir":
+		print("Saliendo del programa. Hasta luego!")
+		return False
+
+	plataformas = PLATAFORMAS_COMPARTIR if plataforma == "todas" else (plataforma,)
+	correo = solicitar_email_destino() if "gmail" in plataformas else None
+
+	for destino in plataformas:
+		resultado = compartir_archivo_local(session_id, ruta, destino, correo if destino == "gmail" else None)
+		if resultado["repetido"]:
+			print_info(f"Este archivo ya se había compartido en {destino}.")
+			if input("¿Desea reenviarlo de todas formas? (s/N): ").strip().lower() != "s":
+				if resultado["url"]:
+					print_url(resultado["url"])
+				continue
+			resultado = compartir_archivo_local(session_id, ruta, destino, correo if destino == "gmail" else None, forzar=True)
+
+		if resultado["ok"]:
+			print_exito(f"{destino.capitalize()}: {resultado['mensaje'] or 'archivo compartido.'}")
+			if resultado["url"]:
+				print_url(resultado["url"])
+		elif resultado["en_bandeja"]:
+			print_warning(f"{destino.capitalize()}: n8n no está disponible; el archivo quedó en la bandeja de salida.")
+		else:
+			print_error(f"Error al compartir el archivo en {destino}: {resultado['mensaje']}")
+	return True
+
+
 def manejar_menu_compartir(session_id: str) -> bool:
 	"""Maneja la lógica del submenú de compartir reportes."""
 	from ui.menus import menu_compartir
@@ -72,7 +429,9 @@ def manejar_menu_compartir(session_id: str) -> bool:
 			tipo = "fallidos"
 			parametros = {}
 		elif opcion == "2":
-			filtros = solicitar_filtros_reparto()
+			with spinner_procesando("Cargando localidades y repartidores"):
+				catalogo = obtener_catalogo(session_id)
+			filtros = solicitar_filtros_reparto(catalogo)
 			if not filtros:
 				continue
 			descripcion = "el reporte de repartidores"
@@ -89,6 +448,8 @@ def manejar_menu_compartir(session_id: str) -> bool:
 			parametros = {"consulta": consulta}
 		elif opcion == "4":
 			return True
+		elif opcion == "5":
+			return compartir_ultimo_reporte(session_id)
 		elif opcion == "0":
 			print("Saliendo del programa. Hasta luego!")
 			return False
@@ -104,15 +465,22 @@ def manejar_menu_compartir(session_id: str) -> bool:
 			return False
 
 		# Solo solicitar email si la plataforma es Gmail
-		if intencion == "gmail":
+		if intencion in ("gmail", "todas"):
 			correo = solicitar_email_destino()
 			parametros["email_destinatario"] = correo
 
-		entrada_chat = (
-			parametros.get("consulta")
-			if tipo == "personalizado"
-			else f"Compartir {descripcion} mediante {intencion}"
-		)
+		if intencion == "todas":
+			enviar_reporte_multiplataforma(
+				session_id = session_id,
+				chat_input = parametros.get("consulta") or f"Generar {descripcion}",
+				descripcion = descripcion,
+				tipo = tipo,
+				plataformas = PLATAFORMAS_COMPARTIR,
+				params_extra = parametros,
+			)
+			return True
+
+		entrada_chat = _texto_compartir(descripcion, intencion, tipo, parametros.get("consulta"))
 
 		enviar_reporte_compartir(
 			session_id = session_id,
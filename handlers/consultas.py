@@ -3,19 +3,57 @@ handlers.consultas
 Contiene las funciones `consultar_estado_envio` y `consulta_personalizada_directa`.
 Funciones movidas desde `main.py` sin cambios en la lógica.
 """
-from n8n_client import enviar_consulta
-from data_models import SolicitudN8n
-from ui.validaciones import validar_codigo_envio
-from utils.formateo import extraer_mensaje_y_datos, formatear_datos, filtrar_registros_vacios
+from config import (
+	REPLICA_HABILITADA,
+	REPLICA_MAX_ANTIGUEDAD,
+	N8N_STREAM_URL,
+	ROUTER_LOCAL_HABILITADO,
+	VISOR_UMBRAL,
+	PRESUPUESTO_DESVIAR,
+)
+from n8n_client import enviar_consulta, enviar_consulta_streaming
+from data_models import SolicitudN8n, RespuestaN8n
+from replica_local import buscar_envio, describir_antiguedad, sincronizar_replica
+from handlers.compartir import mostrar_avisos_bandeja
+from utils.contexto import obtener_digesto, parametros_con_contexto
+from utils.router_local import rutear_mensaje, INTENCION_ESTADO
+from utils.metricas import resumen as resumen_metricas
+from utils.planificador import planificador
+from utils.trazas import ultima_traza, spans_de_traza
+from utils.plazos import describir_espera, resumen_plazos
+from utils.costos import estado_presupuesto, informe_costos, ESTADO_AVISO, ESTADO_EXCEDIDO
+from utils.helpers import obtener_configuracion_local, exportar_reporte_local, mostrar_resultado_reporte
+from utils.consultas_guardadas import (
+	guardar_consulta,
+	listar_consultas,
+	obtener_consulta,
+	eliminar_consulta,
+	ejecutar_consulta_guardada,
+	buscar_por_pregunta,
+)
+from ui.validaciones import validar_codigo_envio, confirmar
+from ui.visor import mostrar_resultados_paginados
+from utils.formateo import (
+	extraer_mensaje_y_datos,
+	extraer_mensaje_parcial,
+	formatear_datos,
+	filtrar_registros_vacios,
+)
 from ui.console_utils import (
 	print_procesando,
 	spinner_procesando,
+	respuesta_en_vivo,
 	print_mensaje_n8n,
 	print_url,
 	print_error,
 	print_campo,
 	print_info,
-	print_separador
+	print_separador,
+	print_warning,
+	print_exito,
+	print_metricas,
+	print_costos,
+	print_plazos,
 )
 
 
@@ -33,6 +71,8 @@ def consultar_estado_envio(session_id: str) -> None:
 		print_error("Código de envío inválido. Debe contener entre 1 y 20 caracteres alfanuméricos.")
 		return
 
+	if REPLICA_HABILITADA and _consultar_desde_replica(codigo):
+		return
 	
 	req = SolicitudN8n(
 		entrada_chat = f"Consultar estado del envío con código {codigo}",
@@ -41,10 +81,11 @@ def consultar_estado_envio(session_id: str) -> None:
 		parametros = {"codigo": codigo},
 	)
 	
-	with spinner_procesando("Consultando estado del envío..."):
+	with spinner_procesando("Consultando estado del envío...", describir_espera(req.intencion)):
 		res = enviar_consulta(req)
 	
 	mensaje, datos = extraer_mensaje_y_datos(res)
+	datos = filtrar_registros_vacios(datos)
 
 	if mensaje:
 		print_mensaje_n8n(mensaje)
@@ -74,6 +115,133 @@ def consultar_estado_envio(session_id: str) -> None:
 		print_error(f"Error al consultar el envío: {res.mensaje}")
 
 
+def _consultar_desde_replica(codigo: str) -> bool:
+	"""
+	Intenta responder la consulta de estado desde la réplica local.
+
+	Returns:
+		bool: True si el envío estaba en la réplica y ya se mostró.
+	"""
+	registro, antiguedad = buscar_envio(codigo)
+	if registro is None:
+		return False
+
+	texto_antiguedad = describir_antiguedad(antiguedad)
+	if antiguedad is None or antiguedad > REPLICA_MAX_ANTIGUEDAD:
+		print_warning(f"Datos de la réplica local, desactualizados ({texto_antiguedad}). Sincronice para refrescarlos.")
+	else:
+		print_info(f"Datos de la réplica local (sincronizada {texto_antiguedad}).")
+
+	print_separador()
+	for clave, valor in formatear_datos(registro).items():
+		print_campo(clave, valor)
+	print_separador()
+	return True
+
+
+def _responder_sin_agente(session_id: str, consulta: str, forzar: bool = False) -> RespuestaN8n | None:
+	"""
+	Resuelve localmente los mensajes del chat que no necesitan al agente.
+
+	Los códigos de envío se buscan primero en la réplica local; los pedidos
+	de estado y de reportes se envían con su intención estructurada.
+
+	Args:
+		forzar: Rutea aunque ROUTER_LOCAL_HABILITADO esté desactivado (presupuesto agotado).
+
+	Returns:
+		RespuestaN8n | None: La respuesta, o None si el mensaje debe ir a Piki
+		(no se reconoció o la ruta estructurada falló).
+	"""
+	if not ROUTER_LOCAL_HABILITADO and not forzar:
+		return None
+	ruta = rutear_mensaje(consulta)
+	if ruta is None:
+		return None
+	intencion, parametros = ruta
+
+	if intencion == INTENCION_ESTADO and REPLICA_HABILITADA:
+		encontrados = [buscar_envio(codigo) for codigo in parametros["codigo"]]
+		if all(registro is not None for registro, _ in encontrados):
+			antiguedad = max((a for _, a in encontrados if a is not None), default=None)
+			aviso = "desactualizada" if antiguedad is None or antiguedad > REPLICA_MAX_ANTIGUEDAD else "sincronizada"
+			return RespuestaN8n(
+				ok=True,
+				mensaje=f"Datos de la réplica local ({aviso} {describir_antiguedad(antiguedad)}).",
+				datos=[registro for registro, _ in encontrados],
+				intencion=INTENCION_ESTADO,
+			)
+
+	req = SolicitudN8n(
+		entrada_chat=consulta,
+		id_sesion=session_id,
+		intencion=intencion,
+		parametros=parametros,
+	)
+	with spinner_procesando("Consultando (sin pasar por Piki)", describir_espera(req.intencion)):
+		res = enviar_consulta(req)
+	if not res.ok:
+		return None
+	if not res.mensaje and not filtrar_registros_vacios(extraer_mensaje_y_datos(res)[1]):
+		res.mensaje = "No se encontraron envíos para ese pedido."
+	return res
+
+
+def _controlar_presupuesto(session_id: str, consulta: str) -> RespuestaN8n | None:
+	"""
+	Aplica los presupuestos de tokens antes de enviar una consulta al agente.
+
+	Cerca del límite solo advierte. Con el presupuesto agotado (y
+	PRESUPUESTO_DESVIAR activo) intenta responder sin LLM: primero por el ruteo
+	local, luego con una consulta guardada de la misma pregunta; si no hay
+	camino alternativo, pide confirmación para usar el agente igual.
+
+	Returns:
+		RespuestaN8n | None: La respuesta alternativa (o el aviso de que no se
+		envió), o None si la consulta puede ir al agente.
+	"""
+	estado, detalle = estado_presupuesto(session_id)
+	if estado == ESTADO_AVISO:
+		print_warning(f"Presupuesto de tokens casi agotado ({detalle}).")
+		return None
+	if estado != ESTADO_EXCEDIDO:
+		return None
+
+	print_warning(f"Presupuesto de tokens agotado ({detalle}).")
+	if not PRESUPUESTO_DESVIAR:
+		return None
+
+	res = _responder_sin_agente(session_id, consulta, forzar=True)
+	if res is not None:
+		return res
+	guardada = buscar_por_pregunta(consulta)
+	if guardada is not None:
+		with spinner_procesando(f"Ejecutando la consulta guardada '{guardada['nombre']}' (sin pasar por Piki)"):
+			return ejecutar_consulta_guardada(session_id, guardada)
+
+	if confirmar("No hay una respuesta sin LLM para este pedido. ¿Consultar a Piki de todos modos?"):
+		return None
+	return RespuestaN8n(
+		ok=False,
+		mensaje="Consulta no enviada: se alcanzó el presupuesto de tokens. Use /costos para ver el consumo.",
+	)
+
+
+def sincronizar_replica_local(session_id: str) -> None:
+	"""Trae de n8n los envíos modificados desde la última sincronización."""
+	if not REPLICA_HABILITADA:
+		print_info("La réplica local está deshabilitada. Defina REPLICA_HABILITADA=1 para usarla.")
+		return
+
+	with spinner_procesando("Sincronizando réplica local de envíos"):
+		ok, total, error = sincronizar_replica(session_id)
+
+	if ok:
+		print_exito(f"Réplica sincronizada: {total} envío{'s' if total != 1 else ''} actualizado{'s' if total != 1 else ''}.")
+	else:
+		print_error(f"Sincronización incompleta ({total} envíos aplicados): {error}")
+
+
 def consulta_personalizada_directa(session_id: str) -> None:
 	"""Procesa una consulta personalizada y muestra resultados directamente en consola."""
 	print_info("Presiona Enter para volver al menú")
@@ -84,17 +252,19 @@ def consulta_personalizada_directa(session_id: str) -> None:
 		print_info("Operación cancelada.")
 		return
 	
-
-	
-	req = SolicitudN8n(
-		entrada_chat = consulta,
-		id_sesion = session_id,
-		intencion = "consulta_personalizada",
-	)
-	with spinner_procesando("Procesando su consulta"):
-		res = enviar_consulta(req)
+	res = _controlar_presupuesto(session_id, consulta)
+	if res is None:
+		req = SolicitudN8n(
+			entrada_chat = consulta,
+			id_sesion = session_id,
+			intencion = "consulta_personalizada",
+			parametros = parametros_con_contexto(session_id),
+		)
+		with spinner_procesando("Procesando su consulta", describir_espera(req.intencion)):
+			res = enviar_consulta(req)
 	
 	mensaje, datos = extraer_mensaje_y_datos(res)
+	obtener_digesto(session_id).registrar(consulta, datos)
 	
 	# Mostrar el mensaje si existe
 	if mensaje:
@@ -102,7 +272,10 @@ def consulta_personalizada_directa(session_id: str) -> None:
 	
 	# Mostrar los datos si existen
 	if datos:
-		if isinstance(datos, list):
+		if isinstance(datos, list) and len(datos) >= VISOR_UMBRAL:
+			# Muchos registros: visor paginado en lugar de imprimirlos todos
+			mostrar_resultados_paginados(datos, titulo=consulta)
+		elif isinstance(datos, list):
 			# Si es una lista de registros (como repartidores)
 			print_separador()
 			for idx, registro in enumerate(datos, 1):
@@ -149,6 +322,153 @@ def consulta_personalizada_directa(session_id: str) -> None:
 			print("La consulta fue procesada correctamente, pero no se recibieron datos.")
 
 
+AYUDA_COMANDOS = (
+	"/guardar <nombre>   Guarda la última consulta respondida con SQL\n"
+	"/consultas          Lista las consultas guardadas\n"
+	"/ejecutar <nombre>  Repite una consulta guardada sin pasar por Piki\n"
+	"/borrar <nombre>    Elimina una consulta guardada\n"
+	"/metricas           Muestra esperas del planificador, plazos y otras métricas\n"
+	"/costos [exportar]  Tokens y tiempos del agente por intención y por sesión\n"
+	"/traza              Fases y ID de traza de la última consulta (para reportar demoras)"
+)
+
+
+def _pedir_valores(consulta: dict) -> list[str]:
+	"""Pide los valores de los parámetros de una consulta guardada (Enter = valor original)."""
+	valores = []
+	for numero, original in enumerate(consulta["parametros"], 1):
+		nuevo = input(f"  ${numero} [{original}]: ").strip()
+		valores.append(nuevo or original)
+	return valores
+
+
+def _mostrar_costos(session_id: str, exportar: bool = False) -> None:
+	"""Muestra (y opcionalmente exporta) el consumo del agente y el estado del presupuesto."""
+	informe = informe_costos()
+	print_costos(informe["por_intencion"], "intencion", "Consumo por intención (esta ejecución)")
+	print_costos(informe["hoy"], "intencion", "Consumo del agente hoy")
+	print_costos(informe["por_sesion"], "sesion", "Consumo por sesión")
+	estado, detalle = estado_presupuesto(session_id)
+	if estado in (ESTADO_AVISO, ESTADO_EXCEDIDO):
+		print_warning(f"Presupuesto {detalle}")
+	elif detalle:
+		print_info(f"Presupuesto {detalle}")
+	if any(fila["tokens_estimados"] for fila in informe["hoy"]):
+		print_info("~ = tokens estimados (el modelo no informó el uso).")
+	if not exportar:
+		return
+
+	# Las tres tablas en un solo archivo, con la sección y la clave de cada fila
+	filas = []
+	for seccion, clave in (("por_intencion", "intencion"), ("hoy", "intencion"), ("por_sesion", "sesion")):
+		for fila in informe[seccion]:
+			filas.append({"seccion": seccion, "clave": fila.pop(clave), **fila})
+	if not filas:
+		return
+	config = obtener_configuracion_local()
+	if config is None:
+		return
+	path = exportar_reporte_local(filas, "costos_agente", *config)
+	if path:
+		mostrar_resultado_reporte(path)
+
+
+def _mostrar_traza() -> None:
+	"""Muestra el ID de traza, la ejecución de n8n y la duración de cada fase de la última consulta."""
+	id_traza = ultima_traza()
+	if id_traza is None:
+		print_info("Todavía no hay consultas medidas.")
+		return
+	spans = spans_de_traza(id_traza)
+	print_campo("Traza", id_traza)
+	ejecucion = next((s.atributos["n8n.execution_id"] for s in spans if "n8n.execution_id" in s.atributos), None)
+	if ejecucion:
+		print_campo("Ejecución de n8n", ejecucion)
+	# Sangría según el span padre (las fases sin padre en la lista van al margen)
+	niveles: dict[str, int] = {}
+	for fase in spans:
+		niveles[fase.id_span] = niveles.get(fase.id_padre, -1) + 1
+		detalle = f"{fase.duracion_s:.3f} s" + (f" ⚠️  {fase.error}" if fase.error else "")
+		print_campo("  " * niveles[fase.id_span] + fase.nombre, detalle)
+
+
+def manejar_comando_consultas(session_id: str, comando: str, ultima: tuple[str, str, str | None] | None):
+	"""
+	Atiende los comandos del chat: biblioteca de consultas guardadas, `/metricas`, `/costos` y `/traza`.
+
+	Args:
+		session_id: ID de sesión del operador.
+		comando: Texto ingresado (empieza con "/").
+		ultima: (pregunta, query_sql, consulta_id) de la última respuesta de Piki con SQL.
+
+	Returns:
+		RespuestaN8n | None: La respuesta si se ejecutó una consulta guardada
+		(para mostrarla como cualquier otra respuesta del chat), o None.
+	"""
+	accion, _, nombre = comando[1:].partition(" ")
+	accion, nombre = accion.lower(), nombre.strip()
+
+	if accion == "metricas":
+		estado = planificador.estado()
+		en_espera = ", ".join(f"{clase} {n}" for clase, n in estado["en_espera"].items() if n) or "ninguna"
+		print_info(f"Consultas en curso: {estado['en_curso']} · en espera: {en_espera}")
+		print_metricas(resumen_metricas())
+		print_plazos(resumen_plazos())
+		return None
+
+	if accion == "costos":
+		_mostrar_costos(session_id, exportar=nombre.lower() == "exportar")
+		return None
+
+	if accion == "traza":
+		_mostrar_traza()
+		return None
+
+	if accion == "consultas":
+		consultas = listar_consultas()
+		if not consultas:
+			print_info("No hay consultas guardadas. Use /guardar <nombre> después de una respuesta.")
+		for consulta in consultas:
+			parametros = f" ({len(consulta['parametros'])} parámetros)" if consulta["parametros"] else ""
+			print_campo(consulta["nombre"], f"{consulta['pregunta']}{parametros}")
+		return None
+
+	if accion in ("guardar", "ejecutar", "borrar") and not nombre:
+		print_warning(f"Falta el nombre: /{accion} <nombre>")
+		return None
+
+	if accion == "guardar":
+		if not ultima:
+			print_warning("Todavía no hay una respuesta de Piki con consulta SQL para guardar.")
+			return None
+		try:
+			consulta = guardar_consulta(nombre, *ultima)
+		except ValueError as error:
+			print_error(str(error))
+			return None
+		print_exito(f"Consulta '{consulta['nombre']}' guardada. Repítala con /ejecutar {consulta['nombre']}")
+		return None
+
+	if accion == "borrar":
+		if eliminar_consulta(nombre):
+			print_exito(f"Consulta '{nombre}' eliminada.")
+		else:
+			print_warning(f"No existe la consulta '{nombre}'.")
+		return None
+
+	if accion == "ejecutar":
+		consulta = obtener_consulta(nombre)
+		if consulta is None:
+			print_warning(f"No existe la consulta '{nombre}'. Use /consultas para ver la lista.")
+			return None
+		valores = _pedir_valores(consulta)
+		with spinner_procesando(f"Ejecutando '{consulta['nombre']}'"):
+			return ejecutar_consulta_guardada(session_id, consulta, valores)
+
+	print_info(AYUDA_COMANDOS)
+	return None
+
+
 def iniciar_chat_con_piki(session_id: str) -> None:
 	"""
 	Inicia un chat conversacional infinito con Piki.
@@ -170,11 +490,18 @@ def iniciar_chat_con_piki(session_id: str) -> None:
 	console.print("║          💬 Chat con Piki - Modo Conversacional           ║", style="bold cyan")
 	console.print("╚═══════════════════════════════════════════════════════════╝", style="bold cyan")
 	console.print("\nEscribe 'salir', 'exit' o 'chau' para volver al menú", style="dim italic")
+	console.print("Escribe /ayuda para ver los comandos de consultas guardadas", style="dim italic")
 	console.print("Presiona Ctrl+C en cualquier momento para salir\n", style="dim italic")
 	print_separador("═", 60)
 	
+	# Última pregunta respondida con SQL (para /guardar)
+	ultima_con_sql = None
+	
 	try:
 		while True:
+			# Pedidos de compartir que la bandeja de salida terminó mientras tanto
+			mostrar_avisos_bandeja()
+
 			# Solicitar entrada del usuario
 			console.print("\n👤 Tú: ", style="bold yellow", end="")
 			try:
@@ -193,22 +520,51 @@ def iniciar_chat_con_piki(session_id: str) -> None:
 				console.print("⚠️  Por favor escribe algo o usa 'salir' para volver al menú", style="yellow")
 				continue
 			
-			# Crear solicitud y enviar a n8n
-			req = SolicitudN8n(
-				entrada_chat=consulta,
-				id_sesion=session_id,
-				intencion="consulta_personalizada",
-			)
-			
-			# Mostrar spinner mientras procesa
-			with spinner_procesando("Piki está pensando"):
-				res = enviar_consulta(req)
+			# Comandos de consultas guardadas (/guardar, /consultas, /ejecutar, ...)
+			if consulta.startswith("/"):
+				res = manejar_comando_consultas(session_id, consulta, ultima_con_sql)
+				if res is None:
+					continue
+				transmitido = False
+			elif (res := _responder_sin_agente(session_id, consulta)) is not None:
+				# Pedido reconocido localmente (estado, reportes): no pasa por el agente
+				transmitido = False
+			elif (res := _controlar_presupuesto(session_id, consulta)) is not None:
+				# Presupuesto de tokens agotado: respuesta sin LLM (o consulta no enviada)
+				transmitido = False
+			else:
+				# Crear solicitud y enviar a n8n
+				req = SolicitudN8n(
+					entrada_chat=consulta,
+					id_sesion=session_id,
+					intencion="consulta_personalizada",
+					parametros=parametros_con_contexto(session_id),
+				)
+				
+				# Mostrar spinner mientras procesa; con streaming, el mensaje se
+				# muestra a medida que Piki lo va generando
+				transmitido = bool(N8N_STREAM_URL)
+				if transmitido:
+					print_separador("─", 60)
+					with respuesta_en_vivo("Piki está pensando", espera=describir_espera(req.intencion)) as actualizar:
+						res = enviar_consulta_streaming(
+							req,
+							lambda texto: actualizar(extraer_mensaje_parcial(texto)),
+						)
+						actualizar(res.mensaje if res.ok else None)
+				else:
+					with spinner_procesando("Piki está pensando", describir_espera(req.intencion)):
+						res = enviar_consulta(req)
+				
+				if res.ok and res.query_sql:
+					ultima_con_sql = (consulta, res.query_sql, res.consulta_id)
 			
 			# Extraer mensaje y datos de la respuesta
 			mensaje, datos = extraer_mensaje_y_datos(res)
 			
 			# Filtrar registros completamente vacíos ({})
 			datos = filtrar_registros_vacios(datos)
+			obtener_digesto(session_id).registrar(consulta, datos)
 			
 			# ─────────────────────────────────────────────────────────────────
 			# DETECCIÓN DE INTENCIÓN: Guardado Local
@@ -237,17 +593,22 @@ def iniciar_chat_con_piki(session_id: str) -> None:
 			
 			# ─────────────────────────────────────────────────────────────────
 				
-			# Mostrar respuesta de Piki
-			print_separador("─", 60)
-			console.print("🤖 Piki: ", style="bold cyan", end="")
-			
-			# Mostrar el mensaje si existe
-			if mensaje:
-				console.print(mensaje, style="cyan")
+			# Mostrar respuesta de Piki (si llegó por streaming, ya está en pantalla)
+			if not transmitido or not res.ok:
+				print_separador("─", 60)
+				console.print("🤖 Piki: ", style="bold cyan", end="")
+				
+				# Mostrar el mensaje si existe
+				if mensaje:
+					console.print(mensaje, style="cyan")
 			
 			# Mostrar los datos si existen
 			if datos:
-				if isinstance(datos, list) and len(datos) > 0:
+				if isinstance(datos, list) and len(datos) >= VISOR_UMBRAL:
+					# Muchos registros: visor paginado en lugar de imprimirlos todos
+					console.print()
+					mostrar_resultados_paginados(datos, titulo=consulta)
+				elif isinstance(datos, list) and len(datos) > 0:
 					console.print()
 					for idx, registro in enumerate(datos, 1):
 						console.print(f"\n  📋 Registro {idx}", style="bold blue")
@@ -3,9 +3,23 @@ handlers.reportes
 Funciones relacionadas con la generación de reportes y el submenú local.
 Movidas desde `main.py` sin cambios.
 """
-from n8n_client import enviar_consulta
+import re
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+from rich.live import Live
+
+from config import TABLERO_INTERVALO, TABLERO_INTERVALO_CON_EVENTOS, TABLERO_LIMITE
+from n8n_client import enviar_consulta, enviar_paquete, INTENCION_PAQUETE
 from data_models import SolicitudN8n
-from report_generator import generar_reporte
+from notificaciones import notificaciones_activas, suscribir, desuscribir
+from catalogo import obtener_catalogo
+from utils.planificador import PRIORIDAD_FONDO
+from utils.plazos import describir_espera
+
+from report_generator import generar_reporte, generar_reporte_por_grupo, EscritorIncremental
 from error_handler import (
 	validar_respuesta_n8n,
 	mostrar_mensaje_si_existe,
@@ -13,20 +27,104 @@ from error_handler import (
 	MSG_SIN_DATOS_FILTRO,
 	MSG_SIN_DATOS_CONSULTA,
 )
-from ui.validaciones import solicitar_filtros_reparto
+from ui.validaciones import solicitar_filtros_reparto, solicitar_opciones_reporte, solicitar_paquete_matutino, confirmar
 from utils.helpers import obtener_configuracion_local, exportar_reporte_local, mostrar_resultado_reporte
-from ui.console_utils import spinner_procesando
+from ui.console_utils import console, spinner_procesando, barra_progreso, print_error, print_info, print_paquete
+from ui.tablero import armar_tablero
+from ui.visor import mostrar_resultados_paginados
+from utils.fragmentos import dividir_rango, consultar_por_fragmentos
+from utils.formateo import normalizar_registros_respuesta
+
+# Columnas que el workflow acepta en `params.columns` (misma lista blanca que
+# el nodo "Reportes - Arma la consulta SQL")
+COLUMNAS_FALLIDOS = (
+	"codigo_envio", "remitente_nombre", "remitente_email", "destinatario_nombre",
+	"destinatario_direccion", "motivo_de_fallo", "fecha_fallo", "fecha_creacion",
+)
+COLUMNAS_REPARTO = (
+	"codigo_envio", "tipo_envio", "fecha_creacion", "nombre_destinatario", "apellido_destinatario",
+	"localidad_destino", "provincia_destino", "direccion_destino_completa", "estado_actual",
+	"fecha_ultimo_movimiento", "centro_actual", "repartidor_actual", "motivo_fallo",
+)
+
+# Columna por la que se puede separar el reporte según el filtro con varios valores
+COLUMNA_SEPARACION = {
+	"repartidor": ("repartidor_actual", "repartidor"),
+	"localidad": ("localidad_destino", "localidad"),
+}
+
+
+def _preguntar_separacion(filtros: dict) -> str | None:
+	"""
+	Si se pidieron varios repartidores o localidades, ofrece separar el reporte.
+
+	Returns:
+		str | None: Columna por la que separar, o None para un reporte único.
+	"""
+	for filtro, (columna, etiqueta) in COLUMNA_SEPARACION.items():
+		valores = filtros.get(filtro) or []
+		if len(valores) > 1:
+			if not confirmar(f"¿Separar el reporte por {etiqueta} (una hoja o archivo por cada uno)?"):
+				return None
+			# La columna tiene que venir en los datos para poder separar
+			if "columns" in filtros and columna not in filtros["columns"]:
+				filtros["columns"].append(columna)
+			return columna
+	return None
+
+
+def _generar_fallidos_por_fragmentos(req: SolicitudN8n, fragmentos: list[tuple[date, date]], destino: str) -> None:
+	"""
+	Pide el reporte de fallidos por períodos en paralelo y lo escribe a medida que llega.
+
+	Los períodos se entregan del más reciente al más antiguo, igual que el
+	orden del reporte completo (por fecha de fallo descendente).
+	"""
+	if destino == "local":
+		config = obtener_configuracion_local()
+		if config is None:
+			return  # Usuario canceló
+		formato, directorio = config
+	else:
+		formato, directorio = "xlsx", None
+
+	escritor = EscritorIncremental("reporte_envios_fallidos", formato, directorio)
+	with barra_progreso(f"Consultando {len(fragmentos)} períodos de envíos fallidos", len(fragmentos)) as avanzar:
+		ok, error = consultar_por_fragmentos(req, fragmentos, escritor.agregar, avanzar)
+
+	if not ok:
+		escritor.descartar()
+		print_error(f"No se pudo generar el reporte: {error}")
+		return
+	if not escritor.filas:
+		escritor.descartar()
+		print(MSG_SIN_ENVIOS_FALLIDOS)
+		return
+	mostrar_resultado_reporte(escritor.cerrar(), destino)
 
 
 def generar_reporte_envios_fallidos(session_id: str, destino: str) -> None:
-	"""Genera un reporte de todos los envíos con estado fallido."""
+	"""Genera un reporte de los envíos con estado fallido (columnas y fechas a elección)."""
+	opciones = solicitar_opciones_reporte(COLUMNAS_FALLIDOS)
+	if opciones is None:
+		return
 	req = SolicitudN8n(
 		entrada_chat = "Generar reporte de envíos fallidos",
 		id_sesion = session_id,
 		intencion = "reporte_fallidos",
+		parametros = opciones,
+		columnar = True,
 	)
 
-	with spinner_procesando("Consultando datos de envíos fallidos"):
+	# Rangos largos: se piden por períodos en paralelo en lugar de una sola consulta
+	if "desde" in opciones:
+		hasta = date.fromisoformat(opciones.get("hasta") or date.today().isoformat())
+		fragmentos = dividir_rango(date.fromisoformat(opciones["desde"]), hasta)
+		if len(fragmentos) > 1:
+			_generar_fallidos_por_fragmentos(req, list(reversed(fragmentos)), destino)
+			return
+
+	with spinner_procesando("Consultando datos de envíos fallidos", describir_espera(req.intencion, req.parametros)):
 		res = enviar_consulta(req)
 	valido, registros, mensaje = validar_respuesta_n8n(res, MSG_SIN_ENVIOS_FALLIDOS)
 	if not valido:
@@ -47,18 +145,32 @@ def generar_reporte_envios_fallidos(session_id: str, destino: str) -> None:
 
 
 def generar_reporte_repartidores(session_id: str, destino: str) -> None:
-	"""Genera un reporte filtrado por repartidor y/o localidad."""
-	filtros = solicitar_filtros_reparto()
+	"""
+	Genera un reporte filtrado por uno o varios repartidores y/o localidades.
+
+	Todos los valores se consultan en una sola solicitud; en modo local el
+	resultado puede separarse luego en una hoja o archivo por cada uno. Los
+	nombres se corrigen antes contra el catálogo de localidades y repartidores.
+	"""
+	with spinner_procesando("Cargando localidades y repartidores"):
+		catalogo = obtener_catalogo(session_id)
+	filtros = solicitar_filtros_reparto(catalogo)
 	if not filtros:
 		return
+	opciones = solicitar_opciones_reporte(COLUMNAS_REPARTO, con_estados=True)
+	if opciones is None:
+		return
+	filtros.update(opciones)
+	separar_por = _preguntar_separacion(filtros) if destino == "local" else None
 	req = SolicitudN8n(
 		entrada_chat = "Generar reporte de localidad o repartidor",
 		id_sesion = session_id,
 		intencion = "reporte_repartidor_localidad",
 		parametros = filtros,
+		columnar = True,
 	)
 
-	with spinner_procesando("Consultando datos de repartidores"):
+	with spinner_procesando("Consultando datos de repartidores", describir_espera(req.intencion, req.parametros)):
 		res = enviar_consulta(req)
 	valido, registros, mensaje = validar_respuesta_n8n(res, MSG_SIN_DATOS_FILTRO)
 	if not valido:
@@ -69,7 +181,10 @@ def generar_reporte_repartidores(session_id: str, destino: str) -> None:
 		if config is None:
 			return  # Usuario canceló
 		formato_local, directorio_local = config
-		path = exportar_reporte_local(registros, "reporte_localidad_repartidor", formato_local, directorio_local)
+		if separar_por:
+			path = generar_reporte_por_grupo(registros, separar_por, "reporte_localidad_repartidor", formato_local, directorio_local)[-1]
+		else:
+			path = exportar_reporte_local(registros, "reporte_localidad_repartidor", formato_local, directorio_local)
 	else:
 		path = generar_reporte(registros, filename="reporte_localidad_repartidor", formato="xlsx", preview=False)
 
@@ -88,8 +203,9 @@ def generar_consulta_personalizada_local(session_id: str) -> None:
 		entrada_chat = consulta,
 		id_sesion = session_id,
 		intencion = "consulta_personalizada",
+		columnar = True,
 	)
-	with spinner_procesando("Procesando consulta personalizada"):
+	with spinner_procesando("Procesando consulta personalizada", describir_espera(req.intencion, req.parametros)):
 		res = enviar_consulta(req)
 	valido, registros, mensaje = validar_respuesta_n8n(res, MSG_SIN_DATOS_CONSULTA)
 	if not valido:
@@ -105,6 +221,215 @@ def generar_consulta_personalizada_local(session_id: str) -> None:
 	mostrar_mensaje_si_existe(mensaje)
 
 
+INTENCION_RESUMEN = "resumen_envios"
+
+AYUDA_TABLERO = "l <localidad> · r <repartidor> · Enter volver al tablero · 0 salir"
+
+
+def _consultar_resumen(session_id: str, marca: str | None, estado: str) -> tuple[dict | None, str | None]:
+	"""
+	Pide los contadores del tablero enviando la última marca de agua conocida.
+
+	Returns:
+		tuple[dict | None, str | None]: (`data` de la respuesta, error). Si los
+		datos no cambiaron desde `marca`, `data` es {"sin_cambios": True, ...}.
+	"""
+	req = SolicitudN8n(
+		entrada_chat = "Tablero en vivo de envíos",
+		id_sesion = session_id,
+		intencion = INTENCION_RESUMEN,
+		parametros = {"marca": marca or "", "estado": estado, "limite": TABLERO_LIMITE},
+		prioridad = PRIORIDAD_FONDO,
+	)
+	res = enviar_consulta(req)
+	if not res.ok:
+		return None, res.mensaje or "No se pudo consultar el resumen."
+	if not isinstance(res.datos, dict) or "marca" not in res.datos:
+		return None, "El workflow no devolvió el resumen (¿falta la ruta resumen_envios?)."
+	return res.datos, None
+
+
+def _filtro_por_nombre(session_id: str, filtro: str, valor: str) -> dict:
+	"""Parámetros para filtrar por un nombre: por igualdad si el catálogo lo reconoce, si no por coincidencia parcial."""
+	indice = (obtener_catalogo(session_id) or {}).get(filtro)
+	nombre = indice.resolver(valor) if indice else None
+	return {filtro: [nombre or valor], "exacto": nombre is not None}
+
+
+def _detalle_del_tablero(session_id: str, estado: str, filtro: str, valor: str) -> None:
+	"""Trae la lista completa de envíos de una localidad o repartidor y la muestra paginada."""
+	req = SolicitudN8n(
+		entrada_chat = f"Detalle del tablero: {filtro} {valor}",
+		id_sesion = session_id,
+		intencion = "reporte_repartidor_localidad",
+		parametros = {"estados": [estado], **_filtro_por_nombre(session_id, filtro, valor)},
+		columnar = True,
+	)
+	with spinner_procesando(f"Consultando envíos de {valor}", describir_espera(req.intencion, req.parametros)):
+		res = enviar_consulta(req)
+	valido, registros, mensaje = validar_respuesta_n8n(res, MSG_SIN_DATOS_FILTRO)
+	if not valido:
+		mostrar_mensaje_si_existe(mensaje)
+		return
+	mostrar_resultados_paginados(registros, titulo=f"{estado} · {filtro} {valor}")
+
+
+def _registros_de(res) -> list | pd.DataFrame:
+	"""Registros de una respuesta (DataFrame si fue columnar), vacío si falló."""
+	if not res.ok:
+		return []
+	if isinstance(res.datos, pd.DataFrame):
+		return res.datos
+	return normalizar_registros_respuesta(res.datos)
+
+
+def paquete_matutino(session_id: str) -> None:
+	"""
+	Trae en una sola llamada a n8n lo que se revisa cada mañana.
+
+	El paquete (ver `n8n_client.enviar_paquete`) lleva el reporte de envíos
+	fallidos, uno por cada localidad elegida y el estado de los códigos
+	indicados (todos en una misma consulta). Muestra un resumen y ofrece
+	guardar los reportes.
+	"""
+	elegido = solicitar_paquete_matutino()
+	if elegido is None:
+		print_info("Operación cancelada.")
+		return
+	localidades, codigos = elegido
+
+	# (título, nombre de archivo, solicitud) de cada reporte del paquete
+	reportes = [(
+		"Envíos fallidos",
+		"reporte_envios_fallidos",
+		SolicitudN8n(
+			entrada_chat = "Generar reporte de envíos fallidos",
+			id_sesion = session_id,
+			intencion = "reporte_fallidos",
+			columnar = True,
+		),
+	)]
+	for localidad in localidades:
+		sufijo = re.sub(r"[^\w-]+", "_", localidad).strip("_")
+		reportes.append((
+			f"Localidad {localidad}",
+			f"reporte_localidad_{sufijo}",
+			SolicitudN8n(
+				entrada_chat = f"Generar reporte de la localidad {localidad}",
+				id_sesion = session_id,
+				intencion = "reporte_repartidor_localidad",
+				parametros = _filtro_por_nombre(session_id, "localidad", localidad),
+				columnar = True,
+			),
+		))
+	solicitudes = [req for _, _, req in reportes]
+	if codigos:
+		solicitudes.append(SolicitudN8n(
+			entrada_chat = f"Consultar estado de los envíos {', '.join(codigos)}",
+			id_sesion = session_id,
+			intencion = "consultar_estado",
+			parametros = {"codigo": codigos},
+		))
+
+	with spinner_procesando(f"Preparando el paquete de la mañana ({len(solicitudes)} consultas)", describir_espera(INTENCION_PAQUETE)):
+		respuestas = enviar_paquete(solicitudes)
+
+	filas = []
+	generados = []
+	for (titulo, nombre, _), res in zip(reportes, respuestas):
+		registros = _registros_de(res)
+		if not res.ok:
+			filas.append((titulo, f"[red]Error: {res.mensaje}[/red]"))
+		else:
+			filas.append((titulo, f"{len(registros)} envíos"))
+			if len(registros):
+				generados.append((nombre, registros))
+	if codigos:
+		res = respuestas[-1]
+		encontrados = {
+			str(r.get("codigo_envio", "")).upper(): r for r in _registros_de(res) if isinstance(r, dict)
+		}
+		for codigo in codigos:
+			if not res.ok:
+				filas.append((f"Estado {codigo}", f"[red]Error: {res.mensaje}[/red]"))
+			elif codigo in encontrados:
+				envio = encontrados[codigo]
+				detalle = " · ".join(str(v) for v in (envio.get("centro_actual"), envio.get("fecha_ultimo_movimiento")) if v)
+				filas.append((f"Estado {codigo}", f"{envio.get('estado_actual') or '-'}" + (f" ({detalle})" if detalle else "")))
+			else:
+				filas.append((f"Estado {codigo}", "[yellow]No encontrado[/yellow]"))
+	print_paquete(filas, "☀️  Paquete de la mañana")
+
+	if not generados or not confirmar("¿Guardar los reportes del paquete?"):
+		return
+	config = obtener_configuracion_local()
+	if config is None:
+		return  # Usuario canceló
+	formato, directorio = config
+	for nombre, registros in generados:
+		exportar_reporte_local(registros, nombre, formato, directorio)
+
+
+def tablero_en_vivo(session_id: str, estado: str = "Fallido") -> None:
+	"""
+	Tablero en vivo con los contadores de envíos por estado, localidad y repartidor.
+
+	Consulta la intención `resumen_envios` cada TABLERO_INTERVALO segundos y
+	actualiza los contadores en el lugar. Cada consulta lleva la marca de agua
+	de la anterior: si nada cambió, n8n responde solo `sin_cambios` sin volver
+	a contar. Las listas completas se piden solo al entrar al detalle.
+
+	Con las notificaciones activas, cada aviso de n8n provoca una consulta
+	inmediata y la consulta periódica se espacia a TABLERO_INTERVALO_CON_EVENTOS.
+	"""
+	resumen = anterior = None
+	marca = None
+	actualizado = ultimo_cambio = None
+	aviso = threading.Event()
+
+	def al_recibir_cambios(eventos: list[dict]) -> None:
+		aviso.set()
+
+	suscribir(al_recibir_cambios)
+	try:
+		while True:
+			error = None
+			try:
+				with Live(armar_tablero(None, None, None, None, TABLERO_INTERVALO), console=console, refresh_per_second=4) as live:
+					while True:
+						aviso.clear()
+						con_avisos = notificaciones_activas()
+						datos, error = _consultar_resumen(session_id, marca, estado)
+						if datos is not None:
+							actualizado = time.time()
+							if not datos.get("sin_cambios"):
+								anterior, resumen = resumen, datos
+								marca = datos["marca"]
+								ultimo_cambio = actualizado
+						intervalo = TABLERO_INTERVALO_CON_EVENTOS if con_avisos else TABLERO_INTERVALO
+						for restante in range(intervalo, 0, -1):
+							live.update(armar_tablero(resumen, anterior, actualizado, ultimo_cambio, restante, error, con_avisos))
+							if aviso.wait(1):
+								break
+			except KeyboardInterrupt:
+				pass
+
+			print_info(AYUDA_TABLERO)
+			while True:
+				comando = input("tablero> ").strip()
+				accion, _, valor = comando.partition(" ")
+				if not comando:
+					break
+				if accion == "0":
+					return
+				if accion.lower() in ("l", "r") and valor.strip():
+					_detalle_del_tablero(session_id, estado, "localidad" if accion.lower() == "l" else "repartidor", valor.strip())
+				else:
+					print_info(AYUDA_TABLERO)
+	finally:
+		desuscribir(al_recibir_cambios)
+
+
 def manejar_menu_local(session_id: str) -> bool:
 	"""Maneja la lógica del submenú de reportes locales."""
 	from ui.menus import menu_local
@@ -120,6 +445,12 @@ def manejar_menu_local(session_id: str) -> bool:
 		elif opcion == "3":
 			generar_consulta_personalizada_local(session_id)
 			return True
+		elif opcion == "5":
+			tablero_en_vivo(session_id)
+			return True
+		elif opcion == "6":
+			paquete_matutino(session_id)
+			return True
 		elif opcion == "4":
 			return True
 		elif opcion == "0":
@@ -5,28 +5,56 @@ Importa funciones del código reorganizado (ui, handlers, utils) y solo mantiene
 el loop principal y la creación de la sesión.
 """
 from n8n_client import nuevo_id_sesion
+from notificaciones import iniciar_notificaciones, detener_notificaciones
+from bandeja_salida import iniciar_bandeja, detener_bandeja, pedidos_pendientes
 
 from ui.menus import menu_principal
 from ui.validaciones import manejar_continuar
 from handlers.consultas import (
     consultar_estado_envio,
     iniciar_chat_con_piki,
+    sincronizar_replica_local,
 )
-from handlers.compartir import manejar_menu_compartir
+from handlers.compartir import manejar_menu_compartir, mostrar_avisos_bandeja
 from handlers.reportes import manejar_menu_local
+from ui.console_utils import print_info, print_warning
 
 
 def main():
     """Función principal que inicia la aplicación.
 
-    Genera un ID de sesión único, muestra el menú principal en un bucle
-    y delega las acciones según la opción seleccionada por el usuario.
+    Genera un ID de sesión único, activa las notificaciones de cambios si
+    están configuradas, arranca la bandeja de salida (que reenvía lo que no
+    llegó a n8n), muestra el menú principal en un bucle y delega las
+    acciones según la opción seleccionada por el usuario.
     """
     id_sesion = nuevo_id_sesion()
 
+    activas, error = iniciar_notificaciones(id_sesion)
+    if activas:
+        print_info("🔔 Notificaciones de cambios activas: n8n avisará cada envío modificado.")
+    elif error:
+        print_warning(f"Notificaciones desactivadas: {error}")
+
+    pendientes = pedidos_pendientes()
+    if pendientes:
+        print_info(f"📤 {pendientes} pedido(s) de compartir esperan en la bandeja de salida; se enviarán cuando n8n responda.")
+    iniciar_bandeja()
+
+    try:
+        _bucle_menus(id_sesion)
+    finally:
+        detener_bandeja()
+        detener_notificaciones(id_sesion)
+
+
+def _bucle_menus(id_sesion: str):
+    """Muestra los menús y delega cada opción hasta que el usuario sale."""
     menu_activo = "principal"  # Controla qué menú mostrar
 
     while True:
+        mostrar_avisos_bandeja()
+
         if menu_activo == "principal":
             menu_principal()
             opcion = input("Seleccione una opción: ").strip().lower()
@@ -51,6 +79,9 @@ def main():
             elif opcion == "4":
                 menu_activo = "local"
 
+            elif opcion == "5":
+                sincronizar_replica_local(id_sesion)
+
             elif opcion == "0":
                 print("Saliendo del programa. ¡Hasta luego! 👋")
                 break
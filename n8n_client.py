@@ -1,20 +1,254 @@
+import json
+import mimetypes
+import os
+import time
+import uuid
+
+from typing import Callable
+
 import requests
-import random
+from urllib3.exceptions import NewConnectionError
 from data_models import SolicitudN8n, RespuestaN8n
-from config import N8N_WEBHOOK_URL, API_KEY, TIMEOUT, SESSION_PREFIX
+from config import N8N_WEBHOOK_URL, N8N_STREAM_URL, API_KEY, TIMEOUT, SESSION_PREFIX, GATEWAY_URL
+from utils.formateo import interpretar_salida_agente, es_respuesta_columnar, columnar_a_dataframe
+from utils.grabacion import grabacion_activa, registrar_intercambio
+from utils.planificador import planificador, usa_agente, PRIORIDAD_INTERACTIVA, ORDEN_PRIORIDADES
+from utils.costos import registrar_consumo
+from utils.trazas import span, traceparent, TIPO_CLIENTE
+from utils.plazos import plazo_para, registrar_latencia, registrar_vencimiento, describir_espera
+
+# Sesión HTTP compartida: reutiliza conexiones (keep-alive) entre consultas
+_cliente_http = requests.Session()
+
+# `RespuestaN8n.error` de las consultas que no llegaron a n8n (caído, sin red
+# o proxy sin destino): se pueden reintentar sin riesgo de duplicarlas
+ERROR_SIN_CONEXION = "sin_conexion"
+
+# Intención del workflow que ejecuta varias solicitudes en una sola llamada, y
+# cuántas admite (nodo "Paquete - Ejecuta las solicitudes")
+INTENCION_PAQUETE = "paquete"
+MAX_POR_PAQUETE = 25
 
 
 def nuevo_id_sesion() -> str:
 	"""
 	Genera un ID de sesión nuevo para cada conversación.
 
+	Si hay un gateway configurado, el ID lo emite el gateway (que registra la
+	sesión y su vencimiento); si no responde, se genera localmente. En ambos
+	casos se usa un UUID, por lo que no hay colisiones entre terminales.
+
 	Returns:
 		str: Identificador único de sesión con el prefijo definido en configuración.
 	"""
-	return f"{SESSION_PREFIX}_{random.randint(1000, 9999)}"
+	if GATEWAY_URL:
+		try:
+			respuesta_http = _cliente_http.post(f"{GATEWAY_URL}/sesiones", headers=_encabezados(), timeout=TIMEOUT)
+			respuesta_http.raise_for_status()
+			return respuesta_http.json()["sessionId"]
+		except (requests.RequestException, ValueError, KeyError):
+			pass
+	return f"{SESSION_PREFIX}_{uuid.uuid4().hex}"
 
 
 def enviar_consulta(solicitud: SolicitudN8n) -> RespuestaN8n:
+	"""
+	Envía una consulta a n8n, directamente o a través del gateway si está configurado.
+
+	La consulta espera antes su turno en el planificador, según su prioridad.
+	Al responder, su duración y las métricas del agente se suman a `utils.costos`.
+	Todo el recorrido queda medido en la traza de la solicitud (`utils.trazas`).
+
+	Args:
+		solicitud (SolicitudN8n): Datos enviados al servidor.
+
+	Returns:
+		RespuestaN8n: Respuesta estandarizada con estado, mensaje y datos.
+	"""
+	clase, intencion = _clase_e_intencion(solicitud)
+	id_traza = getattr(solicitud, "id_traza", None)
+	with span("n8n.consulta", id_traza, intencion=intencion, prioridad=clase) as consulta:
+		pedido = time.perf_counter()
+		with planificador.turno(clase, intencion):
+			marca = time.perf_counter()
+			consulta.atributo("planificador.espera_s", round(marca - pedido, 6))
+			if GATEWAY_URL and solicitud and solicitud.entrada_chat:
+				respuesta = _enviar_via_gateway(solicitud)
+			else:
+				respuesta = enviar_consulta_directa(solicitud)
+			if solicitud:
+				registrar_consumo(solicitud.intencion, solicitud.id_sesion, respuesta.metricas, time.perf_counter() - marca)
+
+		# Respuesta columnar: se decodifica recién aquí para que el gateway la
+		# reenvíe tal cual (compacta) a las terminales
+		if solicitud and solicitud.columnar and es_respuesta_columnar(respuesta.datos):
+			with span("n8n.normalizar", formato="columnar"):
+				respuesta.datos = columnar_a_dataframe(respuesta.datos)
+		consulta.atributo("ok", respuesta.ok)
+		consulta.atributo("n8n.execution_id", respuesta.id_ejecucion)
+
+	respuesta.id_traza = id_traza
+	return respuesta
+
+
+def enviar_paquete(solicitudes: list[SolicitudN8n]) -> list[RespuestaN8n]:
+	"""
+	Envía varias solicitudes en una sola llamada al webhook (intención `paquete`).
+
+	El workflow ejecuta cada solicitud por su ruta habitual, varias a la vez, y
+	devuelve una respuesta por cada una; aquí se separan en `RespuestaN8n` con
+	su propio ID de traza y de ejecución, y las columnares se decodifican como
+	en `enviar_consulta`. El paquete pide un solo turno al planificador, con la
+	prioridad más urgente de sus solicitudes.
+
+	Si el workflow no tiene la ruta `paquete`, las solicitudes se envían una por una.
+	Las que atiende el agente siempre van por separado, para que cada una
+	consuma su turno del cubo "agente" (la cuota de Gemini).
+
+	Usage:
+		fallidos, estado = enviar_paquete([req_fallidos, req_estado])
+
+	Args:
+		solicitudes (list[SolicitudN8n]): Solicitudes a enviar; con más de
+			`MAX_POR_PAQUETE` se arman varios paquetes.
+
+	Returns:
+		list[RespuestaN8n]: Una respuesta por solicitud, en el mismo orden.
+	"""
+	respuestas = {i: enviar_consulta(s) for i, s in enumerate(solicitudes) if usa_agente(s.intencion)}
+	directas = [i for i in range(len(solicitudes)) if i not in respuestas]
+	for desde in range(0, len(directas), MAX_POR_PAQUETE):
+		posiciones = directas[desde:desde + MAX_POR_PAQUETE]
+		respuestas.update(zip(posiciones, _enviar_un_paquete([solicitudes[i] for i in posiciones])))
+	return [respuestas[i] for i in range(len(solicitudes))]
+
+
+def _enviar_un_paquete(solicitudes: list[SolicitudN8n]) -> list[RespuestaN8n]:
+	if len(solicitudes) == 1:
+		return [enviar_consulta(solicitudes[0])]
+
+	prioridad = min(
+		(s.prioridad for s in solicitudes),
+		key=lambda p: ORDEN_PRIORIDADES.get(p, len(ORDEN_PRIORIDADES)),
+	)
+	sobre = SolicitudN8n(
+		entrada_chat=f"Paquete de {len(solicitudes)} solicitudes",
+		id_sesion=solicitudes[0].id_sesion,
+		intencion=INTENCION_PAQUETE,
+		parametros={"solicitudes": [_construir_carga(s) for s in solicitudes]},
+		prioridad=prioridad,
+	)
+	respuesta = enviar_consulta(sobre)
+	if not respuesta.ok:
+		return [
+			RespuestaN8n(ok=False, mensaje=respuesta.mensaje, error=respuesta.error, id_traza=s.id_traza)
+			for s in solicitudes
+		]
+
+	resultados = respuesta.datos.get("resultados") if isinstance(respuesta.datos, dict) else None
+	if not isinstance(resultados, list) or len(resultados) != len(solicitudes):
+		# Workflow sin la ruta `paquete`: se envían por separado
+		return [enviar_consulta(s) for s in solicitudes]
+
+	with span("n8n.normalizar", sobre.id_traza, formato="paquete", solicitudes=len(solicitudes)):
+		return [_respuesta_de_paquete(s, r) for s, r in zip(solicitudes, resultados)]
+
+
+def _respuesta_de_paquete(solicitud: SolicitudN8n, resultado) -> RespuestaN8n:
+	"""Convierte el resultado de una solicitud del paquete en su `RespuestaN8n`."""
+	if not isinstance(resultado, dict):
+		resultado = {}
+	if resultado.get("ok"):
+		respuesta = _interpretar_contenido(resultado.get("cuerpo"))
+		if solicitud.columnar and es_respuesta_columnar(respuesta.datos):
+			respuesta.datos = columnar_a_dataframe(respuesta.datos)
+		registrar_consumo(solicitud.intencion, solicitud.id_sesion, respuesta.metricas, (resultado.get("duracion_ms") or 0) / 1000)
+	else:
+		respuesta = RespuestaN8n(
+			ok=False,
+			mensaje=f"n8n no pudo resolver la solicitud del paquete: {resultado.get('error') or 'sin respuesta'}",
+			datos=None,
+		)
+	respuesta.id_traza = solicitud.id_traza
+	respuesta.id_ejecucion = resultado.get("ejecucion")
+	return respuesta
+
+
+def _clase_e_intencion(solicitud: SolicitudN8n | None) -> tuple[str, str | None]:
+	"""Clase de prioridad e intención con las que la solicitud pide turno."""
+	if not solicitud:
+		return PRIORIDAD_INTERACTIVA, None
+	return getattr(solicitud, "prioridad", PRIORIDAD_INTERACTIVA), solicitud.intencion
+
+
+def _enviar_via_gateway(solicitud: SolicitudN8n) -> RespuestaN8n:
+	"""Envía la consulta al gateway local, que la reenvía a n8n con caché compartida."""
+	carga_util = _construir_carga(solicitud)
+	plazo = plazo_para(solicitud.intencion, solicitud.parametros)
+	inicio, marca = time.time(), time.perf_counter()
+	respuesta_http = None
+	try:
+		with span("gateway.consulta", solicitud.id_traza, TIPO_CLIENTE, **{"url.full": f"{GATEWAY_URL}/consulta"}):
+			encabezados = _encabezados()
+			encabezados["Content-Type"] = "application/json"
+			respuesta_http = _cliente_http.post(
+				f"{GATEWAY_URL}/consulta",
+				json=carga_util,
+				headers=encabezados,
+				timeout=plazo
+			)
+			respuesta_http.raise_for_status()
+		_grabar("gateway", carga_util, inicio, marca, respuesta_http)
+		registrar_latencia(solicitud.intencion, time.perf_counter() - marca, solicitud.parametros)
+		with span("n8n.decodificar", bytes=len(respuesta_http.content)):
+			contenido = respuesta_http.json()
+	except requests.Timeout as error:
+		_grabar("gateway", carga_util, inicio, marca, None, error)
+		if isinstance(error, requests.ReadTimeout):
+			registrar_vencimiento(solicitud.intencion, plazo[1], solicitud.parametros)
+		return RespuestaN8n(
+			ok=False,
+			mensaje=_mensaje_plazo_vencido(solicitud.intencion, plazo, solicitud.parametros),
+			datos=None,
+			error=_sin_conexion(error),
+		)
+	except requests.RequestException as error:
+		_grabar("gateway", carga_util, inicio, marca, respuesta_http or error.response, error)
+		return RespuestaN8n(
+			ok=False,
+			mensaje=f"Error de conexión con el gateway: {str(error)}",
+			datos=None,
+			error=_sin_conexion(error),
+		)
+	except ValueError:
+		return RespuestaN8n(
+			ok=False,
+			mensaje="El gateway devolvió una respuesta inválida.",
+			datos=None,
+		)
+
+	# ▶ Guard Clause: JSON válido pero sin la forma de respuesta del gateway (lista, texto, null)
+	if not isinstance(contenido, dict):
+		return RespuestaN8n(
+			ok=False,
+			mensaje="El gateway devolvió una respuesta inválida.",
+			datos=None,
+		)
+
+	return RespuestaN8n(
+		ok=bool(contenido.get("ok")),
+		mensaje=contenido.get("mensaje"),
+		datos=contenido.get("datos"),
+		error=contenido.get("error"),
+		intencion=contenido.get("intencion"),
+		query_sql=contenido.get("query_sql"),
+		consulta_id=contenido.get("consulta_id"),
+		metricas=contenido.get("metricas"),
+		id_ejecucion=contenido.get("id_ejecucion"),
+	)
+
+
+def enviar_consulta_directa(solicitud: SolicitudN8n) -> RespuestaN8n:
 	"""
 	Envía una consulta al webhook de n8n y procesa la respuesta obtenida.
 
@@ -39,41 +273,344 @@ def enviar_consulta(solicitud: SolicitudN8n) -> RespuestaN8n:
 		)
 
 	# Construcción del cuerpo de la petición para n8n
-	carga_util = {
+	carga_util = _construir_carga(solicitud)
+
+	# Plazos de conexión y lectura propios de la intención (utils.plazos)
+	plazo = plazo_para(solicitud.intencion, solicitud.parametros)
+
+	# ▶ Realizar solicitud HTTP
+	inicio, marca = time.time(), time.perf_counter()
+	try:
+		with span("n8n.webhook", solicitud.id_traza, TIPO_CLIENTE, **{"url.full": N8N_WEBHOOK_URL}) as webhook:
+			# Encabezados para la petición HTTP (incluyen el traceparent de este span)
+			encabezados = _encabezados()
+			encabezados["Content-Type"] = "application/json"
+			respuesta_http = _cliente_http.post(
+				N8N_WEBHOOK_URL,
+				json=carga_util,
+				headers=encabezados,
+				timeout=plazo
+			)
+			webhook.atributo("http.response.status_code", respuesta_http.status_code)
+			webhook.atributo("n8n.execution_id", respuesta_http.headers.get("X-N8n-Execution-Id"))
+			respuesta_http.raise_for_status()
+
+	except requests.Timeout as error:
+		# ▶ Guard Clause: n8n no respondió dentro del plazo de la intención
+		_grabar("webhook", carga_util, inicio, marca, None, error)
+		if isinstance(error, requests.ReadTimeout):
+			registrar_vencimiento(solicitud.intencion, plazo[1], solicitud.parametros)
+		return RespuestaN8n(
+			ok=False,
+			mensaje=_mensaje_plazo_vencido(solicitud.intencion, plazo, solicitud.parametros),
+			datos=None,
+			error=_sin_conexion(error),
+		)
+
+	except requests.RequestException as error:
+		# ▶ Guard Clause: error de red o HTTP
+		_grabar("webhook", carga_util, inicio, marca, error.response, error)
+		return RespuestaN8n(
+			ok=False,
+			mensaje=f"Error de conexión al webhook de n8n: {str(error)}",
+			datos=None,
+			error=_sin_conexion(error),
+		)
+
+	_grabar("webhook", carga_util, inicio, marca, respuesta_http)
+	registrar_latencia(solicitud.intencion, time.perf_counter() - marca, solicitud.parametros)
+	with span("n8n.decodificar", solicitud.id_traza, bytes=len(respuesta_http.content)):
+		respuesta = _interpretar_respuesta(respuesta_http)
+	respuesta.id_ejecucion = respuesta_http.headers.get("X-N8n-Execution-Id")
+	return respuesta
+
+
+def enviar_consulta_streaming(solicitud: SolicitudN8n, al_recibir: Callable[[str], None]) -> RespuestaN8n:
+	"""
+	Envía una consulta al webhook de streaming y notifica la respuesta a medida que llega.
+
+	n8n, con el webhook en modo "streaming", envía la salida del agente como
+	líneas JSON (`{"type": "item", "content": "..."}`); también se aceptan
+	eventos SSE (`data: ...`). Cada fragmento se acumula y se entrega al
+	callback, de modo que la interfaz puede mostrar el mensaje de Piki antes de
+	que el agente termine.
+
+	Args:
+		solicitud (SolicitudN8n): Datos enviados al servidor.
+		al_recibir (Callable[[str], None]): Se invoca con el texto acumulado
+			cada vez que llega un fragmento nuevo.
+
+	Returns:
+		RespuestaN8n: Respuesta final, armada a partir del JSON completo de Piki.
+	"""
+	if not solicitud or not solicitud.entrada_chat:
+		return RespuestaN8n(
+			ok=False,
+			mensaje="Solicitud inválida: se requiere entrada de usuario.",
+			datos=None,
+		)
+
+	carga_util = _construir_carga(solicitud)
+	acumulado = []
+	recibidos = 0
+	primer_fragmento = None
+	# El turno se pide antes de medir: la espera en el planificador no es latencia de n8n
+	with planificador.turno(*_clase_e_intencion(solicitud)), \
+			span("n8n.streaming", solicitud.id_traza, TIPO_CLIENTE, **{"url.full": N8N_STREAM_URL}) as streaming:
+		encabezados = _encabezados()
+		encabezados["Content-Type"] = "application/json"
+		encabezados["Accept"] = "application/x-ndjson, text/event-stream"
+		plazo = plazo_para(solicitud.intencion, solicitud.parametros)
+		inicio, marca = time.time(), time.perf_counter()
+		try:
+			with _cliente_http.post(
+				N8N_STREAM_URL,
+				json=carga_util,
+				headers=encabezados,
+				timeout=plazo,
+				stream=True,
+			) as respuesta_http:
+				respuesta_http.raise_for_status()
+				# Sin charset en la respuesta, iter_lines devolvería bytes
+				respuesta_http.encoding = respuesta_http.encoding or "utf-8"
+				for linea in respuesta_http.iter_lines(decode_unicode=True):
+					recibidos += len(linea.encode("utf-8")) + 1 if linea else 1
+					fragmento = _fragmento_de_linea(linea)
+					if fragmento:
+						if primer_fragmento is None:
+							primer_fragmento = time.perf_counter() - marca
+						acumulado.append(fragmento)
+						al_recibir("".join(acumulado))
+			_grabar("streaming", carga_util, inicio, marca, respuesta_http, bytes_respuesta=recibidos,
+					primer_fragmento=primer_fragmento)
+			# El stream trae solo el texto de Piki: se registra la duración, sin tokens
+			registrar_consumo(solicitud.intencion, solicitud.id_sesion, None, time.perf_counter() - marca)
+			registrar_latencia(solicitud.intencion, time.perf_counter() - marca, solicitud.parametros)
+			streaming.atributo("primer_fragmento_s", primer_fragmento)
+
+		except requests.RequestException as error:
+			_grabar("streaming", carga_util, inicio, marca, error.response, error, recibidos, primer_fragmento)
+			if isinstance(error, requests.ReadTimeout):
+				registrar_vencimiento(solicitud.intencion, plazo[1], solicitud.parametros)
+			return RespuestaN8n(
+				ok=False,
+				mensaje=f"Error de conexión al webhook de n8n: {str(error)}",
+				datos=None,
+			)
+
+	texto = "".join(acumulado)
+	with span("n8n.decodificar", solicitud.id_traza, bytes=recibidos):
+		salida = interpretar_salida_agente(texto)
+	if salida is None:
+		return RespuestaN8n(ok=True, mensaje=texto or None, datos=None, id_traza=solicitud.id_traza)
+
+	return RespuestaN8n(
+		ok=True,
+		mensaje=salida.get("mensaje_ia"),
+		datos=salida.get("datos", salida.get("data")),
+		intencion=salida.get("intencion"),
+		query_sql=salida.get("query_sql"),
+		consulta_id=salida.get("consulta_id"),
+		id_traza=solicitud.id_traza,
+	)
+
+
+def _fragmento_de_linea(linea: str | None) -> str | None:
+	"""Extrae el texto de una línea del stream (JSON de n8n o evento SSE)."""
+	if not linea:
+		return None
+	if linea.startswith("data:"):
+		linea = linea[5:].strip()
+		if linea == "[DONE]":
+			return None
+	try:
+		evento = json.loads(linea)
+	except ValueError:
+		return linea
+	if isinstance(evento, dict):
+		if evento.get("type") in ("begin", "end", "error"):
+			return None
+		contenido = evento.get("content")
+		return contenido if isinstance(contenido, str) else None
+	return None
+
+
+def enviar_archivo(solicitud: SolicitudN8n, ruta_archivo: str) -> RespuestaN8n:
+	"""
+	Envía un archivo ya generado al webhook de n8n como `multipart/form-data`.
+
+	Los campos de la solicitud viajan como campos de formulario (`params` se
+	serializa como JSON) y el archivo en el campo `data`, que el workflow
+	adjunta o sube sin volver a generarlo.
+
+	Args:
+		solicitud (SolicitudN8n): Datos de la solicitud (intención y parámetros).
+		ruta_archivo (str): Ruta del archivo local a enviar.
+
+	Returns:
+		RespuestaN8n: Respuesta estandarizada con estado, mensaje y datos.
+	"""
+	if not solicitud or not solicitud.entrada_chat:
+		return RespuestaN8n(
+			ok=False,
+			mensaje="Solicitud inválida: se requiere entrada de usuario.",
+			datos=None,
+		)
+	if not os.path.isfile(ruta_archivo):
+		return RespuestaN8n(
+			ok=False,
+			mensaje=f"No se encontró el archivo a enviar: {ruta_archivo}",
+			datos=None,
+		)
+
+	campos = {
 		"chatInput": solicitud.entrada_chat,
 		"sessionId": solicitud.id_sesion,
+		"traceId": solicitud.id_traza,
 	}
-
-	# Parámetros opcionales
 	if solicitud.intencion:
-		carga_util["intent"] = solicitud.intencion
-
+		campos["intent"] = solicitud.intencion
 	if solicitud.parametros:
-		carga_util["params"] = solicitud.parametros
+		campos["params"] = json.dumps(solicitud.parametros, ensure_ascii=False)
 
-	# Encabezados para la petición HTTP
-	encabezados = {"Content-Type": "application/json"}
-	if API_KEY:
-		encabezados["Authorization"] = f"Bearer {API_KEY}"
+	nombre = os.path.basename(ruta_archivo)
+	tipo_mime = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
 
-	# ▶ Realizar solicitud HTTP
 	try:
-		respuesta_http = requests.post(
-			N8N_WEBHOOK_URL,
-			json=carga_util,
-			headers=encabezados,
-			timeout=TIMEOUT
-		)
+		with planificador.turno(*_clase_e_intencion(solicitud)), open(ruta_archivo, "rb") as archivo, \
+				span("n8n.archivo", solicitud.id_traza, TIPO_CLIENTE, archivo=nombre) as envio:
+			respuesta_http = _cliente_http.post(
+				N8N_WEBHOOK_URL,
+				data=campos,
+				files={"data": (nombre, archivo, tipo_mime)},
+				headers=_encabezados(),
+				timeout=plazo_para(solicitud.intencion, solicitud.parametros)
+			)
+			envio.atributo("http.response.status_code", respuesta_http.status_code)
 		respuesta_http.raise_for_status()
 
 	except requests.RequestException as error:
-		# ▶ Guard Clause: error de red o HTTP
 		return RespuestaN8n(
 			ok=False,
 			mensaje=f"Error de conexión al webhook de n8n: {str(error)}",
 			datos=None,
+			error=_sin_conexion(error),
 		)
 
+	respuesta = _interpretar_respuesta(respuesta_http)
+	respuesta.id_traza = solicitud.id_traza
+	respuesta.id_ejecucion = respuesta_http.headers.get("X-N8n-Execution-Id")
+	return respuesta
+
+
+def _sin_conexion(error: requests.RequestException) -> str | None:
+	"""
+	`ERROR_SIN_CONEXION` si la consulta no llegó a n8n; None si pudo haberse procesado.
+
+	Una conexión rechazada o que no se pudo abrir a tiempo, o un 502/503 de un
+	proxy, aseguran que el workflow no recibió nada. Un plazo de lectura
+	vencido o una conexión cortada a mitad de la respuesta no: n8n pudo haber
+	compartido el reporte igual.
+	"""
+	causa = getattr(error.args[0], "reason", None) if error.args else None
+	if isinstance(error, requests.ConnectTimeout) or isinstance(causa, NewConnectionError):
+		return ERROR_SIN_CONEXION
+	if error.response is not None and error.response.status_code in (502, 503):
+		return ERROR_SIN_CONEXION
+	return None
+
+
+def _mensaje_plazo_vencido(intencion: str | None, plazo: tuple[float, float], parametros: dict | None = None) -> str:
+	"""Mensaje para una consulta que superó su plazo, con la espera habitual si se conoce."""
+	mensaje = f"n8n no respondió dentro del plazo de {plazo[1]:.0f} s"
+	if intencion:
+		mensaje += f" para '{intencion}'"
+	habitual = describir_espera(intencion, parametros)
+	if habitual:
+		mensaje += f" ({habitual}): puede haber un problema en el workflow"
+	return mensaje + "."
+
+
+def _grabar(
+	destino: str,
+	carga: dict,
+	inicio: float,
+	marca: float,
+	respuesta_http: requests.Response | None,
+	error: Exception | None = None,
+	bytes_respuesta: int | None = None,
+	primer_fragmento: float | None = None,
+) -> None:
+	"""
+	Registra la consulta en la grabación de tráfico, si está activa (`GRABACION_PATH`).
+
+	Args:
+		inicio (float): Momento del envío (epoch).
+		marca (float): `time.perf_counter()` al enviar, para medir la duración.
+		bytes_respuesta (int | None): Tamaño recibido; por defecto, el del cuerpo
+			de `respuesta_http` (ya descargado en las consultas sin streaming).
+	"""
+	if not grabacion_activa():
+		return
+	total = time.perf_counter() - marca
+	if bytes_respuesta is None:
+		bytes_respuesta = len(respuesta_http.content) if respuesta_http is not None and not error else 0
+	registrar_intercambio(
+		destino,
+		carga,
+		inicio,
+		total,
+		estado=respuesta_http.status_code if respuesta_http is not None else None,
+		bytes_respuesta=bytes_respuesta,
+		espera=respuesta_http.elapsed.total_seconds() if respuesta_http is not None else None,
+		primer_fragmento=primer_fragmento,
+		error=f"{type(error).__name__}: {error}" if error else None,
+	)
+
+
+def _construir_carga(solicitud: SolicitudN8n) -> dict:
+	"""Arma el cuerpo JSON que espera el webhook de n8n."""
+	carga_util = {
+		"chatInput": solicitud.entrada_chat,
+		"sessionId": solicitud.id_sesion,
+		# El workflow lo devuelve en X-Trace-Id para unir ambas trazas
+		"traceId": solicitud.id_traza,
+	}
+
+	# Parámetros opcionales
+	if solicitud.intencion:
+		carga_util["intent"] = solicitud.intencion
+
+	if solicitud.parametros:
+		carga_util["params"] = solicitud.parametros
+
+	# Formato columnar opcional (lo arma el nodo "Visualizar" del workflow)
+	if solicitud.columnar:
+		carga_util["formato"] = "columnar"
+
+	return carga_util
+
+
+def _encabezados() -> dict:
+	"""Encabezados comunes a todas las peticiones (autenticación opcional y traza en curso)."""
+	encabezados = {}
+	if API_KEY:
+		encabezados["Authorization"] = f"Bearer {API_KEY}"
+	if (padre := traceparent()) is not None:
+		encabezados["traceparent"] = padre
+	return encabezados
+
+
+def _interpretar_respuesta(respuesta_http: requests.Response) -> RespuestaN8n:
+	"""
+	Convierte la respuesta HTTP de n8n en una `RespuestaN8n`.
+
+	Args:
+		respuesta_http (requests.Response): Respuesta exitosa del webhook.
+
+	Returns:
+		RespuestaN8n: Respuesta estandarizada con estado, mensaje y datos.
+	"""
 	# ▶ Intentar decodificar JSON
 	try:
 		contenido = respuesta_http.json()
@@ -84,6 +621,13 @@ def enviar_consulta(solicitud: SolicitudN8n) -> RespuestaN8n:
 			mensaje=respuesta_http.text,
 			datos=None,
 		)
+	return _interpretar_contenido(contenido)
+
+
+def _interpretar_contenido(contenido) -> RespuestaN8n:
+	"""Convierte el cuerpo ya decodificado de una respuesta de n8n en una `RespuestaN8n`."""
+	if isinstance(contenido, str):
+		return RespuestaN8n(ok=True, mensaje=contenido, datos=None)
 
 	# ─────────────────────────────────────────────
 	#  Interpretación de la respuesta del servidor
@@ -106,6 +650,9 @@ def enviar_consulta(solicitud: SolicitudN8n) -> RespuestaN8n:
 			mensaje=elemento.get("mensaje_ia"),
 			datos=datos_extraidos,
 			intencion=elemento.get("intencion"),
+			query_sql=elemento.get("query_sql"),
+			consulta_id=elemento.get("consulta_id"),
+			metricas=elemento.get("metricas"),
 		)
 
 	# Caso 2: diccionario con estructura típica de n8n
@@ -121,6 +668,9 @@ def enviar_consulta(solicitud: SolicitudN8n) -> RespuestaN8n:
 			mensaje=contenido.get("mensaje_ia"),
 			datos=datos_extraidos,
 			intencion=contenido.get("intencion"),
+			query_sql=contenido.get("query_sql"),
+			consulta_id=contenido.get("consulta_id"),
+			metricas=contenido.get("metricas"),
 		)
 
 	# Caso 3: respuesta directa sin estructura conocida
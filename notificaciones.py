@@ -0,0 +1,217 @@
+"""
+Notificaciones de cambios desde n8n
+===================================
+
+Receptor HTTP local opcional al que n8n envía los envíos que cambiaron, en
+lugar de que cada terminal consulte periódicamente. Al iniciarse, el cliente
+levanta el receptor y lo registra en el workflow con la intención
+`suscribir_eventos` (URL, token y vencimiento); mientras la aplicación está
+abierta la suscripción se renueva sola, y al salir se cancela.
+
+Cada aviso es un `POST /eventos` con el encabezado `X-Token` y el cuerpo
+`{"tipo": "cambios_envios", "marca": {...}, "eventos": [filas de vw_tracking]}`.
+Los envíos recibidos actualizan la réplica local y se reparten entre los
+oyentes registrados con `suscribir` (por ejemplo, el tablero en vivo).
+
+Se activa con `NOTIFICACIONES_PUERTO`. Si n8n no llega directo a la terminal
+(otra red, túnel, proxy), `NOTIFICACIONES_URL` indica la dirección pública
+que se registra.
+
+Funciones públicas:
+    - iniciar_notificaciones: Levanta el receptor y lo registra en n8n
+    - detener_notificaciones: Cancela la suscripción y apaga el receptor
+    - notificaciones_activas: True si el receptor está registrado
+    - suscribir / desuscribir: Oyentes de los envíos recibidos
+"""
+import hmac
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from config import NOTIFICACIONES_HOST, NOTIFICACIONES_PUERTO, NOTIFICACIONES_URL, NOTIFICACIONES_TTL
+from data_models import SolicitudN8n
+from n8n_client import enviar_consulta
+from replica_local import aplicar_cambios
+from utils.planificador import PRIORIDAD_INTERACTIVA, PRIORIDAD_FONDO
+
+INTENCION_SUSCRIBIR = "suscribir_eventos"
+
+RUTA_EVENTOS = "/eventos"
+
+_oyentes: list[Callable[[list[dict]], None]] = []
+_lock_oyentes = threading.Lock()
+
+
+class _Receptor:
+	"""Servidor del receptor y datos de la suscripción vigente."""
+
+	def __init__(self, servidor: ThreadingHTTPServer, url: str, token: str):
+		self.servidor = servidor
+		self.url = url
+		self.token = token
+		self.detenido = threading.Event()
+		self.recibidos = 0
+
+
+_receptor: _Receptor | None = None
+
+
+def suscribir(oyente: Callable[[list[dict]], None]) -> None:
+	"""Registra una función que recibe cada lote de envíos modificados."""
+	with _lock_oyentes:
+		_oyentes.append(oyente)
+
+
+def desuscribir(oyente: Callable[[list[dict]], None]) -> None:
+	"""Quita un oyente registrado con `suscribir`."""
+	with _lock_oyentes:
+		if oyente in _oyentes:
+			_oyentes.remove(oyente)
+
+
+def notificaciones_activas() -> bool:
+	"""True si el receptor está levantado y registrado en n8n."""
+	return _receptor is not None
+
+
+def _despachar(eventos: list[dict]) -> None:
+	"""Aplica los envíos a la réplica y avisa a los oyentes."""
+	aplicar_cambios(eventos)
+	with _lock_oyentes:
+		oyentes = list(_oyentes)
+	for oyente in oyentes:
+		try:
+			oyente(eventos)
+		except Exception:
+			# Un oyente con errores no debe cortar la entrega a los demás
+			pass
+
+
+def _crear_manejador(token: str) -> type[BaseHTTPRequestHandler]:
+	"""Arma la clase manejadora que solo acepta avisos con el token indicado."""
+
+	class ManejadorEventos(BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+
+		def do_POST(self) -> None:
+			largo = int(self.headers.get("Content-Length") or 0)
+			cuerpo = self.rfile.read(largo) if largo else b""
+			if self.path != RUTA_EVENTOS:
+				self._responder(404)
+				return
+			if not hmac.compare_digest(self.headers.get("X-Token") or "", token):
+				self._responder(401)
+				return
+			try:
+				aviso = json.loads(cuerpo or b"{}")
+			except ValueError:
+				self._responder(400)
+				return
+			eventos = aviso.get("eventos") if isinstance(aviso, dict) else None
+			if not isinstance(eventos, list):
+				self._responder(400)
+				return
+			self._responder(204)
+			eventos = [e for e in eventos if isinstance(e, dict)]
+			if eventos:
+				if _receptor is not None:
+					_receptor.recibidos += len(eventos)
+				_despachar(eventos)
+
+		def _responder(self, estado: int) -> None:
+			self.send_response(estado)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+
+		def log_message(self, formato: str, *args) -> None:
+			pass
+
+	return ManejadorEventos
+
+
+def _registrar(
+	session_id: str,
+	url: str,
+	token: str,
+	cancelar: bool = False,
+	prioridad: str = PRIORIDAD_INTERACTIVA,
+) -> tuple[bool, str | None]:
+	"""Envía la intención `suscribir_eventos` y devuelve (ok, mensaje de error)."""
+	parametros = {"url": url, "cancelar": True} if cancelar else {"url": url, "token": token, "ttl": NOTIFICACIONES_TTL}
+	req = SolicitudN8n(
+		entrada_chat = "Cancelar notificaciones de cambios" if cancelar else "Registrar notificaciones de cambios",
+		id_sesion = session_id,
+		intencion = INTENCION_SUSCRIBIR,
+		parametros = parametros,
+		prioridad = prioridad,
+	)
+	res = enviar_consulta(req)
+	if not res.ok:
+		return False, res.mensaje or "n8n no respondió a la suscripción."
+	if not cancelar and not (isinstance(res.datos, dict) and res.datos.get("suscripto")):
+		return False, res.mensaje or "El workflow no aceptó la suscripción (¿falta la ruta suscribir_eventos?)."
+	return True, None
+
+
+def _renovar(receptor: _Receptor, session_id: str) -> None:
+	"""Renueva la suscripción a mitad de su vigencia hasta que se detenga el receptor."""
+	while not receptor.detenido.wait(NOTIFICACIONES_TTL / 2):
+		_registrar(session_id, receptor.url, receptor.token, prioridad=PRIORIDAD_FONDO)
+
+
+def iniciar_notificaciones(
+	session_id: str,
+	host: str = NOTIFICACIONES_HOST,
+	puerto: int = NOTIFICACIONES_PUERTO,
+	url_publica: str = NOTIFICACIONES_URL,
+) -> tuple[bool, str | None]:
+	"""
+	Levanta el receptor de avisos y lo registra en el workflow.
+
+	Args:
+		session_id (str): ID de sesión del operador.
+		host (str): Dirección donde escucha el receptor.
+		puerto (int): Puerto del receptor (0 = notificaciones desactivadas).
+		url_publica (str): URL que se registra en n8n; vacía = la del propio receptor.
+
+	Returns:
+		tuple[bool, str | None]: (activo, mensaje de error si no se pudo activar).
+	"""
+	global _receptor
+	if _receptor is not None:
+		return True, None
+	if not puerto:
+		return False, None
+
+	token = secrets.token_urlsafe(24)
+	try:
+		servidor = ThreadingHTTPServer((host, puerto), _crear_manejador(token))
+	except OSError as error:
+		return False, f"No se pudo abrir el receptor en {host}:{puerto}: {error}"
+	servidor.daemon_threads = True
+	url = url_publica or f"http://{host}:{servidor.server_address[1]}{RUTA_EVENTOS}"
+
+	threading.Thread(target=servidor.serve_forever, name="notificaciones", daemon=True).start()
+	ok, error = _registrar(session_id, url, token)
+	if not ok:
+		servidor.shutdown()
+		servidor.server_close()
+		return False, error
+
+	_receptor = _Receptor(servidor, url, token)
+	threading.Thread(target=_renovar, args=(_receptor, session_id), name="notificaciones-renovacion", daemon=True).start()
+	return True, None
+
+
+def detener_notificaciones(session_id: str) -> None:
+	"""Cancela la suscripción en n8n (si se puede) y apaga el receptor."""
+	global _receptor
+	receptor, _receptor = _receptor, None
+	if receptor is None:
+		return
+	receptor.detenido.set()
+	_registrar(session_id, receptor.url, receptor.token, cancelar=True)
+	receptor.servidor.shutdown()
+	receptor.servidor.server_close()
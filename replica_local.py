@@ -0,0 +1,294 @@
+"""
+Réplica local de envíos
+=======================
+
+Mantiene una copia SQLite de la vista `vw_tracking` para que las consultas de
+estado puedan responderse aunque el enlace con n8n sea inestable.
+
+La réplica se actualiza de forma incremental mediante la intención `sync`:
+el cliente envía la última marca de agua conocida (fecha de último movimiento
+y código de envío) y n8n devuelve, en lotes, solo las filas modificadas desde
+entonces.
+
+Funciones públicas:
+    - sincronizar_replica: Trae los cambios pendientes desde n8n
+    - aplicar_cambios: Aplica envíos recibidos por notificación (sin mover la marca de agua)
+    - buscar_envio: Busca un envío en la réplica y devuelve su antigüedad
+    - describir_antiguedad: Texto amigable para la antigüedad de la réplica
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from config import REPLICA_PATH, REPLICA_LOTE
+from data_models import SolicitudN8n
+from n8n_client import enviar_consulta
+from utils.formateo import normalizar_registros_respuesta
+from utils.planificador import PRIORIDAD_LOTE
+
+INTENCION_SYNC = "sync"
+
+# Marca de agua inicial: trae toda la tabla en la primera sincronización
+MARCA_INICIAL = "1970-01-01T00:00:00Z"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS envios (
+	codigo_envio TEXT PRIMARY KEY COLLATE NOCASE,
+	marca_sync TEXT,
+	registro TEXT NOT NULL,
+	sincronizado_en REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marca_agua (
+	id INTEGER PRIMARY KEY CHECK (id = 1),
+	fecha TEXT NOT NULL,
+	codigo TEXT NOT NULL,
+	actualizado_en REAL NOT NULL
+);
+"""
+
+_UPSERT_ENVIO = (
+	"INSERT INTO envios (codigo_envio, marca_sync, registro, sincronizado_en) VALUES (?, ?, ?, ?) "
+	"ON CONFLICT(codigo_envio) DO UPDATE SET marca_sync = excluded.marca_sync, "
+	"registro = excluded.registro, sincronizado_en = excluded.sincronizado_en"
+)
+
+
+def _conectar(path: str = REPLICA_PATH) -> sqlite3.Connection:
+	"""
+	Abre la base de la réplica y crea el esquema si no existe.
+
+	Args:
+		path (str): Ruta del archivo SQLite.
+
+	Returns:
+		sqlite3.Connection: Conexión lista para usar.
+	"""
+	directorio = os.path.dirname(path)
+	if directorio:
+		os.makedirs(directorio, exist_ok=True)
+	conn = sqlite3.connect(path)
+	conn.executescript(_ESQUEMA)
+	return conn
+
+
+def _leer_marca_agua(conn: sqlite3.Connection) -> tuple[str, str, float | None]:
+	"""Devuelve (fecha, código, momento de la última sincronización)."""
+	fila = conn.execute("SELECT fecha, codigo, actualizado_en FROM marca_agua WHERE id = 1").fetchone()
+	if fila is None:
+		return MARCA_INICIAL, "", None
+	return fila[0], fila[1], fila[2]
+
+
+def _instante(marca: Any) -> datetime | None:
+	"""
+	Convierte una marca_sync en fecha con zona horaria (UTC si no la trae).
+
+	Examples:
+		>>> _instante("2024-05-01T10:00:00.000Z") == _instante("2024-05-01 07:00:00-03:00")
+		True
+		>>> _instante(None) is None
+		True
+	"""
+	if not marca:
+		return None
+	try:
+		instante = datetime.fromisoformat(str(marca).replace("Z", "+00:00"))
+	except ValueError:
+		return None
+	return instante if instante.tzinfo else instante.replace(tzinfo=timezone.utc)
+
+
+def _aplicar_lote(conn: sqlite3.Connection, registros: list[dict]) -> int:
+	"""
+	Inserta o actualiza un lote de envíos y avanza la marca de agua.
+
+	Todo el lote se aplica en una única transacción: si algo falla, la marca
+	de agua no avanza y el lote se vuelve a pedir en la próxima sincronización.
+	Las filas sin `codigo_envio` o sin una `marca_sync` válida se descartan:
+	no se pueden ubicar respecto de la marca de agua. La marca nunca retrocede.
+
+	Args:
+		conn: Conexión a la réplica.
+		registros: Filas devueltas por n8n, ordenadas por (marca_sync, codigo_envio).
+
+	Returns:
+		int: Cantidad de filas aplicadas.
+	"""
+	ahora = time.time()
+	filas = [
+		(str(r["codigo_envio"]), r["marca_sync"], json.dumps(r, ensure_ascii=False, default=str), ahora)
+		for r in registros
+		if isinstance(r, dict) and r.get("codigo_envio") is not None and _instante(r.get("marca_sync"))
+	]
+	if not filas:
+		return 0
+
+	fecha, codigo, _ = _leer_marca_agua(conn)
+	ultimo = filas[-1]
+	# n8n manda marca_sync con microsegundos y ordena los códigos con COLLATE "C"
+	# (byte a byte), el mismo orden que la comparación de cadenas de Python
+	avanza = (_instante(ultimo[1]), ultimo[0]) > (_instante(fecha) or _instante(MARCA_INICIAL), codigo)
+	with conn:
+		conn.executemany(
+			_UPSERT_ENVIO,
+			filas,
+		)
+		if avanza:
+			conn.execute(
+				"INSERT INTO marca_agua (id, fecha, codigo, actualizado_en) VALUES (1, ?, ?, ?) "
+				"ON CONFLICT(id) DO UPDATE SET fecha = excluded.fecha, codigo = excluded.codigo, "
+				"actualizado_en = excluded.actualizado_en",
+				(ultimo[1], ultimo[0], ahora),
+			)
+	return len(filas)
+
+
+def _marcar_sincronizado(conn: sqlite3.Connection) -> None:
+	"""Registra que la réplica está al día aunque no haya habido cambios."""
+	fecha, codigo, _ = _leer_marca_agua(conn)
+	with conn:
+		conn.execute(
+			"INSERT INTO marca_agua (id, fecha, codigo, actualizado_en) VALUES (1, ?, ?, ?) "
+			"ON CONFLICT(id) DO UPDATE SET actualizado_en = excluded.actualizado_en",
+			(fecha, codigo, time.time()),
+		)
+
+
+def sincronizar_replica(session_id: str, lote: int = REPLICA_LOTE) -> tuple[bool, int, str | None]:
+	"""
+	Sincroniza la réplica con n8n pidiendo solo los cambios desde la marca de agua.
+
+	Pide lotes de hasta `lote` filas hasta recibir uno incompleto. Cada lote se
+	aplica y confirma por separado, de modo que una caída a mitad de camino no
+	obliga a repetir lo ya sincronizado. Si un lote completo no mueve la marca
+	de agua (todas sus filas descartadas), se corta con error en lugar de
+	pedir el mismo lote una y otra vez.
+
+	Args:
+		session_id (str): ID de sesión del operador.
+		lote (int): Tamaño máximo de cada lote.
+
+	Returns:
+		tuple[bool, int, str | None]:
+			- bool: True si la sincronización terminó sin errores
+			- int: Cantidad de envíos actualizados
+			- str | None: Mensaje de error, si lo hubo
+	"""
+	conn = _conectar()
+	total = 0
+	try:
+		while True:
+			fecha, codigo, _ = _leer_marca_agua(conn)
+			req = SolicitudN8n(
+				entrada_chat = "Sincronizar réplica local de envíos",
+				id_sesion = session_id,
+				intencion = INTENCION_SYNC,
+				parametros = {"desde": fecha, "desde_codigo": codigo, "limite": lote},
+				prioridad = PRIORIDAD_LOTE,
+			)
+			res = enviar_consulta(req)
+			if not res.ok:
+				return False, total, res.mensaje
+
+			# `recibidos` dice si n8n tiene más filas; `total` cuenta solo las aplicadas
+			registros = [r for r in normalizar_registros_respuesta(res.datos) if isinstance(r, dict) and r]
+			recibidos = len(registros)
+			total += _aplicar_lote(conn, registros)
+			if recibidos < lote:
+				_marcar_sincronizado(conn)
+				return True, total, None
+			if _leer_marca_agua(conn)[:2] == (fecha, codigo):
+				return False, total, "n8n devolvió un lote sin marca_sync válida: la marca de agua no puede avanzar."
+	finally:
+		conn.close()
+
+
+def aplicar_cambios(registros: list[dict]) -> int:
+	"""
+	Actualiza la réplica con envíos recibidos por notificación de n8n.
+
+	Solo reemplaza las filas: la marca de agua no se mueve, porque la réplica
+	puede estar atrasada respecto de los avisos. La próxima sincronización
+	vuelve a traer estas filas, lo que no cambia el resultado.
+
+	Args:
+		registros (list[dict]): Filas de `vw_tracking` con `codigo_envio`.
+
+	Returns:
+		int: Cantidad de envíos actualizados (0 si la réplica no existe).
+	"""
+	if not os.path.exists(REPLICA_PATH):
+		return 0
+	ahora = time.time()
+	filas = [
+		(str(r["codigo_envio"]), r.get("marca_sync"), json.dumps(r, ensure_ascii=False, default=str), ahora)
+		for r in registros
+		if isinstance(r, dict) and r.get("codigo_envio") is not None
+	]
+	if not filas:
+		return 0
+	conn = _conectar()
+	try:
+		with conn:
+			conn.executemany(
+				_UPSERT_ENVIO,
+				filas,
+			)
+	finally:
+		conn.close()
+	return len(filas)
+
+
+def buscar_envio(codigo: str) -> tuple[dict | None, float | None]:
+	"""
+	Busca un envío en la réplica local.
+
+	Args:
+		codigo (str): Código de envío (no distingue mayúsculas).
+
+	Returns:
+		tuple[dict | None, float | None]: Registro encontrado (o None) y
+		segundos transcurridos desde la última sincronización (o None si la
+		réplica nunca se sincronizó).
+	"""
+	if not os.path.exists(REPLICA_PATH):
+		return None, None
+	conn = _conectar()
+	try:
+		_, _, actualizado_en = _leer_marca_agua(conn)
+		fila = conn.execute("SELECT registro FROM envios WHERE codigo_envio = ?", (codigo.strip(),)).fetchone()
+	finally:
+		conn.close()
+
+	antiguedad = time.time() - actualizado_en if actualizado_en is not None else None
+	if fila is None:
+		return None, antiguedad
+	registro: dict[str, Any] = json.loads(fila[0])
+	registro.pop("marca_sync", None)
+	return registro, antiguedad
+
+
+def describir_antiguedad(segundos: float | None) -> str:
+	"""
+	Convierte la antigüedad de la réplica en un texto legible.
+
+	Examples:
+		>>> describir_antiguedad(42)
+		'hace 42 s'
+		>>> describir_antiguedad(5400)
+		'hace 1 h 30 min'
+	"""
+	if segundos is None:
+		return "nunca sincronizada"
+	segundos = max(0, int(segundos))
+	if segundos < 60:
+		return f"hace {segundos} s"
+	minutos = segundos // 60
+	if minutos < 60:
+		return f"hace {minutos} min"
+	horas, minutos = divmod(minutos, 60)
+	return f"hace {horas} h {minutos} min" if minutos else f"hace {horas} h"
@@ -8,6 +8,10 @@ configuración de salida mediante interfaz de usuario.
 
 Funciones públicas:
     - generar_reporte: Genera un reporte en el formato especificado
+    - encolar_reporte: Genera un reporte en segundo plano (la escritura en un proceso aparte)
+    - generar_reporte_por_grupo: Separa un reporte en hojas o archivos por columna
+    - EscritorIncremental: Escribe un reporte por partes a medida que llegan
+    - resumen_reportes_en_curso: Progreso de los reportes en segundo plano
     - solicitar_configuracion_salida: Solicita formato y directorio al usuario
 
 Dependencias:
@@ -18,11 +22,15 @@ Dependencias:
 
 import json
 import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Tuple
+from typing import Any, Callable, Tuple
 
 import pandas as pd
-from config import REPORTS_DIR
+from config import REPORTS_DIR, REPORTE_PROCESOS, REPORTE_FILAS_POR_BLOQUE
+from utils.trazas import span
 
 try:
     import tkinter as tk
@@ -34,6 +42,76 @@ except Exception:  # pragma: no cover
 LAST_REPORT_PATH: str | None = None
 DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads")
 
+# Tipos de las columnas conocidas de las vistas de envíos. Las columnas de
+# texto con pocos valores distintos se guardan como categóricas (un código
+# entero por fila en lugar de un objeto Python por celda).
+ESQUEMA_ENVIOS: dict[str, str] = {
+    # Categóricas
+    "estado": "category",
+    "estado_actual": "category",
+    "tipo_envio": "category",
+    "localidad_remitente": "category",
+    "provincia_remitente": "category",
+    "localidad_destino": "category",
+    "provincia_destino": "category",
+    "localidad_asignada": "category",
+    "provincia_asignada": "category",
+    "codigo_postal": "category",
+    "centro_actual": "category",
+    "centro_distribucion": "category",
+    "repartidor_actual": "category",
+    "repartidor_responsable": "category",
+    "repartidor_nombre": "category",
+    "nombre_repartidor": "category",
+    "motivo_fallo": "category",
+    "motivo_de_fallo": "category",
+    # Enteros con nulos
+    "legajo": "Int64",
+    "total_intentos_entrega": "Int64",
+    "total_entregados": "Int64",
+    "total_fallidos": "Int64",
+    # Decimales con nulos
+    "peso": "Float64",
+    "largo": "Float64",
+    "alto": "Float64",
+    "ancho": "Float64",
+    "tasa_exito_porcentaje": "Float64",
+    # Fechas (en UTC)
+    "fecha_creacion": "datetime",
+    "fecha_ultimo_movimiento": "datetime",
+    "fecha_hora_movimiento": "datetime",
+    "fecha_fallo": "datetime",
+}
+
+# Tipo decidido para columnas fuera del esquema, inferido una sola vez por
+# (tipo de reporte, columna): la misma columna puede ser categórica en un
+# reporte y texto libre en otro
+_TIPOS_INFERIDOS: dict[tuple[str, str], str | None] = {}
+
+# Proporción máxima de valores distintos para que una columna desconocida sea categórica
+_MAX_PROPORCION_CATEGORICA = 0.5
+
+# Reportes generándose en segundo plano: ruta destino -> progreso
+REPORTES_EN_CURSO: dict[str, dict] = {}
+
+_NUM_PROCESOS = REPORTE_PROCESOS or os.cpu_count() or 1
+_pool_procesos: ProcessPoolExecutor | None = None
+_coordinador = ThreadPoolExecutor(max_workers=_NUM_PROCESOS, thread_name_prefix="reportes")
+_lock_reportes = threading.Lock()
+
+
+def _obtener_pool_procesos() -> ProcessPoolExecutor:
+    """
+    Devuelve el pool de procesos compartido, creándolo la primera vez.
+
+    Returns:
+        ProcessPoolExecutor: Pool con un proceso por núcleo (o REPORTE_PROCESOS)
+    """
+    global _pool_procesos
+    if _pool_procesos is None:
+        _pool_procesos = ProcessPoolExecutor(max_workers=_NUM_PROCESOS)
+    return _pool_procesos
+
 
 def _ensure_dir(path: str) -> None:
     """
@@ -99,14 +177,46 @@ def _normalize_data(data: Any) -> list[dict]:
     return [{"valor": data}]
 
 
-def _to_dataframe(data: Any) -> pd.DataFrame:
+def _aplanar_bloque(registros: list[dict]) -> pd.DataFrame:
+    """
+    Aplana un bloque de registros con json_normalize.
+    
+    Las filas de las vistas de envíos llegan planas: en ese caso se arma el
+    DataFrame directamente, unas cuatro veces más rápido que json_normalize.
+    
+    Args:
+        registros (list[dict]): Bloque de registros a aplanar
+    
+    Returns:
+        pd.DataFrame: DataFrame del bloque
+    """
+    if not any(isinstance(valor, dict) for registro in registros for valor in registro.values()):
+        return pd.DataFrame.from_records(registros)
+    return pd.json_normalize(registros, sep=".")
+
+
+def _to_dataframe(
+    data: Any,
+    al_avanzar: Callable[[int, int], None] | None = None,
+    tipo_reporte: str | None = None,
+) -> pd.DataFrame:
     """
     Convierte datos normalizados a un DataFrame de pandas.
     
-    Aplana estructuras JSON anidadas usando json_normalize.
+    Aplana estructuras JSON anidadas usando json_normalize. Si hay más de
+    REPORTE_FILAS_POR_BLOQUE registros, se aplanan por bloques (para informar
+    el avance) y se concatenan al final. El aplanado corre en este proceso:
+    mandar los diccionarios al pool costaba más que aplanarlos (100.000 filas
+    planas: 0,66 s en el pool, 0,35 s con json_normalize aquí y 0,09 s
+    armando el DataFrame directo). Luego se aplican los tipos compactos de
+    ESQUEMA_ENVIOS.
     
     Args:
         data (Any): Datos a convertir
+        al_avanzar (Callable[[int, int], None] | None): Se invoca con
+            (bloques listos, bloques totales) a medida que avanza el aplanado
+        tipo_reporte (str | None): Reporte al que pertenecen los datos (su
+            nombre base); los tipos inferidos se recuerdan por reporte
     
     Returns:
         pd.DataFrame: DataFrame con los datos procesados
@@ -115,12 +225,118 @@ def _to_dataframe(data: Any) -> pd.DataFrame:
         - Campos anidados se aplanan con separador "."
         - Si no hay registros, retorna DataFrame vacío
     """
+    if isinstance(data, pd.DataFrame):
+        return _optimizar_tipos(data, tipo_reporte)
     registros = _normalize_data(data)
     if not registros:
         return pd.DataFrame()
-    if all(isinstance(r, dict) for r in registros):
-        return pd.json_normalize(registros, sep=".")
-    return pd.DataFrame(registros, columns=["valor"])
+    if not all(isinstance(r, dict) for r in registros):
+        return pd.DataFrame(registros, columns=["valor"])
+    if len(registros) <= REPORTE_FILAS_POR_BLOQUE:
+        return _optimizar_tipos(_aplanar_bloque(registros), tipo_reporte)
+
+    bloques = [
+        registros[inicio:inicio + REPORTE_FILAS_POR_BLOQUE]
+        for inicio in range(0, len(registros), REPORTE_FILAS_POR_BLOQUE)
+    ]
+    frames = []
+    for listos, bloque in enumerate(bloques, 1):
+        frames.append(_aplanar_bloque(bloque))
+        if al_avanzar:
+            al_avanzar(listos, len(bloques))
+    return _optimizar_tipos(pd.concat(frames, ignore_index=True, sort=False), tipo_reporte)
+
+
+def _tipo_columna(nombre: str, serie: pd.Series, tipo_reporte: str | None = None) -> str | None:
+    """
+    Decide el tipo de una columna: del esquema si es conocida, inferido si no.
+    
+    Para columnas nuevas la decisión se toma la primera vez que aparecen en
+    un tipo de reporte y se reutiliza en los siguientes reportes del mismo
+    tipo. Sin tipo de reporte se infiere con los datos de este DataFrame.
+    
+    Args:
+        nombre (str): Nombre de la columna (los campos anidados usan ".")
+        serie (pd.Series): Valores de la columna
+        tipo_reporte (str | None): Nombre base del reporte
+    
+    Returns:
+        str | None: "category", "Int64", "Float64", "datetime" o None (sin cambios)
+    """
+    base = nombre.rsplit(".", 1)[-1]
+    if base in ESQUEMA_ENVIOS:
+        return ESQUEMA_ENVIOS[base]
+    clave = (tipo_reporte, nombre)
+    if tipo_reporte is not None and clave in _TIPOS_INFERIDOS:
+        return _TIPOS_INFERIDOS[clave]
+
+    tipo = None
+    no_nulos = serie.dropna()
+    if len(no_nulos) > 1 and all(isinstance(v, str) for v in no_nulos):
+        if no_nulos.nunique() <= len(no_nulos) * _MAX_PROPORCION_CATEGORICA:
+            tipo = "category"
+    if tipo_reporte is not None:
+        _TIPOS_INFERIDOS[clave] = tipo
+    return tipo
+
+
+def _convertir_columna(serie: pd.Series, tipo: str) -> pd.Series:
+    """
+    Convierte una columna al tipo indicado.
+    
+    Si la conversión perdería valores (textos que no son números o fechas), la
+    columna se deja como estaba.
+    
+    Args:
+        serie (pd.Series): Columna original
+        tipo (str): Tipo destino (ver ESQUEMA_ENVIOS)
+    
+    Returns:
+        pd.Series: Columna convertida, o la original si no se pudo convertir
+    """
+    if tipo == "category":
+        # Un DataFrame ya optimizado (vista previa, reporte por grupo) se vuelve a pasar
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            return serie
+        if serie.map(lambda v: isinstance(v, (list, dict))).any():
+            return serie
+        return serie.astype("category")
+
+    if tipo == "datetime":
+        # Se normalizan a UTC sin zona: Excel no admite zonas horarias y así
+        # la exportación a CSV es varias veces más rápida
+        convertida = pd.to_datetime(serie, errors="coerce", utc=True, format="ISO8601").dt.tz_convert(None)
+    else:
+        convertida = pd.to_numeric(serie, errors="coerce")
+        if tipo == "Int64" and not (convertida.dropna() % 1 == 0).all():
+            return serie
+        convertida = convertida.astype(tipo)
+
+    if convertida.isna().sum() > serie.isna().sum():
+        return serie
+    return convertida
+
+
+def _optimizar_tipos(df: pd.DataFrame, tipo_reporte: str | None = None) -> pd.DataFrame:
+    """
+    Aplica a un DataFrame de envíos tipos compactos según ESQUEMA_ENVIOS.
+    
+    Estados, localidades y repartidores pasan a categóricas, contadores a
+    enteros con nulos y fechas a datetime. Reduce la memoria del reporte y
+    acelera la vista previa y la exportación.
+    
+    Args:
+        df (pd.DataFrame): DataFrame recién aplanado
+        tipo_reporte (str | None): Nombre base del reporte (ver `_tipo_columna`)
+    
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas convertidas
+    """
+    for nombre in df.columns:
+        tipo = _tipo_columna(str(nombre), df[nombre], tipo_reporte)
+        if tipo is not None:
+            df[nombre] = _convertir_columna(df[nombre], tipo)
+    return df
 
 
 def _preview(df: pd.DataFrame, rows: int = 5, max_cols: int = 5) -> None:
@@ -328,26 +544,327 @@ def generar_reporte(
         "C:\\Users\\...\\reporte.csv"
     
     Nota:
-        La ruta del último reporte generado se guarda en LAST_REPORT_PATH
+        La ruta del último reporte generado se guarda en LAST_REPORT_PATH.
+        Cada fase se mide como span de la última traza (`utils.trazas`), que
+        es la de la consulta que trajo los datos.
     """
     global LAST_REPORT_PATH
 
-    df = _to_dataframe(data)
-    if preview:
-        _preview(df)
+    with span("reporte.generar", archivo=filename, formato=formato or "xlsx"):
+        with span("reporte.normalizar") as normalizar:
+            df = _to_dataframe(data, tipo_reporte=filename)
+            normalizar.atributo("filas", len(df))
+        if preview:
+            with span("reporte.vista_previa"):
+                _preview(df)
+
+        ext, path = _ruta_destino(filename, formato, directorio, use_timestamp)
+        with span("reporte.escribir", formato=ext):
+            _escribir_archivo(df, path, ext)
+
+    LAST_REPORT_PATH = path
+    print(f"Archivo guardado en: {path}")
+    return path
+
+
+def _nombre_seguro(valor: Any) -> str:
+    """Convierte un valor en un fragmento válido para nombres de archivo u hojas."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return "sin_asignar"
+    return re.sub(r"[^\w-]+", "_", str(valor)).strip("_") or "sin_asignar"
 
+
+def generar_reporte_por_grupo(
+    data: Any,
+    columna: str,
+    filename: str = "reporte",
+    formato: str | None = None,
+    directorio: str | None = None,
+    use_timestamp: bool = True,
+) -> list[str]:
+    """
+    Genera un reporte separado según los valores de una columna.
+    
+    Pensado para reportes de varios repartidores o localidades pedidos en una
+    sola consulta: en Excel se arma un único archivo con una hoja por valor y
+    en CSV un archivo por valor.
+    
+    Args:
+        data (Any): Datos a incluir en el reporte
+        columna (str): Columna por la que se separa (ej: "repartidor_actual")
+        filename (str, optional): Nombre base del archivo. Default: "reporte"
+        formato (str | None, optional): "xlsx" o "csv". Default: "xlsx"
+        directorio (str | None, optional): Directorio destino
+        use_timestamp (bool, optional): Si agregar timestamp al nombre. Default: True
+    
+    Returns:
+        list[str]: Rutas de los archivos generados
+    
+    Nota:
+        Si la columna no está en los datos, se genera un reporte único.
+    """
+    global LAST_REPORT_PATH
+
+    df = _to_dataframe(data, tipo_reporte=filename)
+    if df.empty or columna not in df.columns:
+        return [generar_reporte(df, filename, formato, directorio, use_timestamp, preview=False)]
+
+    ext, path = _ruta_destino(filename, formato, directorio, use_timestamp)
+    grupos = df.groupby(columna, sort=True, dropna=False, observed=True)
+
+    if ext == "csv":
+        base = path[: -len(".csv")]
+        paths = []
+        for valor, grupo in grupos:
+            destino = f"{base}_{_nombre_seguro(valor)}.csv"
+            grupo.to_csv(destino, index=False, encoding="utf-8")
+            paths.append(destino)
+    else:
+        hojas_usadas: set[str] = set()
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            for valor, grupo in grupos:
+                # Excel limita los nombres de hoja a 31 caracteres y deben ser únicos
+                base_hoja = _nombre_seguro(valor)[:31]
+                hoja, sufijo = base_hoja, 2
+                while hoja.lower() in hojas_usadas:
+                    hoja = f"{base_hoja[:28]}_{sufijo}"
+                    sufijo += 1
+                hojas_usadas.add(hoja.lower())
+                grupo.to_excel(writer, sheet_name=hoja, index=False)
+        paths = [path]
+
+    LAST_REPORT_PATH = paths[-1]
+    for destino in paths:
+        print(f"Archivo guardado en: {destino}")
+    return paths
+
+
+def _ruta_destino(filename: str, formato: str | None, directorio: str | None, use_timestamp: bool) -> Tuple[str, str]:
+    """
+    Calcula la extensión y la ruta completa del reporte, creando el directorio.
+    
+    Returns:
+        Tuple[str, str]: (extensión, ruta del archivo)
+    """
     ext = (formato or "xlsx").lower()
     destino = directorio or REPORTS_DIR or DEFAULT_DOWNLOAD_DIR
     _ensure_dir(destino)
 
     nombre = f"{filename}_{_timestamp()}" if use_timestamp else filename
-    path = os.path.join(destino, f"{nombre}.{ext}")
+    return ext, os.path.join(destino, f"{nombre}.{ext}")
 
+
+def _escribir_archivo(df: pd.DataFrame, path: str, ext: str) -> str:
+    """
+    Escribe el DataFrame en disco como CSV o Excel.
+    
+    Es una función de módulo para poder ejecutarse en el pool de procesos.
+    
+    Returns:
+        str: Ruta del archivo escrito
+    """
     if ext == "csv":
         df.to_csv(path, index=False, encoding="utf-8")
     else:
         df.to_excel(path, index=False, engine="openpyxl")
+    return path
+
+
+def encolar_reporte(
+    data: Any,
+    filename: str = "reporte",
+    formato: str | None = None,
+    directorio: str | None = None,
+    use_timestamp: bool = True,
+    preview: bool = False,
+) -> Future:
+    """
+    Genera un reporte en segundo plano, sin bloquear la consola.
+    
+    El aplanado corre en un hilo y la escritura del archivo (la parte más
+    costosa en Excel) en un proceso del pool. Varios reportes encolados se
+    escriben en paralelo, cada uno en su propio núcleo. Al terminar se avisa
+    por consola y se actualiza LAST_REPORT_PATH.
+    
+    Args:
+        data (Any): Datos a incluir en el reporte
+        filename (str, optional): Nombre base del archivo. Default: "reporte"
+        formato (str | None, optional): "xlsx" o "csv". Default: "xlsx"
+        directorio (str | None, optional): Directorio destino
+        use_timestamp (bool, optional): Si agregar timestamp al nombre. Default: True
+        preview (bool, optional): Si mostrar la vista previa antes de encolar
+            (aplana los datos en el momento; conviene solo en reportes chicos).
+            Default: False
+    
+    Returns:
+        Future: Se resuelve con la ruta del archivo generado
+    """
+    if preview:
+        data = _to_dataframe(data, tipo_reporte=filename)
+        _preview(data)
+    ext, path = _ruta_destino(filename, formato, directorio, use_timestamp)
+    progreso = {"archivo": os.path.basename(path), "etapa": "en cola", "listos": 0, "bloques": 0}
+    with _lock_reportes:
+        REPORTES_EN_CURSO[path] = progreso
+
+    def avanzar(listos: int, bloques: int) -> None:
+        progreso.update(etapa="aplanando", listos=listos, bloques=bloques)
+
+    def trabajo() -> str:
+        progreso["etapa"] = "aplanando"
+        df = _to_dataframe(data, al_avanzar=avanzar, tipo_reporte=filename)
+        progreso["etapa"] = "escribiendo"
+        return _obtener_pool_procesos().submit(_escribir_archivo, df, path, ext).result()
+
+    futuro = _coordinador.submit(trabajo)
+    futuro.add_done_callback(lambda f: _finalizar_reporte(path, f))
+    return futuro
 
+
+def _finalizar_reporte(path: str, futuro: Future) -> None:
+    """Quita el reporte de la lista en curso y avisa el resultado por consola."""
+    global LAST_REPORT_PATH
+
+    with _lock_reportes:
+        REPORTES_EN_CURSO.pop(path, None)
+
+    error = futuro.exception()
+    if error is not None:
+        print(f"\n❌ Error al generar {os.path.basename(path)}: {error}")
+        return
     LAST_REPORT_PATH = path
-    print(f"Archivo guardado en: {path}")
-    return path
+    print(f"\n✅ Reporte generado en segundo plano. Archivo guardado en: {path}")
+
+
+def resumen_reportes_en_curso() -> list[str]:
+    """
+    Describe el progreso de los reportes que se están generando en segundo plano.
+    
+    Returns:
+        list[str]: Una línea por reporte (ej: "reporte_x.xlsx: aplanando 3/10 bloques")
+    """
+    with _lock_reportes:
+        progresos = list(REPORTES_EN_CURSO.values())
+    lineas = []
+    for progreso in progresos:
+        detalle = progreso["etapa"]
+        if progreso["etapa"] == "aplanando" and progreso["bloques"]:
+            detalle += f" {progreso['listos']}/{progreso['bloques']} bloques"
+        lineas.append(f"{progreso['archivo']}: {detalle}")
+    return lineas
+
+
+def _valor_excel(valor: Any) -> Any:
+    """Convierte un valor de pandas/numpy en uno que openpyxl sepa escribir."""
+    if valor is None or valor is pd.NA or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and valor != valor:  # NaN
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if hasattr(valor, "item"):  # escalares de numpy
+        return valor.item()
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False, default=str)
+    return valor
+
+
+class EscritorIncremental:
+    """
+    Escribe un reporte por partes, a medida que llegan los datos.
+    
+    Pensado para reportes pedidos por fragmentos: cada parte se agrega al
+    archivo en cuanto llega, sin juntar todo el reporte en memoria. En CSV se
+    anexan filas al archivo; en Excel se usa el modo de solo escritura de
+    openpyxl. Las columnas del archivo son las de la primera parte con datos.
+    
+    Usage:
+        with EscritorIncremental("reporte_envios_fallidos", "xlsx") as escritor:
+            for parte in partes:
+                escritor.agregar(parte)
+        print(escritor.path)
+    
+    Si ocurre una excepción dentro del bloque `with`, el archivo parcial se borra.
+    """
+
+    def __init__(
+        self,
+        filename: str = "reporte",
+        formato: str | None = None,
+        directorio: str | None = None,
+        use_timestamp: bool = True,
+    ):
+        self.ext, self.path = _ruta_destino(filename, formato, directorio, use_timestamp)
+        self.tipo_reporte = filename
+        self.filas = 0
+        self._cerrado = False
+        self._columnas: list | None = None
+        self._libro = None
+        self._hoja = None
+        if self.ext != "csv":
+            from openpyxl import Workbook
+
+            self._libro = Workbook(write_only=True)
+            self._hoja = self._libro.create_sheet("Sheet1")
+
+    def agregar(self, data: Any) -> int:
+        """
+        Agrega una parte del reporte al archivo.
+        
+        Args:
+            data (Any): Registros o DataFrame de la parte
+        
+        Returns:
+            int: Filas agregadas
+        """
+        df = _to_dataframe(data, tipo_reporte=self.tipo_reporte)
+        if df.empty:
+            return 0
+        if self._columnas is None:
+            self._columnas = list(df.columns)
+            if self._hoja is not None:
+                self._hoja.append([str(c) for c in self._columnas])
+        df = df.reindex(columns=self._columnas)
+
+        if self.ext == "csv":
+            df.to_csv(self.path, mode="a" if self.filas else "w", header=not self.filas, index=False, encoding="utf-8")
+        else:
+            for fila in df.itertuples(index=False, name=None):
+                self._hoja.append([_valor_excel(v) for v in fila])
+        self.filas += len(df)
+        return len(df)
+
+    def cerrar(self) -> str:
+        """
+        Termina el archivo y lo registra como último reporte generado.
+        
+        Returns:
+            str: Ruta del archivo
+        """
+        global LAST_REPORT_PATH
+
+        if self._libro is not None:
+            self._libro.save(self.path)
+            self._libro = None
+        elif not self.filas:
+            pd.DataFrame().to_csv(self.path, index=False, encoding="utf-8")
+        self._cerrado = True
+        LAST_REPORT_PATH = self.path
+        print(f"Archivo guardado en: {self.path}")
+        return self.path
+
+    def descartar(self) -> None:
+        """Abandona el reporte y borra el archivo parcial, si lo hubiera."""
+        self._libro = None
+        self._cerrado = True
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "EscritorIncremental":
+        return self
+
+    def __exit__(self, tipo_error, error, traza) -> None:
+        if tipo_error is not None:
+            self.descartar()
+        elif not self._cerrado:
+            self.cerrar()
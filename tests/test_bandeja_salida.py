@@ -0,0 +1,28 @@
+import bandeja_salida
+from data_models import RespuestaN8n
+from handlers import compartir
+from n8n_client import ERROR_SIN_CONEXION
+
+
+def test_archivo_entregado_por_la_bandeja_no_se_vuelve_a_subir(monkeypatch, tmp_path):
+	conectar = bandeja_salida._conectar
+	monkeypatch.setattr(bandeja_salida, "_conectar", lambda: conectar(str(tmp_path / "bandeja.db")))
+	monkeypatch.setattr(bandeja_salida, "BANDEJA_ESPERA_INICIAL", 0)
+	monkeypatch.setattr(compartir, "COMPARTIDOS_PATH", str(tmp_path / "compartidos.json"))
+	reporte = tmp_path / "reporte.xlsx"
+	reporte.write_bytes(b"contenido")
+
+	sin_conexion = RespuestaN8n(ok=False, mensaje="sin conexión", datos=None, error=ERROR_SIN_CONEXION)
+	subidas = []
+	monkeypatch.setattr(compartir, "enviar_archivo", lambda req, ruta: subidas.append(ruta) or sin_conexion)
+	primero = compartir.compartir_archivo_local("sesion", str(reporte), "drive")
+	assert primero["en_bandeja"]
+
+	entregado = RespuestaN8n(ok=True, mensaje="Subido", datos={"url": "https://drive/archivo"})
+	monkeypatch.setattr(bandeja_salida, "enviar_archivo", lambda req, ruta: entregado)
+	assert bandeja_salida.vaciar_bandeja() is None
+
+	segundo = compartir.compartir_archivo_local("sesion", str(reporte), "drive")
+	assert segundo["repetido"]
+	assert segundo["url"] == "https://drive/archivo"
+	assert len(subidas) == 1
@@ -0,0 +1,20 @@
+from data_models import RespuestaN8n
+from handlers import compartir
+from n8n_client import ERROR_SIN_CONEXION
+
+
+def test_pedido_en_bandeja_lleva_el_texto_de_compartir(monkeypatch):
+	encolados = []
+	sin_conexion = RespuestaN8n(ok=False, mensaje="sin conexión", datos=None, error=ERROR_SIN_CONEXION)
+	monkeypatch.setattr(compartir, "enviar_consulta", lambda req: sin_conexion)
+	monkeypatch.setattr(compartir, "encolar", lambda req, descripcion, ruta=None: encolados.append(req) or True)
+	compartir.enviar_reporte_multiplataforma(
+		"sesion", "Generar el reporte de envíos fallidos", "el reporte de envíos fallidos", "fallidos",
+		("drive", "gmail"), {"email_destinatario": "ana@example.com"},
+	)
+	assert [req.entrada_chat for req in encolados] == [
+		"Compartir el reporte de envíos fallidos mediante drive",
+		"Compartir el reporte de envíos fallidos mediante gmail",
+	]
+	assert "email_destinatario" not in encolados[0].parametros
+	assert encolados[1].parametros["email_destinatario"] == "ana@example.com"
@@ -0,0 +1,30 @@
+from utils.contexto import DigestoConversacion, _columnas_id
+
+# Columnas de public.vw_tracking, en el orden de la vista
+COLUMNAS_VW_TRACKING = [
+	"codigo_envio", "peso", "largo", "alto", "ancho", "tipo_envio", "fecha_creacion", "nombre_remitente",
+	"apellido_remitente", "email_remitente", "localidad_remitente", "provincia_remitente",
+	"direccion_remitente_completa", "nombre_destinatario", "apellido_destinatario", "email_destinatario",
+	"localidad_destino", "provincia_destino", "direccion_destino_completa", "estado_actual",
+	"fecha_ultimo_movimiento", "centro_actual", "repartidor_actual", "motivo_fallo",
+]
+
+
+def test_vw_tracking_identifica_solo_el_codigo_de_envio():
+	assert _columnas_id(COLUMNAS_VW_TRACKING) == ["codigo_envio"]
+
+
+def test_codigo_de_envio_no_se_pierde_detras_de_localidad_y_repartidor():
+	columnas = ["repartidor_actual", "localidad_destino", "codigo_envio", "estado_actual", "cantidad", "salida"]
+	assert _columnas_id(columnas) == ["codigo_envio"]
+
+
+def test_alias_legibles_e_id_como_palabra():
+	assert _columnas_id(["ID", "Nombre", "Cód. envío"]) == ["Cód. envío", "ID"]
+
+
+def test_digesto_lleva_los_codigos_de_envio():
+	digesto = DigestoConversacion()
+	registros = [{"repartidor_actual": "Ana", "localidad_destino": "Quilmes", "codigo_envio": f"ENV{i}"} for i in range(3)]
+	digesto.registrar("envíos de Ana", registros)
+	assert digesto.resultados[0]["ids"] == {"codigo_envio": ["ENV0", "ENV1", "ENV2"]}
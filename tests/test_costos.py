@@ -0,0 +1,24 @@
+import json
+
+from utils import costos
+
+METRICAS = {"tokens_entrada": 100, "tokens_salida": 20, "t_agente_ms": 1500}
+
+
+def test_registrar_consumo_escribe_en_segundo_plano(monkeypatch, tmp_path):
+	ruta = tmp_path / "costos.json"
+	monkeypatch.setattr(costos, "COSTOS_PATH", str(ruta))
+	monkeypatch.setattr(costos, "_DEMORA_GUARDADO", 3600.0)
+	costos.reiniciar()
+
+	for _ in range(3):
+		costos.registrar_consumo("consulta_personalizada", "sesion", METRICAS, 2.0)
+	# Nada escrito en el camino de la consulta: un único guardado pendiente
+	assert not ruta.exists()
+	assert costos._guardado_pendiente is not None
+
+	costos._volcar_pendiente()
+	guardado = json.loads(ruta.read_text(encoding="utf-8"))
+	(totales,) = guardado.values()
+	assert totales["consulta_personalizada"]["tokens_entrada"] == 300
+	assert costos.tokens_del_dia() == 360
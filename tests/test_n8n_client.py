@@ -0,0 +1,23 @@
+import n8n_client
+from data_models import SolicitudN8n
+
+
+class _RespuestaFalsa:
+	status_code = 200
+	headers = {}
+	content = b"[]"
+
+	def raise_for_status(self):
+		pass
+
+	def json(self):
+		return []
+
+
+def test_gateway_con_json_que_no_es_objeto_es_respuesta_invalida(monkeypatch):
+	monkeypatch.setattr(n8n_client._cliente_http, "post", lambda *args, **kwargs: _RespuestaFalsa())
+	monkeypatch.setattr(n8n_client, "_grabar", lambda *args, **kwargs: None)
+	monkeypatch.setattr(n8n_client, "registrar_latencia", lambda *args, **kwargs: None)
+	res = n8n_client._enviar_via_gateway(SolicitudN8n("hola", "sesion", intencion="consultar_estado"))
+	assert not res.ok
+	assert res.mensaje == "El gateway devolvió una respuesta inválida."
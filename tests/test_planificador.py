@@ -0,0 +1,34 @@
+import time
+
+from utils.planificador import Planificador, PRIORIDAD_INTERACTIVA
+
+
+def _duracion_turnos(planificador: Planificador, intencion: str | None, cantidad: int) -> list[float]:
+	"""Segundos que tardó en otorgarse cada turno, pedidos uno detrás de otro."""
+	duraciones = []
+	for _ in range(cantidad):
+		inicio = time.monotonic()
+		with planificador.turno(PRIORIDAD_INTERACTIVA, intencion):
+			pass
+		duraciones.append(time.monotonic() - inicio)
+	return duraciones
+
+
+def test_cubo_agente_limita_las_intenciones_que_llegan_al_llm():
+	planificador = Planificador(limites={"agente": (2.0, 3)})
+	duraciones = _duracion_turnos(planificador, "consulta_personalizada", 4)
+	# Ráfaga de 3 sin espera; el 4.º espera a que se recargue un token (0.5 s)
+	assert max(duraciones[:3]) < 0.1
+	assert duraciones[3] >= 0.4
+
+
+def test_cubo_agente_limita_compartir_y_mensajes_sin_intencion():
+	planificador = Planificador(limites={"agente": (2.0, 3)})
+	duraciones = _duracion_turnos(planificador, "compartir_fallidos", 2) + _duracion_turnos(planificador, None, 2)
+	assert duraciones[3] >= 0.4
+
+
+def test_cubo_agente_no_frena_el_ruteo_directo():
+	planificador = Planificador(limites={"agente": (2.0, 3)})
+	duraciones = _duracion_turnos(planificador, "reporte_fallidos", 6)
+	assert max(duraciones) < 0.1
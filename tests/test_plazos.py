@@ -0,0 +1,65 @@
+from collections import deque
+
+import pytest
+
+from config import TIMEOUT, TIMEOUT_MUESTRAS_MINIMAS
+from utils import plazos
+
+_programar_guardado = plazos._programar_guardado
+
+
+@pytest.fixture(autouse=True)
+def historial_vacio(monkeypatch):
+	monkeypatch.setattr(plazos, "_historial", {})
+	monkeypatch.setattr(plazos, "_manuales", {})
+	monkeypatch.setattr(plazos, "_vencimientos", {})
+	monkeypatch.setattr(plazos, "_programar_guardado", lambda: None)
+
+
+def _registrar(intencion: str, segundos: float, parametros: dict | None = None) -> None:
+	for _ in range(TIMEOUT_MUESTRAS_MINIMAS):
+		plazos.registrar_latencia(intencion, segundos, parametros)
+
+
+def test_reporte_corto_no_acorta_el_plazo_de_uno_largo():
+	_registrar("reporte_fallidos", 0.5, {"desde": "2024-05-01", "hasta": "2024-05-01"})
+	_, lectura_anual = plazos.plazo_para("reporte_fallidos", {"desde": "2024-01-01", "hasta": "2024-12-31"})
+	_, lectura_diaria = plazos.plazo_para("reporte_fallidos", {"desde": "2024-06-01", "hasta": "2024-06-01"})
+	assert lectura_anual == TIMEOUT
+	# Aun con muestras rápidas de su franja, un reporte no baja de TIMEOUT
+	assert lectura_diaria == TIMEOUT
+
+
+def test_intencion_rapida_aprende_un_plazo_corto():
+	_registrar("consultar_estado", 0.5)
+	_, lectura = plazos.plazo_para("consultar_estado")
+	assert lectura < TIMEOUT
+
+
+def test_registrar_latencia_agenda_una_sola_escritura(monkeypatch):
+	escrituras = []
+	monkeypatch.setattr(plazos, "_guardar", lambda: escrituras.append(1))
+	monkeypatch.setattr(plazos, "_programar_guardado", _programar_guardado)
+	monkeypatch.setattr(plazos, "_guardado_pendiente", None)
+	_registrar("consultar_estado", 0.5)
+	pendiente = plazos._guardado_pendiente
+	# Ninguna escritura en el momento: un único Timer para todas las muestras
+	assert pendiente is not None
+	pendiente.cancel()
+	assert escrituras == []
+	assert plazos._historial["consultar_estado"] == deque([0.5] * TIMEOUT_MUESTRAS_MINIMAS)
+
+
+def test_vencimientos_seguidos_ensanchan_el_plazo_hasta_volver_a_aprender():
+	_registrar("consultar_estado", 1.0)
+	_, aprendido = plazos.plazo_para("consultar_estado")
+	plazos.registrar_vencimiento("consultar_estado", aprendido)
+	_, primero = plazos.plazo_para("consultar_estado")
+	plazos.registrar_vencimiento("consultar_estado", primero)
+	_, segundo = plazos.plazo_para("consultar_estado")
+	assert aprendido < primero < segundo
+	# La latencia nueva (más lenta) ya entra en el plazo: un éxito quita el ensanche
+	plazos.registrar_latencia("consultar_estado", primero * 0.8)
+	_, recuperado = plazos.plazo_para("consultar_estado")
+	assert recuperado < segundo
+	assert "consultar_estado" not in plazos._vencimientos
@@ -0,0 +1,49 @@
+import replica_local
+from data_models import RespuestaN8n
+
+
+def _fila(codigo: str, marca: str | None) -> dict:
+	return {"codigo_envio": codigo, "marca_sync": marca, "estado": "En tránsito"}
+
+
+def test_filas_sin_marca_sync_no_mueven_la_marca_de_agua():
+	conn = replica_local._conectar(":memory:")
+	assert replica_local._aplicar_lote(conn, [_fila("A1", "2024-05-01T10:00:00.000Z")]) == 1
+	assert replica_local._aplicar_lote(conn, [_fila("B2", None), _fila(None, "2024-06-01T00:00:00Z")]) == 0
+	assert replica_local._leer_marca_agua(conn)[:2] == ("2024-05-01T10:00:00.000Z", "A1")
+
+
+def test_la_marca_de_agua_no_retrocede():
+	conn = replica_local._conectar(":memory:")
+	replica_local._aplicar_lote(conn, [_fila("A1", "2024-05-01T10:00:00.000Z")])
+	# Una fila vieja (reenviada) se aplica, pero la marca queda donde estaba
+	assert replica_local._aplicar_lote(conn, [_fila("Z9", "2024-04-01T00:00:00.000Z")]) == 1
+	assert replica_local._leer_marca_agua(conn)[:2] == ("2024-05-01T10:00:00.000Z", "A1")
+
+
+def test_lote_completo_sin_filas_validas_corta_la_sincronizacion(monkeypatch):
+	conn = replica_local._conectar(":memory:")
+	monkeypatch.setattr(replica_local, "_conectar", lambda: conn)
+	pedidos = []
+
+	def enviar(req):
+		pedidos.append(req.parametros)
+		return RespuestaN8n(ok=True, mensaje="", datos=[_fila(f"X{i}", None) for i in range(2)])
+
+	monkeypatch.setattr(replica_local, "enviar_consulta", enviar)
+	ok, total, error = replica_local.sincronizar_replica("sesion", lote=2)
+	assert not ok
+	assert total == 0
+	assert error
+	assert len(pedidos) == 1
+
+
+def test_desempate_por_codigo_con_microsegundos_y_orden_binario():
+	conn = replica_local._conectar(":memory:")
+	replica_local._aplicar_lote(conn, [_fila("B2", "2024-05-01T10:00:00.123456Z")])
+	# Mismo milisegundo, un microsegundo después: avanza
+	replica_local._aplicar_lote(conn, [_fila("A1", "2024-05-01T10:00:00.123457Z")])
+	assert replica_local._leer_marca_agua(conn)[:2] == ("2024-05-01T10:00:00.123457Z", "A1")
+	# Misma marca: "a1" va después de "Z9" byte a byte (COLLATE "C"), como en el workflow
+	replica_local._aplicar_lote(conn, [_fila("Z9", "2024-05-01T10:00:00.123457Z"), _fila("a1", "2024-05-01T10:00:00.123457Z")])
+	assert replica_local._leer_marca_agua(conn)[:2] == ("2024-05-01T10:00:00.123457Z", "a1")
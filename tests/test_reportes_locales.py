@@ -0,0 +1,37 @@
+import pandas as pd
+
+import report_generator
+from utils import helpers
+
+
+def test_aplanado_en_el_proceso_igual_a_json_normalize():
+	planos = [{"codigo_envio": "E1", "estado": "Fallido"}, {"estado": "Entregado", "peso": 2.5}]
+	assert report_generator._aplanar_bloque(planos).equals(pd.json_normalize(planos, sep="."))
+	assert list(report_generator._aplanar_bloque([{"destino": {"localidad": "Quilmes"}}])) == ["destino.localidad"]
+
+
+def test_dataframe_ya_optimizado_se_puede_volver_a_optimizar():
+	df = report_generator._to_dataframe([{"estado": "Fallido"}, {"estado": "Fallido"}])
+	assert isinstance(report_generator._to_dataframe(df)["estado"].dtype, pd.CategoricalDtype)
+
+
+def test_excel_chico_se_escribe_en_segundo_plano(monkeypatch):
+	encolados, sincronicos = [], []
+	monkeypatch.setattr(helpers, "encolar_reporte", lambda data, **opciones: encolados.append(opciones))
+	monkeypatch.setattr(helpers, "generar_reporte", lambda **opciones: sincronicos.append(opciones) or "reporte.csv")
+	registros = [{"codigo_envio": "E1"}]
+	assert helpers.exportar_reporte_local(registros, "reporte", "xlsx", "/tmp") is None
+	assert helpers.exportar_reporte_local(registros, "reporte", "csv", "/tmp") == "reporte.csv"
+	assert len(encolados) == 1 and encolados[0]["preview"]
+	assert len(sincronicos) == 1
+
+
+def test_tipo_inferido_se_recuerda_por_reporte(monkeypatch):
+	monkeypatch.setattr(report_generator, "_TIPOS_INFERIDOS", {})
+	repetidos = [{"zona": "Norte"}, {"zona": "Norte"}, {"zona": "Sur"}, {"zona": "Sur"}]
+	distintos = [{"zona": f"Calle {i}"} for i in range(4)]
+	categorica = report_generator._to_dataframe(repetidos, tipo_reporte="reporte_a")
+	texto = report_generator._to_dataframe(distintos, tipo_reporte="reporte_b")
+	assert isinstance(categorica["zona"].dtype, pd.CategoricalDtype)
+	assert not isinstance(texto["zona"].dtype, pd.CategoricalDtype)
+	assert set(report_generator._TIPOS_INFERIDOS) == {("reporte_a", "zona"), ("reporte_b", "zona")}
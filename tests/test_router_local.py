@@ -0,0 +1,25 @@
+import pytest
+
+from utils.router_local import rutear_mensaje
+
+
+@pytest.mark.parametrize("mensaje, esperado", [
+	("reporte de fallidos hasta 2025-02-01", ("reporte_fallidos", {"hasta": "2025-02-01"})),
+	("reporte de fallidos desde 2025-01-01", ("reporte_fallidos", {"desde": "2025-01-01"})),
+	("envios entregados hasta el 31/01/2025", ("reporte_repartidor_localidad", {"hasta": "2025-01-31", "estados": ["Entregado"]})),
+	("envios entregados desde el 01/01/2025", ("reporte_repartidor_localidad", {"desde": "2025-01-01", "estados": ["Entregado"]})),
+	("fallidos del 01/01/2025 al 31/01/2025", ("reporte_fallidos", {"desde": "2025-01-01", "hasta": "2025-01-31"})),
+	("fallidos entre 2025-01-01 y 2025-01-31", ("reporte_fallidos", {"desde": "2025-01-01", "hasta": "2025-01-31"})),
+])
+def test_rango_de_fechas_segun_la_palabra_previa(mensaje, esperado):
+	assert rutear_mensaje(mensaje) == esperado
+
+
+@pytest.mark.parametrize("mensaje", [
+	"reporte de fallidos 2025-01-01",
+	"reporte de fallidos del 2025-01-01",
+	"fallidos desde 2025-02-01 hasta 2025-01-01",
+	"fallidos hasta 2025-01-01 y 2025-02-01",
+])
+def test_fecha_de_papel_dudoso_va_al_agente(mensaje):
+	assert rutear_mensaje(mensaje) is None
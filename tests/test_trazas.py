@@ -0,0 +1,43 @@
+import requests
+
+from utils import trazas
+
+
+def _spans(cantidad: int) -> list[trazas.Span]:
+	return [trazas.Span(f"fase{i}", trazas.nuevo_id_traza(), None, trazas.TIPO_INTERNO, {}) for i in range(cantidad)]
+
+
+def test_lote_no_exportado_vuelve_a_pendientes(monkeypatch):
+	monkeypatch.setattr(trazas, "TRAZAS_PATH", None)
+	monkeypatch.setattr(trazas, "TRAZAS_URL", "http://colector.invalid/v1/traces")
+	monkeypatch.setattr(trazas, "_MAX_PENDIENTES", 3)
+	monkeypatch.setattr(trazas, "_pendientes", [])
+	lote = _spans(2)
+	trazas._pendientes.extend(lote)
+
+	def colector_caido(*args, **kwargs):
+		# Mientras se exporta el lote terminan otros dos spans
+		trazas._pendientes.extend(nuevos)
+		raise requests.ConnectionError("sin conexión")
+
+	nuevos = _spans(2)
+	monkeypatch.setattr(trazas.requests, "post", colector_caido)
+	trazas.exportar_pendientes()
+	# El lote vuelve adelante y el tope descarta los spans más nuevos
+	assert trazas._pendientes == lote + nuevos[:1]
+
+	enviados = []
+
+	class Respuesta:
+		ok = True
+
+	def colector(url, json, timeout):
+		enviados.append(json)
+		return Respuesta()
+
+	monkeypatch.setattr(trazas.requests, "post", colector)
+	trazas.exportar_pendientes()
+	assert trazas._pendientes == []
+	(documento,) = enviados
+	spans = documento["resourceSpans"][0]["scopeSpans"][0]["spans"]
+	assert [s["name"] for s in spans] == ["fase0", "fase1", "fase0"]
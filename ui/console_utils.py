@@ -6,7 +6,9 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.spinner import Spinner
+from rich.table import Table
 from rich.live import Live
+from rich.progress import Progress, SpinnerColumn, BarColumn, MofNCompleteColumn, TextColumn
 from contextlib import contextmanager
 from typing import Optional
 
@@ -28,21 +30,24 @@ STYLES = {
 
 
 @contextmanager
-def spinner_procesando(mensaje: str):
+def spinner_procesando(mensaje: str, espera: Optional[str] = None):
 	"""
 	Context manager que muestra un spinner animado mientras se procesa.
 	
 	Usage:
-		with spinner_procesando("Consultando datos..."):
+		with spinner_procesando("Consultando datos...", describir_espera(req.intencion)):
 			resultado = enviar_consulta(req)
 	
 	Args:
 		mensaje: Texto a mostrar durante la carga
+		espera: Espera habitual de la consulta ("suele tardar ~3 s"), si se conoce
 	"""
 	# Crear texto con estilo
 	texto_spinner = Text()
 	texto_spinner.append("⏳ ", style="bold")
 	texto_spinner.append(mensaje, style=STYLES['procesando'])
+	if espera:
+		texto_spinner.append(f" ({espera})", style="dim")
 	
 	spinner = Spinner("dots", text=texto_spinner)
 	
@@ -50,6 +55,69 @@ def spinner_procesando(mensaje: str):
 		yield
 
 
+@contextmanager
+def respuesta_en_vivo(mensaje_espera: str, prefijo: str = "🤖 Piki: ", espera: Optional[str] = None):
+	"""
+	Context manager que muestra un spinner hasta recibir texto y luego lo va actualizando en el lugar.
+
+	Pensado para respuestas que llegan por streaming: mientras no llega nada se
+	ve el spinner; a partir del primer fragmento se reemplaza por el texto
+	recibido hasta el momento.
+
+	Usage:
+		with respuesta_en_vivo("Piki está pensando") as actualizar:
+			res = enviar_consulta_streaming(req, lambda t: actualizar(extraer_mensaje_parcial(t)))
+
+	Args:
+		mensaje_espera: Texto del spinner mientras no hay respuesta
+		prefijo: Texto que antecede a la respuesta
+		espera: Espera habitual de la consulta ("suele tardar ~3 s"), si se conoce
+	"""
+	texto_spinner = Text()
+	texto_spinner.append("⏳ ", style="bold")
+	texto_spinner.append(mensaje_espera, style=STYLES['procesando'])
+	if espera:
+		texto_spinner.append(f" ({espera})", style="dim")
+	spinner = Spinner("dots", text=texto_spinner)
+
+	with Live(spinner, console=console, refresh_per_second=12) as live:
+		def actualizar(texto: Optional[str]) -> None:
+			if not texto:
+				return
+			contenido = Text()
+			contenido.append(prefijo, style="bold cyan")
+			contenido.append(texto, style=STYLES['mensaje_n8n'])
+			live.update(contenido)
+
+		yield actualizar
+
+
+@contextmanager
+def barra_progreso(mensaje: str, total: int):
+	"""
+	Context manager que muestra una barra de progreso con `total` pasos.
+	
+	Usage:
+		with barra_progreso("Consultando períodos", len(fragmentos)) as avanzar:
+			for fragmento in fragmentos:
+				...
+				avanzar()
+	
+	Args:
+		mensaje: Texto a mostrar junto a la barra
+		total: Cantidad de pasos
+	"""
+	with Progress(
+		SpinnerColumn(),
+		TextColumn(f"[{STYLES['procesando']}]{mensaje}"),
+		BarColumn(),
+		MofNCompleteColumn(),
+		console=console,
+	) as progreso:
+		tarea = progreso.add_task(mensaje, total=total)
+		yield lambda: progreso.advance(tarea)
+
+
 def print_procesando(mensaje: str) -> None:
 	"""
 	Muestra mensaje de procesando (versión simple sin animación).
@@ -175,3 +243,95 @@ def print_menu_opciones(titulo: str, opciones: list[tuple[str, str]], color_opci
 			console.print(f"[{numero}] {descripcion}", style=color_cancelar)
 		else:
 			console.print(f"[{numero}] {descripcion}", style=color_opciones)
+
+
+def print_paquete(filas: list[tuple[str, str]], titulo: str) -> None:
+	"""
+	Muestra el resumen de un paquete de consultas: una fila por consulta con su resultado.
+
+	Args:
+		filas: Pares (consulta, resultado), ej. ("Envíos fallidos", "12 envíos").
+		titulo: Título de la tabla.
+	"""
+	tabla = Table(title=titulo, header_style=STYLES['titulo'])
+	tabla.add_column("Consulta", overflow="fold")
+	tabla.add_column("Resultado", overflow="fold")
+	for consulta, resultado in filas:
+		tabla.add_row(consulta, resultado)
+	console.print(tabla)
+
+
+def print_metricas(filas: list[dict], titulo: str = "Métricas") -> None:
+	"""
+	Muestra el resumen de métricas (ver `utils.metricas.resumen`) como tabla.
+
+	Args:
+		filas: Series con nombre, etiquetas, cantidad, media, p50, p90 y máximo.
+		titulo: Título de la tabla.
+	"""
+	if not filas:
+		print_info("Todavía no hay métricas registradas.")
+		return
+	tabla = Table(title=titulo, header_style=STYLES['titulo'])
+	tabla.add_column("Métrica")
+	tabla.add_column("Etiquetas", style="dim")
+	for columna in ("n", "media", "p50", "p90", "máx"):
+		tabla.add_column(columna, justify="right")
+	for fila in filas:
+		etiquetas = " ".join(f"{k}={v}" for k, v in fila["etiquetas"].items())
+		tabla.add_row(
+			fila["nombre"], etiquetas, str(fila["cantidad"]),
+			*(f"{fila[c]:.3f}" for c in ("media", "p50", "p90", "maximo")),
+		)
+	console.print(tabla)
+
+
+def print_plazos(filas: list[dict]) -> None:
+	"""
+	Muestra los plazos de espera por intención (ver `utils.plazos.resumen_plazos`).
+
+	Args:
+		filas: Filas con muestras, p50, p95, plazo de lectura vigente y su origen.
+	"""
+	if not filas:
+		return
+	tabla = Table(title="Plazos por intención", header_style=STYLES['titulo'])
+	tabla.add_column("Intención", overflow="fold")
+	for columna in ("n", "p50 (s)", "p95 (s)", "Plazo (s)"):
+		tabla.add_column(columna, justify="right")
+	tabla.add_column("Origen", style="dim")
+	for fila in filas:
+		tabla.add_row(
+			fila["intencion"], str(fila["muestras"]),
+			*("-" if fila[c] is None else f"{fila[c]:.2f}" for c in ("p50", "p95")),
+			f"{fila['plazo']:.0f}", fila["origen"],
+		)
+	console.print(tabla)
+
+
+def print_costos(filas: list[dict], clave: str, titulo: str) -> None:
+	"""
+	Muestra el consumo del agente (ver `utils.costos.informe_costos`) como tabla.
+
+	Args:
+		filas: Filas con tokens, respuestas y tiempos medios.
+		clave: Columna que identifica cada fila ("intencion" o "sesion").
+		titulo: Título de la tabla.
+	"""
+	if not filas:
+		print_info(f"{titulo}: sin consultas registradas.")
+		return
+	tabla = Table(title=titulo, header_style=STYLES['titulo'])
+	tabla.add_column({"intencion": "Intención", "sesion": "Sesión"}.get(clave, clave), overflow="fold")
+	for columna in ("Resp.", "Tokens entrada", "Tokens salida", "SQL", "Agente (s)", "Total (s)"):
+		tabla.add_column(columna, justify="right")
+	for fila in filas:
+		aproximado = "~" if fila["tokens_estimados"] else ""
+		tabla.add_row(
+			str(fila[clave]), str(fila["respuestas"]),
+			f"{aproximado}{fila['tokens_entrada']}", f"{aproximado}{fila['tokens_salida']}",
+			str(fila["llamadas_sql"]),
+			f"{fila['agente_medio_s']:.2f}" if fila["con_metricas"] else "-",
+			f"{fila['total_medio_s']:.2f}",
+		)
+	console.print(tabla)
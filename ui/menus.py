@@ -52,6 +52,7 @@ def menu_principal():
 	table.add_row("📤 [2]", "Generar reporte para compartir")
 	table.add_row("💬 [3]", "Iniciar chat con Piki")
 	table.add_row("💾 [4]", "Generar reporte local")
+	table.add_row("🔄 [5]", "Sincronizar réplica local")
 	table.add_row("", "")  # Separador
 	table.add_row("👋 [0]", "[red]Salir[/red]")
 	
@@ -94,6 +95,7 @@ def menu_compartir():
 	table.add_row("❌ [1]", "Compartir reporte de envíos fallidos")
 	table.add_row("🚚 [2]", "Compartir reporte de repartidores")
 	table.add_row("✨ [3]", "Consulta personalizada")
+	table.add_row("📎 [5]", "Compartir el último reporte local generado")
 	table.add_row("", "")
 	table.add_row("⬅️  [4]", "[yellow]Volver al menú principal[/yellow]")
 	table.add_row("👋 [0]", "[red]Salir[/red]")
@@ -137,6 +139,8 @@ def menu_local():
 	table.add_row("❌ [1]", "Descargar el reporte de envíos fallidos")
 	table.add_row("🚚 [2]", "Descargar el reporte de repartidores")
 	table.add_row("✨ [3]", "Consulta personalizada")
+	table.add_row("📡 [5]", "Tablero en vivo de envíos fallidos")
+	table.add_row("☀️  [6]", "Paquete de la mañana (fallidos, localidades y estados)")
 	table.add_row("", "")
 	table.add_row("⬅️  [4]", "[yellow]Volver al menú principal[/yellow]")
 	table.add_row("👋 [0]", "[red]Salir[/red]")
@@ -222,8 +226,9 @@ def menu_plataforma_compartir():
 	
 	table.add_row("☁️  [1]", "Google Drive")
 	table.add_row("📧 [2]", "Gmail")
+	table.add_row("🌐 [3]", "Drive y Gmail a la vez")
 	table.add_row("", "")
-	table.add_row("⬅️  [3]", "[yellow]Volver al menú anterior[/yellow]")
+	table.add_row("⬅️  [4]", "[yellow]Volver al menú anterior[/yellow]")
 	table.add_row("👋 [0]", "[red]Salir[/red]")
 	
 	console.print(table)
@@ -262,8 +267,8 @@ def menu_criterio_repartidor():
 	table.add_column("Opción", style="bold cyan", width=8)
 	table.add_column("Descripción", style="bright_white")
 	
-	table.add_row("📍 [1]", "Filtrar por localidad")
-	table.add_row("🚴 [2]", "Filtrar por repartidor")
+	table.add_row("📍 [1]", "Filtrar por localidad(es)")
+	table.add_row("🚴 [2]", "Filtrar por repartidor(es)")
 	table.add_row("🔍 [3]", "Filtrar por ambos")
 	table.add_row("", "")
 	table.add_row("❌ [4]", "[red]Cancelar[/red]")
@@ -272,6 +277,45 @@ def menu_criterio_repartidor():
 	console.print()
 
 
+def menu_columnas_reporte(columnas):
+	"""Muestra las columnas disponibles para elegir cuáles incluir en el reporte."""
+	console.print()
+	
+	# Título
+	title = Text()
+	title.append("🧾 ", style="bold yellow")
+	title.append("Columnas del Reporte", style="bold cyan")
+	
+	console.print(Panel(
+		title,
+		border_style="cyan",
+		box=box.ROUNDED,
+		expand=False,
+		padding=(0, 2)
+	))
+	
+	console.print()
+	
+	# Tabla de columnas
+	table = Table(
+		show_header=False,
+		box=box.ROUNDED,
+		border_style="bright_cyan",
+		padding=(0, 2),
+		expand=False,
+		width=70
+	)
+	
+	table.add_column("Opción", style="bold cyan", width=8)
+	table.add_column("Columna", style="bright_white")
+	
+	for numero, columna in enumerate(columnas, 1):
+		table.add_row(f"[{numero}]", columna)
+	
+	console.print(table)
+	console.print()
+
+
 def menu_formato_reporte():
 	"""Muestra el menú de selección de formato para reportes."""
 	console.print()
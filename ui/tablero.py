@@ -0,0 +1,106 @@
+"""
+ui.tablero
+Tablero en vivo de envíos: contadores por estado, localidad y repartidor.
+
+Solo arma lo que se dibuja; la consulta periódica (intención `resumen_envios`)
+está en `handlers.reportes.tablero_en_vivo`.
+"""
+import time
+
+from rich.console import Group
+from rich.table import Table
+from rich.text import Text
+
+from ui.console_utils import STYLES
+
+
+def _variacion(actual: int, anterior: int | None) -> Text:
+	"""Diferencia con la consulta anterior (▲ más, ▼ menos)."""
+	if anterior is None or actual == anterior:
+		return Text("")
+	if actual > anterior:
+		return Text(f"▲ {actual - anterior}", style="bold red")
+	return Text(f"▼ {anterior - actual}", style="bold green")
+
+
+def _tabla_conteos(titulo: str, items: list[dict], anteriores: dict[str, int], otros: int = 0) -> Table:
+	tabla = Table(title=titulo, title_style=STYLES["titulo"], expand=True)
+	tabla.add_column(titulo.split()[0], overflow="ellipsis", no_wrap=True)
+	tabla.add_column("Cantidad", justify="right")
+	tabla.add_column("", justify="left", no_wrap=True)
+	for item in items:
+		tabla.add_row(str(item["valor"]), str(item["cantidad"]), _variacion(item["cantidad"], anteriores.get(item["valor"])))
+	if otros:
+		tabla.add_row(Text("Otros", style="dim"), Text(str(otros), style="dim"), "")
+	if not items:
+		tabla.add_row(Text("Sin envíos", style="dim"), "", "")
+	return tabla
+
+
+def conteos_por_valor(resumen: dict | None, clave: str) -> dict[str, int]:
+	"""{valor: cantidad} de una sección del resumen, para comparar entre consultas."""
+	if not resumen:
+		return {}
+	seccion = resumen.get(clave)
+	items = seccion.get("items", []) if isinstance(seccion, dict) else seccion or []
+	return {item["valor"]: item["cantidad"] for item in items}
+
+
+def armar_tablero(
+	resumen: dict | None,
+	anterior: dict | None,
+	actualizado: float | None,
+	ultimo_cambio: float | None,
+	proxima_en: int,
+	error: str | None = None,
+	con_avisos: bool = False,
+) -> Group:
+	"""
+	Arma el tablero para `rich.live.Live`.
+
+	Args:
+		resumen: Último resumen recibido (`data` de `resumen_envios`).
+		anterior: Resumen previo, para mostrar la variación de cada contador.
+		actualizado: Momento de la última consulta exitosa (epoch).
+		ultimo_cambio: Momento en que los datos cambiaron por última vez (epoch).
+		proxima_en: Segundos hasta la próxima consulta.
+		error: Error de la última consulta, si falló.
+		con_avisos: True si n8n avisa los cambios (el tablero se actualiza al recibirlos).
+	"""
+	partes = []
+	if resumen is None:
+		partes.append(Text("⏳ Consultando el resumen de envíos...", style=STYLES["procesando"]))
+	else:
+		estado = resumen.get("estado", "Fallido")
+		partes.append(_tabla_conteos("Estado actual", resumen.get("por_estado", []), conteos_por_valor(anterior, "por_estado")))
+
+		detalle = Table.grid(expand=True, padding=(0, 2))
+		detalle.add_column(ratio=1)
+		detalle.add_column(ratio=1)
+		localidades = resumen.get("por_localidad") or {}
+		repartidores = resumen.get("por_repartidor") or {}
+		detalle.add_row(
+			_tabla_conteos(
+				f"Localidades · {estado}", localidades.get("items", []),
+				conteos_por_valor(anterior, "por_localidad"), localidades.get("otros", 0),
+			),
+			_tabla_conteos(
+				f"Repartidores · {estado}", repartidores.get("items", []),
+				conteos_por_valor(anterior, "por_repartidor"), repartidores.get("otros", 0),
+			),
+		)
+		partes.append(detalle)
+
+	pie = Text()
+	if actualizado:
+		pie.append(f"Actualizado {time.strftime('%H:%M:%S', time.localtime(actualizado))}", style="dim")
+	if ultimo_cambio:
+		pie.append(f" · última novedad {time.strftime('%H:%M:%S', time.localtime(ultimo_cambio))}", style="dim")
+	pie.append(f" · próxima consulta en {proxima_en} s", style="dim")
+	if con_avisos:
+		pie.append(" o al llegar un aviso de n8n", style="dim")
+	pie.append(" · Ctrl+C para ver detalle o salir", style="dim")
+	if error:
+		pie.append(f"\n⚠️  {error}", style=STYLES["warning"])
+	partes.append(pie)
+	return Group(*partes)
@@ -3,9 +3,23 @@ ui.validaciones
 Funciones que solicitan y validan datos al usuario. Migradas desde `main.py`.
 """
 import re
+from contextlib import contextmanager
+from datetime import date, datetime
 from typing import Optional
+
+try:
+	import readline
+except ImportError:
+	# Windows sin pyreadline: los nombres se corrigen igual, sin completar con Tab
+	readline = None
+
 from ui.menus import menu_plataforma_compartir, menu_continuar
-from ui.console_utils import print_error, print_info
+from ui.console_utils import print_error, print_info, print_warning
+from report_generator import resumen_reportes_en_curso
+from config import PAQUETE_MATUTINO_LOCALIDADES, PAQUETE_MATUTINO_CODIGOS
+
+# Plataformas que el workflow de n8n sabe atender al compartir
+PLATAFORMAS_COMPARTIR = ("drive", "gmail")
 
 
 def validar_codigo_envio(codigo: str) -> bool:
@@ -23,6 +37,8 @@ def seleccionar_plataforma_compartir() -> str:
 		if opcion == "2":
 			return "gmail"
 		if opcion == "3":
+			return "todas"
+		if opcion == "4":
 			return "volver"
 		if opcion == "0":
 			return "salir"
@@ -39,42 +55,258 @@ def solicitar_email_destino() -> str:
 		print_error("❌ Correo inválido. Intente nuevamente.")
 
 
-def solicitar_filtros_reparto():
-	"""Solicita al usuario los filtros para generar reporte de repartidores."""
+def _leer_lista(etiqueta: str) -> list[str]:
+	"""Lee valores separados por coma, sin vacíos ni repetidos."""
+	texto = input(f"{etiqueta} (separe varios con coma): ")
+	return list(dict.fromkeys(valor.strip() for valor in texto.split(",") if valor.strip()))
+
+
+def _leer_lista_o_predeterminada(etiqueta: str, predeterminada: str) -> list[str] | None:
+	"""Como `_leer_lista`, pero Enter acepta la lista predeterminada y "0" cancela (None)."""
+	valores = [v.strip() for v in predeterminada.split(",") if v.strip()]
+	if valores:
+		texto = input(f"{etiqueta} [{', '.join(valores)}] (Enter = usar estos): ").strip()
+	else:
+		texto = input(f"{etiqueta} (separe varios con coma, Enter = ninguno): ").strip()
+	if texto == "0":
+		return None
+	if not texto:
+		return valores
+	return list(dict.fromkeys(valor.strip() for valor in texto.split(",") if valor.strip()))
+
+
+def solicitar_paquete_matutino() -> tuple[list[str], list[str]] | None:
+	"""
+	Solicita las localidades y los códigos de envío del paquete de la mañana.
+
+	Enter acepta los valores de `PAQUETE_MATUTINO_LOCALIDADES` y
+	`PAQUETE_MATUTINO_CODIGOS`; los códigos con formato inválido se descartan.
+
+	Returns:
+		tuple[list[str], list[str]] | None: (localidades, códigos), o None si se canceló.
+	"""
+	print_info("💡 Puedes cancelar con 0")
+	localidades = _leer_lista_o_predeterminada("Localidades a revisar", PAQUETE_MATUTINO_LOCALIDADES)
+	if localidades is None:
+		return None
+	codigos = _leer_lista_o_predeterminada("Códigos de envío a revisar", PAQUETE_MATUTINO_CODIGOS)
+	if codigos is None:
+		return None
+	invalidos = [c for c in codigos if not validar_codigo_envio(c)]
+	if invalidos:
+		print_warning(f"Se omiten los códigos inválidos: {', '.join(invalidos)}")
+	return localidades, [c.upper() for c in codigos if validar_codigo_envio(c)]
+
+
+@contextmanager
+def _autocompletar(indice):
+	"""Mientras dura, Tab completa el último nombre de la lista con los del índice."""
+	if readline is None or not indice:
+		yield
+		return
+	anterior, separadores = readline.get_completer(), readline.get_completer_delims()
+
+	def completar(texto: str, estado: int) -> str | None:
+		# readline entrega lo escrito desde la última coma, con el espacio inicial
+		espacios = texto[:len(texto) - len(texto.lstrip())]
+		opciones = indice.completar(texto.lstrip())
+		return espacios + opciones[estado] if estado < len(opciones) else None
+
+	readline.set_completer_delims(",")
+	readline.set_completer(completar)
+	readline.parse_and_bind("bind ^I rl_complete" if "libedit" in (readline.__doc__ or "") else "tab: complete")
+	try:
+		yield
+	finally:
+		readline.set_completer(anterior)
+		readline.set_completer_delims(separadores)
+
+
+def _elegir_nombre(valor: str, indice) -> tuple[str | None, bool]:
+	"""
+	Lleva un nombre escrito al del catálogo; si no lo reconoce, propone parecidos.
+
+	Returns:
+		tuple[str | None, bool]: (nombre a usar, o None para omitirlo; True si
+		salió del catálogo).
+	"""
+	nombre = indice.resolver(valor)
+	if nombre:
+		if nombre != valor:
+			print_info(f"«{valor}» → {nombre}")
+		return nombre, True
+
+	opciones = list(dict.fromkeys(indice.completar(valor, limite=5) + indice.sugerir(valor)))[:5]
+	if opciones:
+		print_warning(f"«{valor}» no figura en el catálogo. ¿Quisiste decir...?")
+		for numero, opcion in enumerate(opciones, 1):
+			print(f"  [{numero}] {opcion}")
+		pregunta = "Elija un número, 't' para buscarlo tal cual o Enter para omitirlo: "
+	else:
+		print_warning(f"«{valor}» no figura en el catálogo.")
+		pregunta = "'t' para buscarlo tal cual o Enter para omitirlo: "
+	while True:
+		eleccion = input(pregunta).strip().lower()
+		if not eleccion:
+			return None, True
+		if eleccion == "t":
+			return valor, False
+		if eleccion.isdigit() and 1 <= int(eleccion) <= len(opciones):
+			return opciones[int(eleccion) - 1], True
+		print_error("❌ Opción inválida. Intente nuevamente.")
+
+
+def _leer_nombres(etiqueta: str, indice) -> tuple[list[str], bool]:
+	"""
+	Como `_leer_lista`, con autocompletado y corrección contra un `IndiceNombres`.
+
+	Returns:
+		tuple[list[str], bool]: (nombres, True si todos salieron del catálogo).
+		Sin índice los nombres quedan tal cual se escribieron.
+	"""
+	with _autocompletar(indice):
+		valores = _leer_lista(etiqueta)
+	if not indice:
+		return valores, False
+	nombres, del_catalogo = [], True
+	for valor in valores:
+		nombre, exacto = _elegir_nombre(valor, indice)
+		if nombre:
+			nombres.append(nombre)
+			del_catalogo = del_catalogo and exacto
+	return list(dict.fromkeys(nombres)), del_catalogo
+
+
+def solicitar_filtros_reparto(catalogo: dict | None = None):
+	"""
+	Solicita al usuario los filtros para generar reporte de repartidores.
+
+	Cada filtro admite varios valores separados por coma (ej: 15 repartidores),
+	que se resuelven en una sola consulta. Con el catálogo de nombres
+	(`catalogo.obtener_catalogo`) Tab completa los nombres y los mal escritos
+	se corrigen antes de consultar.
+
+	Args:
+		catalogo (dict, opcional): `IndiceNombres` por filtro ("localidad", "repartidor").
+
+	Returns:
+		dict | None: {"localidad": list | None, "repartidor": list | None,
+		"exacto": bool}, o None si se canceló. "exacto" indica que todos los
+		nombres salieron del catálogo y pueden compararse por igualdad.
+	"""
 	from ui.menus import menu_criterio_repartidor
-	
+
+	catalogo = catalogo or {}
+	localidades, repartidores = catalogo.get("localidad"), catalogo.get("repartidor")
 	while True:
 		menu_criterio_repartidor()
 		print_info("💡 Puedes cancelar con Enter o seleccionar [4]")
+		if readline is not None and (localidades or repartidores):
+			print_info("💡 Tab completa los nombres de localidades y repartidores")
 		opcion = input("\nOpción: ").strip()
 		if opcion == "1":
-			localidad = input("Ingrese la localidad: ").strip()
+			localidad, exacto = _leer_nombres("Ingrese la(s) localidad(es)", localidades)
 			if not localidad:
 				print_error("❌ La localidad no puede estar vacía.")
 				continue
-			return {"localidad": localidad, "repartidor": None}
+			return {"localidad": localidad, "repartidor": None, "exacto": exacto}
 		if opcion == "2":
-			repartidor = input("Ingrese el nombre del repartidor: ").strip()
+			repartidor, exacto = _leer_nombres("Ingrese el/los nombre(s) de repartidor", repartidores)
 			if not repartidor:
 				print_error("❌ El nombre del repartidor no puede estar vacío.")
 				continue
-			return {"localidad": None, "repartidor": repartidor}
+			return {"localidad": None, "repartidor": repartidor, "exacto": exacto}
 		if opcion == "3":
-			localidad = input("Ingrese la localidad: ").strip()
-			repartidor = input("Ingrese el nombre del repartidor: ").strip()
+			localidad, localidad_exacta = _leer_nombres("Ingrese la(s) localidad(es)", localidades)
+			repartidor, repartidor_exacto = _leer_nombres("Ingrese el/los nombre(s) de repartidor", repartidores)
 			if not localidad or not repartidor:
 				print_error("❌ Debe completar ambos campos.")
 				continue
-			return {"localidad": localidad, "repartidor": repartidor}
+			return {"localidad": localidad, "repartidor": repartidor, "exacto": localidad_exacta and repartidor_exacto}
 		if opcion == "4" or opcion == "0" or not opcion:
 			print_info("Operación cancelada.")
 			return None
 		print_error("❌ Opción inválida. Intente nuevamente.")
 
 
+def _leer_fecha(etiqueta: str) -> date | None:
+	"""Pide una fecha AAAA-MM-DD; Enter la deja sin límite."""
+	while True:
+		texto = input(f"{etiqueta} (AAAA-MM-DD, Enter = sin límite): ").strip()
+		if not texto:
+			return None
+		try:
+			return datetime.strptime(texto, "%Y-%m-%d").date()
+		except ValueError:
+			print_error("❌ Fecha inválida. Use el formato AAAA-MM-DD.")
+
+
+def solicitar_opciones_reporte(columnas: tuple[str, ...], con_estados: bool = False) -> dict | None:
+	"""
+	Solicita columnas, rango de fechas y (opcionalmente) estados para un reporte.
+
+	Las opciones viajan en `params` y el workflow las aplica en la consulta SQL,
+	de modo que solo se traen las filas y columnas necesarias.
+
+	Args:
+		columnas: Columnas que admite el reporte.
+		con_estados: Si el reporte admite filtrar por estado del envío.
+
+	Returns:
+		dict | None: Parámetros `columns`, `desde`, `hasta` y `estados` (solo los
+		elegidos), o None si el usuario canceló.
+	"""
+	from ui.menus import menu_columnas_reporte
+
+	opciones = {}
+
+	menu_columnas_reporte(columnas)
+	print_info("💡 Números separados por coma (ej: 1,3,5). Enter = todas, [0] = cancelar")
+	while True:
+		texto = input("Columnas: ").strip()
+		if texto == "0":
+			print_info("Operación cancelada.")
+			return None
+		if not texto:
+			break
+		numeros = [parte.strip() for parte in texto.split(",") if parte.strip()]
+		if all(n.isdigit() and 1 <= int(n) <= len(columnas) for n in numeros):
+			elegidas = [columnas[int(n) - 1] for n in numeros]
+			opciones["columns"] = list(dict.fromkeys(elegidas))
+			break
+		print_error(f"❌ Ingrese números entre 1 y {len(columnas)}.")
+
+	while True:
+		desde = _leer_fecha("Desde")
+		hasta = _leer_fecha("Hasta")
+		if desde and hasta and hasta < desde:
+			print_error("❌ La fecha 'hasta' no puede ser anterior a 'desde'.")
+			continue
+		break
+	if desde:
+		opciones["desde"] = desde.isoformat()
+	if hasta:
+		opciones["hasta"] = hasta.isoformat()
+
+	if con_estados:
+		texto = input("Estados separados por coma (ej: Entregado, Fallido; Enter = todos): ").strip()
+		estados = [estado.strip() for estado in texto.split(",") if estado.strip()]
+		if estados:
+			opciones["estados"] = estados
+
+	return opciones
+
+
+def confirmar(pregunta: str) -> bool:
+	"""Pregunta por sí o no; cualquier respuesta distinta de 's' cuenta como no."""
+	return input(f"{pregunta} [s/N]: ").strip().lower() in ("s", "si", "sí")
+
+
 def manejar_continuar() -> str:
 	"""Maneja la navegación después de completar una acción."""
 	while True:
+		for linea in resumen_reportes_en_curso():
+			print_info(f"⏳ En segundo plano: {linea}")
 		menu_continuar()
 		opcion = input("\nSelecciona una opción: ").strip()
 		if opcion == "1":
@@ -0,0 +1,296 @@
+"""
+ui.visor
+Visor paginado de resultados grandes (chat y consultas personalizadas).
+
+En lugar de imprimir cada registro campo por campo, muestra una tabla con una
+sola página por vez. Solo se formatea la página visible: el costo de dibujar
+no depende de la cantidad de resultados. Los registros se toman de la fuente
+a medida que se necesitan, así que la fuente puede ser una lista, un
+DataFrame o un iterador que los va produciendo.
+
+Comandos (se escriben y se confirman con Enter):
+    Enter / s    página siguiente          a           página anterior
+    g <n>        ir a la página n          c           elegir columnas
+    /<texto>     buscar desde la página    f <texto>   filtrar (f solo = quitar filtro)
+    x            exportar lo que se ve     q           salir del visor
+"""
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import pandas as pd
+from rich.table import Table
+from rich.text import Text
+
+from config import VISOR_FILAS_POR_PAGINA, VISOR_ANCHO_COLUMNA
+from ui.console_utils import console, print_info, print_warning, print_error, STYLES
+
+AYUDA_VISOR = (
+	"Enter/s siguiente · a anterior · g <n> ir a página · c columnas · "
+	"/texto buscar · f texto filtrar · x exportar · q salir"
+)
+
+# Registros que se examinan para descubrir las columnas
+_MUESTRA_COLUMNAS = 50
+
+
+class FuenteRegistros:
+	"""
+	Acceso por posición a los registros de una lista, un DataFrame o un iterador.
+
+	Los iteradores se consumen de a poco: solo se leen los registros hasta la
+	posición pedida, y quedan guardados para volver atrás.
+	"""
+
+	def __init__(self, datos: Iterable[Any] | pd.DataFrame):
+		self._df = datos if isinstance(datos, pd.DataFrame) else None
+		self._cargados: list = datos if isinstance(datos, list) else []
+		self._pendientes: Iterator | None = None
+		if self._df is None and not isinstance(datos, list):
+			self._pendientes = iter(datos)
+
+	@property
+	def completa(self) -> bool:
+		"""True si ya se conoce la cantidad total de registros."""
+		return self._pendientes is None
+
+	def cargados(self) -> int:
+		"""Registros disponibles sin leer más de la fuente."""
+		return len(self._df) if self._df is not None else len(self._cargados)
+
+	def asegurar(self, cantidad: int) -> int:
+		"""Lee de la fuente hasta tener `cantidad` registros (o agotarla)."""
+		while self._pendientes is not None and len(self._cargados) < cantidad:
+			try:
+				self._cargados.append(next(self._pendientes))
+			except StopIteration:
+				self._pendientes = None
+		return min(cantidad, self.cargados())
+
+	def registro(self, posicion: int) -> dict:
+		"""Registro en la posición indicada, como diccionario."""
+		if self._df is not None:
+			fila = self._df.iloc[posicion]
+			return {columna: (None if pd.isna(valor) else valor) for columna, valor in fila.items()}
+		valor = self._cargados[posicion]
+		return valor if isinstance(valor, dict) else {"valor": valor}
+
+	def columnas(self) -> list[str]:
+		"""Columnas de los primeros registros, en el orden en que aparecen."""
+		if self._df is not None:
+			return [str(c) for c in self._df.columns]
+		self.asegurar(_MUESTRA_COLUMNAS)
+		columnas: dict[str, None] = {}
+		for posicion in range(min(_MUESTRA_COLUMNAS, self.cargados())):
+			columnas.update(dict.fromkeys(self.registro(posicion)))
+		return list(columnas)
+
+
+class VisorResultados:
+	"""Vista paginada, con columnas elegibles y filtro, sobre una `FuenteRegistros`."""
+
+	def __init__(self, datos, titulo: str = "Resultados", filas_por_pagina: int = VISOR_FILAS_POR_PAGINA):
+		self.fuente = FuenteRegistros(datos)
+		self.titulo = titulo
+		self.filas_por_pagina = filas_por_pagina or max(5, console.size.height - 10)
+		self.todas_las_columnas = self.fuente.columnas()
+		self.columnas = self._columnas_que_entran(self.todas_las_columnas)
+		self.pagina = 0
+		self.filtro: str | None = None
+		# Posiciones de la fuente que pasan el filtro, y hasta dónde se revisó
+		self._indices: list[int] = []
+		self._revisados = 0
+		self._ultima_busqueda: str | None = None
+
+	# ── Vista (filtro) ────────────────────────────────────────────────────
+
+	@staticmethod
+	def _coincide(registro: dict, texto: str) -> bool:
+		return any(texto in str(valor).lower() for valor in registro.values() if valor is not None)
+
+	def _asegurar_vista(self, cantidad: int) -> int:
+		"""Revisa la fuente hasta tener `cantidad` filas visibles (o agotarla)."""
+		if self.filtro is None:
+			return self.fuente.asegurar(cantidad)
+		while len(self._indices) < cantidad:
+			if self.fuente.asegurar(self._revisados + 1) <= self._revisados:
+				break
+			if self._coincide(self.fuente.registro(self._revisados), self.filtro):
+				self._indices.append(self._revisados)
+			self._revisados += 1
+		return min(cantidad, len(self._indices))
+
+	def _posicion(self, fila: int) -> int:
+		return fila if self.filtro is None else self._indices[fila]
+
+	def _vista_completa(self) -> bool:
+		return self.fuente.completa and (self.filtro is None or self._revisados >= self.fuente.cargados())
+
+	def _filas_conocidas(self) -> int:
+		return self.fuente.cargados() if self.filtro is None else len(self._indices)
+
+	def filtrar(self, texto: str | None) -> None:
+		self.filtro = texto.lower() if texto else None
+		self._indices, self._revisados = [], 0
+		self.pagina = 0
+
+	# ── Navegación ────────────────────────────────────────────────────────
+
+	def ir_a(self, pagina: int) -> bool:
+		"""Cambia de página si existe; lee de la fuente solo lo necesario."""
+		if pagina < 0:
+			return False
+		if self._asegurar_vista(pagina * self.filas_por_pagina + 1) <= pagina * self.filas_por_pagina and pagina > 0:
+			return False
+		self.pagina = pagina
+		return True
+
+	def buscar(self, texto: str) -> bool:
+		"""
+		Salta a la primera página, desde la actual, con una fila que contenga el texto.
+
+		Repetir la misma búsqueda continúa desde la página siguiente.
+		"""
+		texto = texto.lower()
+		repetida = texto == self._ultima_busqueda
+		self._ultima_busqueda = texto
+		fila = (self.pagina + repetida) * self.filas_por_pagina
+		while self._asegurar_vista(fila + 1) > fila:
+			if self._coincide(self.fuente.registro(self._posicion(fila)), texto):
+				self.pagina = fila // self.filas_por_pagina
+				return True
+			fila += 1
+		return False
+
+	def filas_visibles(self) -> list[dict]:
+		inicio = self.pagina * self.filas_por_pagina
+		fin = self._asegurar_vista(inicio + self.filas_por_pagina + 1)
+		return [self.fuente.registro(self._posicion(f)) for f in range(inicio, min(fin, inicio + self.filas_por_pagina))]
+
+	# ── Dibujo ────────────────────────────────────────────────────────────
+
+	def _columnas_que_entran(self, columnas: list[str]) -> list[str]:
+		"""Primeras columnas que caben a lo ancho de la terminal."""
+		elegidas, ancho = [], 0
+		for columna in columnas:
+			ancho += min(VISOR_ANCHO_COLUMNA, max(len(columna), 8)) + 3
+			if elegidas and ancho > console.size.width:
+				break
+			elegidas.append(columna)
+		return elegidas
+
+	def _resumen_paginas(self) -> str:
+		conocidas = self._filas_conocidas()
+		paginas = max(1, -(-conocidas // self.filas_por_pagina))
+		if self._vista_completa():
+			return f"Página {self.pagina + 1} de {paginas} · {conocidas} filas"
+		return f"Página {self.pagina + 1} · {conocidas}+ filas"
+
+	def dibujar(self) -> None:
+		"""Muestra la página actual (solo sus filas y columnas)."""
+		filas = self.filas_visibles()
+		tabla = Table(
+			title=self.titulo,
+			caption=self._resumen_paginas() + (f" · filtro: {self.filtro}" if self.filtro else ""),
+			header_style=STYLES["titulo"],
+			show_lines=False,
+		)
+		tabla.add_column("#", justify="right", style="dim", no_wrap=True)
+		for columna in self.columnas:
+			tabla.add_column(columna, max_width=VISOR_ANCHO_COLUMNA, overflow="ellipsis", no_wrap=True)
+
+		inicio = self.pagina * self.filas_por_pagina
+		for numero, registro in enumerate(filas, inicio + 1):
+			celdas = [
+				Text("No asignado", style=STYLES["no_asignado"]) if registro.get(c) is None else Text(str(registro[c]))
+				for c in self.columnas
+			]
+			tabla.add_row(str(numero), *celdas)
+		console.print(tabla)
+		ocultas = len(self.todas_las_columnas) - len(self.columnas)
+		if ocultas > 0:
+			console.print(f"({ocultas} columnas ocultas: use 'c' para elegirlas)", style="dim")
+
+	# ── Columnas y exportación ────────────────────────────────────────────
+
+	def elegir_columnas(self) -> None:
+		for numero, columna in enumerate(self.todas_las_columnas, 1):
+			marca = "✔" if columna in self.columnas else " "
+			console.print(f"  {marca} {numero:>2}. {columna}")
+		respuesta = input("Columnas a mostrar (números o nombres separados por coma, Enter = todas): ").strip()
+		if not respuesta:
+			self.columnas = list(self.todas_las_columnas)
+			return
+		elegidas = []
+		for parte in (p.strip() for p in respuesta.split(",")):
+			if parte.isdigit() and 1 <= int(parte) <= len(self.todas_las_columnas):
+				elegidas.append(self.todas_las_columnas[int(parte) - 1])
+			elif parte in self.todas_las_columnas:
+				elegidas.append(parte)
+		if elegidas:
+			self.columnas = list(dict.fromkeys(elegidas))
+		else:
+			print_warning("No se reconoció ninguna columna; se mantiene la selección.")
+
+	def registros_de_la_vista(self) -> list[dict]:
+		"""Todas las filas de la vista (filtro incluido) con las columnas elegidas."""
+		total = self._asegurar_vista(float("inf"))
+		return [
+			{columna: registro.get(columna) for columna in self.columnas}
+			for registro in (self.fuente.registro(self._posicion(f)) for f in range(total))
+		]
+
+	def exportar(self) -> str | None:
+		"""Exporta a archivo las filas y columnas de la vista actual."""
+		from utils.helpers import exportar_reporte_local, obtener_configuracion_local
+
+		formato, directorio = obtener_configuracion_local()
+		return exportar_reporte_local(self.registros_de_la_vista(), "vista_resultados", formato, directorio)
+
+	# ── Bucle interactivo ─────────────────────────────────────────────────
+
+	def mostrar(self) -> None:
+		"""Dibuja páginas y atiende comandos hasta que el usuario sale."""
+		console.print(AYUDA_VISOR, style="dim italic")
+		self.dibujar()
+		while True:
+			try:
+				comando = input("visor> ").strip()
+			except EOFError:
+				return
+			accion, _, argumento = comando.partition(" ")
+			accion = accion.lower()
+
+			if accion in ("q", "salir"):
+				return
+			if accion in ("", "s"):
+				if not self.ir_a(self.pagina + 1):
+					print_info("Ya está en la última página.")
+					continue
+			elif accion == "a":
+				if not self.ir_a(self.pagina - 1):
+					print_info("Ya está en la primera página.")
+					continue
+			elif accion == "g":
+				if not argumento.strip().isdigit() or not self.ir_a(int(argumento) - 1):
+					print_error("Página inexistente.")
+					continue
+			elif accion == "c":
+				self.elegir_columnas()
+			elif comando.startswith("/"):
+				if not self.buscar(comando[1:].strip()):
+					print_info("Sin coincidencias desde esta página.")
+					continue
+			elif accion == "f":
+				self.filtrar(argumento.strip() or None)
+			elif accion == "x":
+				self.exportar()
+				continue
+			else:
+				console.print(AYUDA_VISOR, style="dim italic")
+				continue
+			self.dibujar()
+
+
+def mostrar_resultados_paginados(datos, titulo: str = "Resultados") -> None:
+	"""Abre el visor paginado sobre los registros indicados."""
+	VisorResultados(datos, titulo=titulo).mostrar()
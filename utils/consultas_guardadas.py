@@ -0,0 +1,176 @@
+"""
+utils.consultas_guardadas
+Biblioteca de consultas guardadas.
+
+Cada consulta guarda la pregunta del operador junto con el `query_sql` que
+generó Piki para responderla. Al repetirla se envía la intención `sql_directo`
+y el workflow la ejecuta sin pasar por el agente (sin costo de LLM y casi al
+instante).
+
+El cliente no envía SQL: el workflow registra cada consulta de Piki al
+responderla y la identifica con un id (FNV-1a de 64 bits de la SQL
+parametrizada). `sql_directo` solo recibe ese id y los valores.
+
+Al guardar, los textos literales de la consulta ('Quilmes', '2025-01-01', ...)
+se convierten en parámetros ($1, $2, ...) con su valor original por defecto,
+así la misma consulta sirve para otros valores. El workflow hace la misma
+conversión, por eso el id coincide.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+from config import CONSULTAS_GUARDADAS_PATH
+from data_models import SolicitudN8n, RespuestaN8n
+from n8n_client import enviar_consulta
+
+INTENCION_SQL_DIRECTO = "sql_directo"
+
+_LITERAL_SQL = re.compile(r"'((?:[^']|'')*)'")
+
+# FNV-1a de 64 bits, como "Ordenar y formatear el output de PIKI"
+_FNV_BASE = 0xcbf29ce484222325
+_FNV_PRIMO = 0x100000001b3
+
+
+def parametrizar_sql(sql: str) -> tuple[str, list[str]]:
+	"""
+	Reemplaza los textos literales de una consulta por parámetros posicionales.
+
+	Examples:
+		>>> parametrizar_sql("SELECT * FROM vw_tracking WHERE localidad_destino = 'Quilmes'")
+		('SELECT * FROM vw_tracking WHERE localidad_destino = $1', ['Quilmes'])
+	"""
+	valores: list[str] = []
+
+	def reemplazar(coincidencia: re.Match) -> str:
+		valores.append(coincidencia.group(1).replace("''", "'"))
+		return f"${len(valores)}"
+
+	return _LITERAL_SQL.sub(reemplazar, sql.strip().rstrip(";").strip()), valores
+
+
+def id_de_consulta(sql_parametrizada: str) -> str:
+	"""
+	Id con el que el workflow registra una consulta (16 caracteres hex).
+
+	Sirve para las respuestas que no lo traen (chat con streaming).
+	"""
+	valor = _FNV_BASE
+	for caracter in sql_parametrizada:
+		valor = ((valor ^ ord(caracter)) * _FNV_PRIMO) & 0xFFFFFFFFFFFFFFFF
+	return f"{valor:016x}"
+
+
+def _cargar() -> dict:
+	"""Lee la biblioteca de consultas (vacía si no existe o está dañada)."""
+	try:
+		with open(CONSULTAS_GUARDADAS_PATH, encoding="utf-8") as archivo:
+			return json.load(archivo)
+	except (OSError, ValueError):
+		return {}
+
+
+def _guardar(consultas: dict) -> None:
+	"""Escribe la biblioteca de consultas."""
+	directorio = os.path.dirname(CONSULTAS_GUARDADAS_PATH)
+	if directorio:
+		os.makedirs(directorio, exist_ok=True)
+	with open(CONSULTAS_GUARDADAS_PATH, "w", encoding="utf-8") as archivo:
+		json.dump(consultas, archivo, ensure_ascii=False, indent=2)
+
+
+def guardar_consulta(nombre: str, pregunta: str, query_sql: str, consulta_id: str | None = None) -> dict:
+	"""
+	Guarda (o reemplaza) una consulta con nombre.
+
+	Args:
+		nombre: Nombre con el que se la va a invocar (no distingue mayúsculas).
+		pregunta: Pregunta original del operador.
+		query_sql: SQL que usó el agente para responderla.
+		consulta_id: Id con que la registró el workflow (`RespuestaN8n.consulta_id`);
+			si falta se calcula igual que en el workflow.
+
+	Returns:
+		dict: La consulta guardada.
+
+	Raises:
+		ValueError: Si la SQL no es una consulta de lectura (SELECT/WITH).
+	"""
+	sql, valores = parametrizar_sql(query_sql)
+	if not re.match(r"(?is)^\s*(select|with)\b", sql):
+		raise ValueError("Solo se pueden guardar consultas de lectura (SELECT).")
+
+	consulta = {
+		"nombre": nombre.strip(),
+		"pregunta": pregunta,
+		"id": consulta_id or id_de_consulta(sql),
+		"sql": sql,
+		"parametros": valores,
+		"guardada_en": datetime.now().isoformat(timespec="seconds"),
+	}
+	consultas = _cargar()
+	consultas[nombre.strip().lower()] = consulta
+	_guardar(consultas)
+	return consulta
+
+
+def listar_consultas() -> list[dict]:
+	"""Devuelve las consultas guardadas ordenadas por nombre."""
+	return sorted(_cargar().values(), key=lambda c: c["nombre"].lower())
+
+
+def obtener_consulta(nombre: str) -> dict | None:
+	"""Busca una consulta guardada por nombre (no distingue mayúsculas)."""
+	return _cargar().get(nombre.strip().lower())
+
+
+def buscar_por_pregunta(pregunta: str) -> dict | None:
+	"""Busca una consulta guardada con la misma pregunta (sin distinguir mayúsculas ni espacios)."""
+	normalizada = " ".join(pregunta.lower().split())
+	for consulta in _cargar().values():
+		if " ".join(consulta["pregunta"].lower().split()) == normalizada:
+			return consulta
+	return None
+
+
+def eliminar_consulta(nombre: str) -> bool:
+	"""Elimina una consulta guardada. Devuelve False si no existía."""
+	consultas = _cargar()
+	if consultas.pop(nombre.strip().lower(), None) is None:
+		return False
+	_guardar(consultas)
+	return True
+
+
+def ejecutar_consulta_guardada(session_id: str, consulta: dict, valores: list[str] | None = None) -> RespuestaN8n:
+	"""
+	Ejecuta una consulta guardada directamente en la base, sin pasar por el agente.
+
+	Args:
+		session_id: ID de sesión del operador.
+		consulta: Consulta obtenida con `obtener_consulta`.
+		valores: Valores para $1, $2, ...; por defecto, los de la pregunta original.
+
+	Returns:
+		RespuestaN8n: Respuesta con los registros obtenidos.
+	"""
+	if not consulta.get("id"):
+		return RespuestaN8n(
+			ok=False,
+			mensaje=(
+				f"La consulta '{consulta['nombre']}' se guardó con una versión anterior. "
+				"Vuelva a preguntarla a Piki y guárdela de nuevo con /guardar."
+			),
+		)
+	req = SolicitudN8n(
+		entrada_chat = consulta["pregunta"],
+		id_sesion = session_id,
+		intencion = INTENCION_SQL_DIRECTO,
+		parametros = {
+			"id": consulta["id"],
+			"valores": valores if valores is not None else consulta["parametros"],
+		},
+	)
+	return enviar_consulta(req)
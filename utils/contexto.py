@@ -0,0 +1,140 @@
+"""
+utils.contexto
+Resumen compacto de los resultados recientes de cada sesión de chat.
+
+n8n solo recuerda los mensajes de la conversación, no los datos devueltos.
+Este módulo guarda, por sesión, un digesto de los últimos resultados
+(cantidad de registros, columnas e identificadores clave) que se envía como
+`params.context` para que Piki pueda responder preguntas de seguimiento sin
+volver a consultar la base de datos.
+"""
+import json
+import re
+import unicodedata
+from typing import Any
+
+from config import CONTEXTO_MAX_BYTES, CONTEXTO_MAX_RESULTADOS
+
+# Palabras del nombre de columna que la marcan como identificador, por
+# preferencia: los códigos primero. Se comparan palabras enteras ("id", no
+# "localidad") y prefijos ("codigo_envio", "Cód. postal").
+_PREFIJOS_COLUMNA_ID = (("codigo", "cod"), ("legajo",))
+_PALABRAS_COLUMNA_ID = {"id"}
+
+MAX_COLUMNAS = 12
+MAX_IDS = 50
+MAX_LARGO_CONSULTA = 120
+
+
+def _rango_columna_id(columna: str) -> int | None:
+	"""Preferencia de la columna como identificador (menor es mejor), o None si no lo es."""
+	sin_tildes = unicodedata.normalize("NFKD", str(columna).lower())
+	palabras = re.split(r"[^a-z0-9]+", "".join(c for c in sin_tildes if not unicodedata.combining(c)))
+	for rango, prefijos in enumerate(_PREFIJOS_COLUMNA_ID):
+		if any(palabra.startswith(prefijos) for palabra in palabras):
+			return rango
+	if any(palabra in _PALABRAS_COLUMNA_ID for palabra in palabras):
+		return len(_PREFIJOS_COLUMNA_ID)
+	return None
+
+
+def _columnas_id(columnas: list[str]) -> list[str]:
+	"""
+	Elige las columnas que identifican registros (o la primera, si ninguna lo parece).
+
+	Examples:
+		>>> _columnas_id(["repartidor_actual", "localidad_destino", "codigo_envio", "apellido_destinatario"])
+		['codigo_envio']
+		>>> _columnas_id(["Legajo", "Nombre", "Cantidad"])
+		['Legajo']
+	"""
+	rangos = {columna: _rango_columna_id(columna) for columna in columnas}
+	elegidas = sorted((c for c in columnas if rangos[c] is not None), key=lambda c: rangos[c])
+	return elegidas[:2] or columnas[:1]
+
+
+def _tamano(valor: Any) -> int:
+	"""Tamaño en bytes del valor serializado como JSON."""
+	return len(json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class DigestoConversacion:
+	"""Resúmenes de los últimos resultados de una sesión, acotados en tamaño."""
+
+	def __init__(self, max_bytes: int = CONTEXTO_MAX_BYTES, max_resultados: int = CONTEXTO_MAX_RESULTADOS):
+		self.max_bytes = max_bytes
+		self.max_resultados = max_resultados
+		self.resultados: list[dict] = []
+
+	def registrar(self, consulta: str, datos: Any) -> None:
+		"""
+		Agrega el resumen de un resultado. Ignora respuestas sin registros tabulares.
+
+		Args:
+			consulta: Pregunta del usuario que produjo el resultado.
+			datos: Registros devueltos por n8n (lista de diccionarios).
+		"""
+		if not isinstance(datos, list):
+			return
+		registros = [r for r in datos if isinstance(r, dict) and r]
+		if not registros:
+			return
+
+		columnas = list(registros[0].keys())
+		ids = {
+			columna: [r.get(columna) for r in registros[:MAX_IDS] if r.get(columna) is not None]
+			for columna in _columnas_id(columnas)
+		}
+		self.resultados.append({
+			"consulta": consulta[:MAX_LARGO_CONSULTA],
+			"total": len(registros),
+			"columnas": columnas[:MAX_COLUMNAS],
+			"ids": ids,
+			"ids_completos": len(registros) <= MAX_IDS,
+		})
+		del self.resultados[:-self.max_resultados]
+
+	def como_parametro(self) -> list[dict] | None:
+		"""
+		Devuelve el digesto listo para `params.context`, dentro del presupuesto de bytes.
+
+		Primero descarta los resultados más antiguos; si el más reciente por sí
+		solo excede el presupuesto, recorta sus identificadores.
+
+		Returns:
+			list[dict] | None: Resúmenes del más antiguo al más reciente, o None si no hay.
+		"""
+		contexto = list(self.resultados)
+		while len(contexto) > 1 and _tamano(contexto) > self.max_bytes:
+			contexto.pop(0)
+		if not contexto:
+			return None
+
+		if _tamano(contexto) > self.max_bytes:
+			ultimo = {**contexto[-1], "ids_completos": False}
+			ids = {columna: list(valores) for columna, valores in ultimo["ids"].items()}
+			while _tamano([{**ultimo, "ids": ids}]) > self.max_bytes and any(ids.values()):
+				for valores in ids.values():
+					if valores:
+						valores.pop()
+			contexto = [{**ultimo, "ids": ids}]
+		return contexto
+
+
+_DIGESTOS: dict[str, DigestoConversacion] = {}
+
+
+def obtener_digesto(session_id: str) -> DigestoConversacion:
+	"""Devuelve (creándolo si hace falta) el digesto de la sesión."""
+	if session_id not in _DIGESTOS:
+		_DIGESTOS[session_id] = DigestoConversacion()
+	return _DIGESTOS[session_id]
+
+
+def parametros_con_contexto(session_id: str, parametros: dict | None = None) -> dict:
+	"""Agrega `context` a los parámetros de una solicitud si la sesión tiene resultados recientes."""
+	parametros = dict(parametros or {})
+	contexto = obtener_digesto(session_id).como_parametro()
+	if contexto:
+		parametros["context"] = contexto
+	return parametros
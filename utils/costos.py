@@ -0,0 +1,257 @@
+"""
+utils.costos
+Consumo del agente (tokens de Gemini y tiempos) por intención y por sesión.
+
+Las respuestas del agente traen `metricas` desde el nodo "Ordenar y formatear
+el output de PIKI": tiempo del agente, llamadas SQL y tokens de entrada y
+salida (los que informa el modelo o, si no están disponibles, una estimación).
+Cada respuesta de n8n se registra aquí con el tiempo total medido en el
+cliente, así el informe separa lo que tarda el agente de lo que tardan las
+consultas SQL directas, el formateo y la red.
+
+Los tokens del día se guardan en `COSTOS_PATH` para que el presupuesto diario
+(`PRESUPUESTO_TOKENS_DIA`) se respete aunque se reinicie la aplicación; los
+totales por sesión viven en memoria. El archivo se reescribe como mucho cada
+`_DEMORA_GUARDADO` segundos, en segundo plano, y una última vez al cerrar.
+
+En el chat, `/costos` muestra el informe.
+"""
+import atexit
+import json
+import os
+import threading
+from datetime import date
+
+from config import COSTOS_PATH, PRESUPUESTO_TOKENS_DIA, PRESUPUESTO_TOKENS_SESION, PRESUPUESTO_AVISO
+from utils.metricas import observar
+from utils.planificador import CLAVE_AGENTE
+
+ESTADO_OK = "ok"
+ESTADO_AVISO = "aviso"
+ESTADO_EXCEDIDO = "excedido"
+
+# Días que se conservan en COSTOS_PATH
+_DIAS_GUARDADOS = 31
+
+# Segundos entre una respuesta registrada y la escritura de COSTOS_PATH
+_DEMORA_GUARDADO = 30.0
+
+_lock = threading.Lock()
+_guardado_pendiente: threading.Timer | None = None
+
+
+class Consumo:
+	"""Totales acumulados de un grupo de respuestas (una intención o una sesión)."""
+
+	def __init__(self, datos: dict | None = None):
+		datos = datos or {}
+		self.respuestas = datos.get("respuestas", 0)
+		self.con_metricas = datos.get("con_metricas", 0)
+		self.estimadas = datos.get("estimadas", 0)
+		self.tokens_entrada = datos.get("tokens_entrada", 0)
+		self.tokens_salida = datos.get("tokens_salida", 0)
+		self.llamadas_sql = datos.get("llamadas_sql", 0)
+		self.t_agente_s = datos.get("t_agente_s", 0.0)
+		self.t_total_s = datos.get("t_total_s", 0.0)
+
+	@property
+	def tokens(self) -> int:
+		return self.tokens_entrada + self.tokens_salida
+
+	def sumar(self, metricas: dict | None, total_s: float) -> None:
+		self.respuestas += 1
+		self.t_total_s += total_s
+		if not metricas:
+			return
+		self.con_metricas += 1
+		self.estimadas += bool(metricas.get("tokens_estimados"))
+		self.tokens_entrada += int(metricas.get("tokens_entrada") or 0)
+		self.tokens_salida += int(metricas.get("tokens_salida") or 0)
+		self.llamadas_sql += int(metricas.get("llamadas_sql") or 0)
+		self.t_agente_s += (metricas.get("t_agente_ms") or 0) / 1000
+
+	def como_fila(self, clave: str, valor: str) -> dict:
+		"""Fila del informe: totales y promedios por respuesta."""
+		return {
+			clave: valor,
+			"respuestas": self.respuestas,
+			"con_metricas": self.con_metricas,
+			"tokens_entrada": self.tokens_entrada,
+			"tokens_salida": self.tokens_salida,
+			"tokens_estimados": self.estimadas > 0,
+			"llamadas_sql": self.llamadas_sql,
+			"agente_medio_s": self.t_agente_s / self.con_metricas if self.con_metricas else 0.0,
+			"total_medio_s": self.t_total_s / self.respuestas if self.respuestas else 0.0,
+		}
+
+
+_por_intencion: dict[str, Consumo] = {}
+_por_sesion: dict[str, Consumo] = {}
+_dia: dict = {"fecha": None, "por_intencion": {}}
+
+
+def _cargar_dia() -> None:
+	"""Trae de COSTOS_PATH los totales de hoy (una vez por día); requiere `_lock`."""
+	hoy = date.today().isoformat()
+	if _dia["fecha"] == hoy:
+		return
+	if _guardado_pendiente is not None:
+		# Cambió el día con totales sin guardar: se escriben antes de descartarlos
+		_escribir(*_copia_dia())
+	_dia["fecha"] = hoy
+	_dia["por_intencion"] = {
+		intencion: Consumo(datos) for intencion, datos in _leer_archivo().get(hoy, {}).items()
+	}
+
+
+def _leer_archivo() -> dict:
+	try:
+		with open(COSTOS_PATH, encoding="utf-8") as archivo:
+			return json.load(archivo)
+	except (OSError, ValueError):
+		return {}
+
+
+def _copia_dia() -> tuple[str, dict]:
+	"""(fecha, totales por intención) del día en memoria; requiere `_lock`."""
+	return _dia["fecha"], {intencion: dict(vars(consumo)) for intencion, consumo in _dia["por_intencion"].items()}
+
+
+def _escribir(fecha: str, totales: dict) -> None:
+	"""Escribe los totales de un día, conservando los últimos días."""
+	historial = _leer_archivo()
+	historial[fecha] = totales
+	historial = dict(sorted(historial.items())[-_DIAS_GUARDADOS:])
+	directorio = os.path.dirname(COSTOS_PATH)
+	if directorio:
+		os.makedirs(directorio, exist_ok=True)
+	try:
+		with open(COSTOS_PATH, "w", encoding="utf-8") as archivo:
+			json.dump(historial, archivo, ensure_ascii=False, indent=2)
+	except OSError:
+		# Sin disco el informe sigue en memoria; solo se pierde al cerrar
+		pass
+
+
+def _guardar() -> None:
+	"""Escribe los totales de hoy (fuera de `_lock`, sobre una copia)."""
+	global _guardado_pendiente
+	with _lock:
+		_guardado_pendiente = None
+		if _dia["fecha"] is None:
+			return
+		fecha, totales = _copia_dia()
+	_escribir(fecha, totales)
+
+
+def _programar_guardado() -> None:
+	"""Agenda una escritura en `_DEMORA_GUARDADO` segundos si no hay una pendiente; requiere `_lock`."""
+	global _guardado_pendiente
+	if _guardado_pendiente is None:
+		_guardado_pendiente = threading.Timer(_DEMORA_GUARDADO, _guardar)
+		_guardado_pendiente.daemon = True
+		_guardado_pendiente.start()
+
+
+def _volcar_pendiente() -> None:
+	"""Escribe ya lo que esperaba su turno (al cerrar o al reiniciar los totales)."""
+	if _guardado_pendiente is not None:
+		_guardado_pendiente.cancel()
+		_guardar()
+
+
+atexit.register(_volcar_pendiente)
+
+
+def registrar_consumo(intencion: str | None, id_sesion: str | None, metricas: dict | None, total_s: float) -> None:
+	"""
+	Suma una respuesta de n8n a los totales por intención, por sesión y del día.
+
+	Args:
+		intencion: Intención de la solicitud (None = mensaje libre para el agente).
+		id_sesion: Sesión del operador.
+		metricas: `RespuestaN8n.metricas`, si la respuesta pasó por el agente.
+		total_s: Duración de la consulta medida en el cliente (sin la espera de turno).
+	"""
+	intencion = intencion or CLAVE_AGENTE
+	with _lock:
+		_cargar_dia()
+		_por_intencion.setdefault(intencion, Consumo()).sumar(metricas, total_s)
+		_por_sesion.setdefault(id_sesion or "-", Consumo()).sumar(metricas, total_s)
+		if metricas:
+			_dia["por_intencion"].setdefault(intencion, Consumo()).sumar(metricas, total_s)
+			_programar_guardado()
+
+	observar("n8n.total_s", total_s, intencion=intencion)
+	if metricas and metricas.get("t_agente_ms") is not None:
+		observar("agente.tiempo_s", metricas["t_agente_ms"] / 1000, intencion=intencion)
+
+
+def tokens_del_dia() -> int:
+	with _lock:
+		_cargar_dia()
+		return sum(consumo.tokens for consumo in _dia["por_intencion"].values())
+
+
+def tokens_de_sesion(id_sesion: str) -> int:
+	with _lock:
+		consumo = _por_sesion.get(id_sesion)
+		return consumo.tokens if consumo else 0
+
+
+def estado_presupuesto(id_sesion: str) -> tuple[str, str | None]:
+	"""
+	Compara el consumo con `PRESUPUESTO_TOKENS_DIA` y `PRESUPUESTO_TOKENS_SESION`.
+
+	Returns:
+		tuple[str, str | None]: (ESTADO_OK | ESTADO_AVISO | ESTADO_EXCEDIDO,
+		descripción del presupuesto más comprometido).
+
+	Examples:
+		Con PRESUPUESTO_TOKENS_SESION=10000 y 8500 tokens usados en la sesión:
+		("aviso", "sesión: 8500 de 10000 tokens (85%)")
+	"""
+	usos = []
+	if PRESUPUESTO_TOKENS_DIA > 0:
+		usos.append(("hoy", tokens_del_dia(), PRESUPUESTO_TOKENS_DIA))
+	if PRESUPUESTO_TOKENS_SESION > 0:
+		usos.append(("sesión", tokens_de_sesion(id_sesion), PRESUPUESTO_TOKENS_SESION))
+	if not usos:
+		return ESTADO_OK, None
+
+	nombre, usado, limite = max(usos, key=lambda u: u[1] / u[2])
+	proporcion = usado / limite
+	# Porcentaje truncado: "100%" solo cuando realmente se alcanzó el límite
+	detalle = f"{nombre}: {usado} de {limite} tokens ({int(proporcion * 100)}%)"
+	if proporcion >= 1:
+		return ESTADO_EXCEDIDO, detalle
+	if proporcion >= PRESUPUESTO_AVISO:
+		return ESTADO_AVISO, detalle
+	return ESTADO_OK, detalle
+
+
+def informe_costos() -> dict[str, list[dict]]:
+	"""
+	Informe de consumo para mostrar o exportar.
+
+	Returns:
+		dict: "por_intencion" y "por_sesion" (esta ejecución) y "hoy" (por
+		intención, incluye ejecuciones anteriores del mismo día); cada uno es una
+		lista de filas con totales de tokens y tiempos medios.
+	"""
+	with _lock:
+		_cargar_dia()
+		return {
+			"por_intencion": [c.como_fila("intencion", i) for i, c in sorted(_por_intencion.items())],
+			"por_sesion": [c.como_fila("sesion", s) for s, c in sorted(_por_sesion.items())],
+			"hoy": [c.como_fila("intencion", i) for i, c in sorted(_dia["por_intencion"].items())],
+		}
+
+
+def reiniciar() -> None:
+	"""Descarta los totales en memoria (el historial del archivo se conserva)."""
+	_volcar_pendiente()
+	with _lock:
+		_por_intencion.clear()
+		_por_sesion.clear()
+		_dia["fecha"] = None
@@ -4,8 +4,11 @@ Funciones para procesar y normalizar respuestas de n8n y datos de envíos.
 Estas fueron movidas desde `main.py` sin cambios en su lógica.
 """
 import json
+import re
 from typing import Any, Tuple
 
+import pandas as pd
+
 
 def formatear_datos(datos: Any):
 	"""Filtra valores 'null'/vacíos de un diccionario (pero mantiene None para mostrar como 'No asignado')."""
@@ -62,6 +65,29 @@ def normalizar_registros_respuesta(datos):
 	return [datos]
 
 
+def es_respuesta_columnar(datos: Any) -> bool:
+	"""Indica si los datos vienen en el formato columnar {"columns": [...], "rows": [[...]]}."""
+	return (
+		isinstance(datos, dict)
+		and isinstance(datos.get("columns"), list)
+		and isinstance(datos.get("rows"), list)
+	)
+
+
+def columnar_a_dataframe(datos: dict) -> pd.DataFrame:
+	"""
+	Decodifica una respuesta columnar directamente a un DataFrame.
+
+	Los nombres de columna viajan una sola vez y las filas como listas, así
+	que no se arma un diccionario por registro.
+
+	Examples:
+		>>> columnar_a_dataframe({"columns": ["codigo_envio"], "rows": [["E0001"]]}).shape
+		(1, 1)
+	"""
+	return pd.DataFrame(datos["rows"], columns=datos["columns"])
+
+
 def filtrar_registros_vacios(datos):
 	"""
 	Filtra registros completamente vacíos ({}) de una lista.
@@ -85,3 +111,74 @@ def filtrar_registros_vacios(datos):
 	if isinstance(datos, list):
 		return [d for d in datos if not (isinstance(d, dict) and len(d) == 0)]
 	return datos
+
+
+_INICIO_MENSAJE_IA = re.compile(r'"mensaje_ia"\s*:\s*"')
+_ESCAPES_JSON = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def extraer_mensaje_parcial(texto: str) -> str | None:
+	"""
+	Extrae el valor (posiblemente incompleto) de `mensaje_ia` de un JSON que aún se está recibiendo.
+
+	Permite mostrar el mensaje de Piki mientras llega por streaming, sin esperar
+	a que el objeto JSON esté completo. Las secuencias de escape cortadas al final
+	del fragmento se ignoran hasta que llegue el resto.
+
+	Examples:
+		>>> extraer_mensaje_parcial('{"mensaje_ia": "Hola, hay 3 env')
+		'Hola, hay 3 env'
+		>>> extraer_mensaje_parcial('{"intencion": "visualizar"') is None
+		True
+	"""
+	coincidencia = _INICIO_MENSAJE_IA.search(texto)
+	if not coincidencia:
+		return None
+
+	partes = []
+	i = coincidencia.end()
+	while i < len(texto):
+		caracter = texto[i]
+		if caracter == '"':
+			break
+		if caracter != '\\':
+			partes.append(caracter)
+			i += 1
+			continue
+		if i + 1 >= len(texto):
+			break
+		siguiente = texto[i + 1]
+		if siguiente == 'u':
+			codigo = texto[i + 2:i + 6]
+			if len(codigo) < 4:
+				break
+			try:
+				partes.append(chr(int(codigo, 16)))
+			except ValueError:
+				pass
+			i += 6
+			continue
+		partes.append(_ESCAPES_JSON.get(siguiente, siguiente))
+		i += 2
+	return ''.join(partes)
+
+
+def interpretar_salida_agente(texto: str) -> dict | None:
+	"""
+	Parsea la salida cruda de Piki buscando el objeto JSON principal.
+
+	Replica lo que hace el nodo "Ordenar y formatear el output de PIKI" del
+	workflow: toma desde la primera `{` hasta la última `}` e intenta parsearlo.
+
+	Returns:
+		dict | None: Objeto con `intencion`, `datos`, `mensaje_ia`, etc., o None si no es válido.
+	"""
+	inicio = texto.find('{')
+	fin = texto.rfind('}')
+	if inicio == -1 or fin < inicio:
+		return None
+	try:
+		parsed = json.loads(texto[inicio:fin + 1])
+	except ValueError:
+		return None
+	return parsed if isinstance(parsed, dict) else None
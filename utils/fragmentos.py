@@ -0,0 +1,101 @@
+"""
+utils.fragmentos
+Consulta de reportes grandes por fragmentos de fechas.
+
+Un reporte sobre un rango largo (ej: un año de envíos fallidos) es una única
+consulta SQL + serialización que puede superar su plazo (`utils.plazos`). Aquí el rango
+se divide en fragmentos que se piden en paralelo (con un máximo de
+`REPORTE_FRAGMENTOS_PARALELOS` a la vez) y se entregan en orden a medida que
+están listos, para escribirlos en el reporte sin esperar al resto. Cada
+fragmento que falla se reintenta por separado.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Callable
+
+from config import REPORTE_FRAGMENTO_DIAS, REPORTE_FRAGMENTOS_PARALELOS, REPORTE_FRAGMENTO_REINTENTOS
+from data_models import SolicitudN8n, RespuestaN8n
+from n8n_client import enviar_consulta
+from utils.planificador import PRIORIDAD_LOTE
+
+
+def dividir_rango(desde: date, hasta: date, dias: int = REPORTE_FRAGMENTO_DIAS) -> list[tuple[date, date]]:
+	"""
+	Divide un rango de fechas (ambos extremos incluidos) en fragmentos consecutivos.
+
+	Examples:
+		>>> dividir_rango(date(2025, 1, 1), date(2025, 1, 10), 4)
+		[(datetime.date(2025, 1, 1), datetime.date(2025, 1, 4)), (datetime.date(2025, 1, 5), datetime.date(2025, 1, 8)), (datetime.date(2025, 1, 9), datetime.date(2025, 1, 10))]
+	"""
+	fragmentos = []
+	inicio = desde
+	while inicio <= hasta:
+		fin = min(inicio + timedelta(days=dias - 1), hasta)
+		fragmentos.append((inicio, fin))
+		inicio = fin + timedelta(days=1)
+	return fragmentos
+
+
+def _consultar_fragmento(solicitud: SolicitudN8n, desde: date, hasta: date, reintentos: int) -> RespuestaN8n:
+	"""Pide un fragmento, reintentando con espera creciente si falla."""
+	req = SolicitudN8n(
+		entrada_chat = solicitud.entrada_chat,
+		id_sesion = solicitud.id_sesion,
+		intencion = solicitud.intencion,
+		parametros = {**solicitud.parametros, "desde": desde.isoformat(), "hasta": hasta.isoformat()},
+		columnar = solicitud.columnar,
+		# Los fragmentos son trabajo por lotes: no deben demorar consultas interactivas
+		prioridad = PRIORIDAD_LOTE,
+	)
+	for intento in range(reintentos + 1):
+		res = enviar_consulta(req)
+		if res.ok:
+			return res
+		if intento < reintentos:
+			time.sleep(2 ** intento)
+	return res
+
+
+def consultar_por_fragmentos(
+	solicitud: SolicitudN8n,
+	fragmentos: list[tuple[date, date]],
+	al_recibir: Callable[[Any], Any],
+	al_avanzar: Callable[[], None] | None = None,
+) -> tuple[bool, str | None]:
+	"""
+	Pide una solicitud por fragmentos de fechas y entrega los datos en orden.
+
+	Los fragmentos se consultan en paralelo, pero `al_recibir` se invoca en el
+	orden de `fragmentos`: cada uno se entrega en cuanto él y los anteriores
+	están listos.
+
+	Args:
+		solicitud: Solicitud base; sus parámetros `desde`/`hasta` se reemplazan
+			por los de cada fragmento.
+		fragmentos: Rangos (desde, hasta) en el orden en que deben entregarse.
+		al_recibir: Recibe los datos de cada fragmento (ej: `EscritorIncremental.agregar`).
+		al_avanzar: Se invoca tras entregar cada fragmento (para mostrar progreso).
+
+	Returns:
+		tuple[bool, str | None]: (True, None) si todos los fragmentos llegaron;
+		(False, mensaje) si alguno falló tras agotar los reintentos.
+	"""
+	with ThreadPoolExecutor(max_workers=REPORTE_FRAGMENTOS_PARALELOS, thread_name_prefix="fragmentos") as pool:
+		futuros = [
+			pool.submit(_consultar_fragmento, solicitud, desde, hasta, REPORTE_FRAGMENTO_REINTENTOS)
+			for desde, hasta in fragmentos
+		]
+		for (desde, hasta), futuro in zip(fragmentos, futuros):
+			res = futuro.result()
+			if not res.ok:
+				for pendiente in futuros:
+					pendiente.cancel()
+				return False, (
+					f"El período {desde.isoformat()} a {hasta.isoformat()} falló tras "
+					f"{REPORTE_FRAGMENTO_REINTENTOS + 1} intentos: {res.mensaje}"
+				)
+			al_recibir(res.datos)
+			if al_avanzar:
+				al_avanzar()
+	return True, None
@@ -0,0 +1,101 @@
+"""
+utils.grabacion
+Grabación opcional del tráfico hacia n8n en formato JSON Lines.
+
+Con `GRABACION_PATH` definido, cada consulta enviada por `n8n_client` agrega
+una línea con el cuerpo enviado, la intención, el estado HTTP, los tamaños y
+los tiempos. La grabación se puede reproducir con
+`python -m demos.reproducir_grabacion` contra cualquier webhook (por ejemplo,
+el servidor simulado de `demos.servidor_simulado`) para estudiar problemas de
+rendimiento con la mezcla real de consultas.
+
+Si se graba en el gateway, el archivo reúne el tráfico de todas las terminales.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from config import GRABACION_PATH
+
+_lock_grabacion = threading.Lock()
+
+
+def grabacion_activa() -> bool:
+	"""True si hay un archivo de grabación configurado."""
+	return bool(GRABACION_PATH)
+
+
+def registrar_intercambio(
+	destino: str,
+	carga: dict,
+	inicio: float,
+	total: float,
+	estado: int | None = None,
+	bytes_respuesta: int = 0,
+	espera: float | None = None,
+	primer_fragmento: float | None = None,
+	error: str | None = None,
+	path: str = GRABACION_PATH,
+) -> None:
+	"""
+	Agrega una consulta a la grabación.
+
+	Los errores de escritura se ignoran: grabar nunca debe hacer fallar una consulta.
+
+	Args:
+		destino (str): "webhook", "streaming" o "gateway".
+		carga (dict): Cuerpo JSON enviado.
+		inicio (float): Momento del envío (epoch, segundos).
+		total (float): Segundos hasta tener la respuesta completa.
+		estado (int | None): Código HTTP, si hubo respuesta.
+		bytes_respuesta (int): Tamaño del cuerpo recibido.
+		espera (float | None): Segundos hasta recibir los encabezados.
+		primer_fragmento (float | None): Segundos hasta el primer fragmento (streaming).
+		error (str | None): Descripción del error, si lo hubo.
+	"""
+	if not path:
+		return
+	registro = {
+		"ts": datetime.fromtimestamp(inicio, timezone.utc).isoformat(timespec="milliseconds"),
+		"t": round(inicio, 6),
+		"destino": destino,
+		"intent": carga.get("intent"),
+		"carga": carga,
+		"bytes_solicitud": len(json.dumps(carga, ensure_ascii=False, default=str).encode("utf-8")),
+		"estado": estado,
+		"ok": error is None,
+		"bytes_respuesta": bytes_respuesta,
+		"espera_s": round(espera, 4) if espera is not None else None,
+		"primer_fragmento_s": round(primer_fragmento, 4) if primer_fragmento is not None else None,
+		"total_s": round(total, 4),
+		"error": error,
+	}
+	linea = json.dumps(registro, ensure_ascii=False, default=str)
+	try:
+		directorio = os.path.dirname(path)
+		if directorio:
+			os.makedirs(directorio, exist_ok=True)
+		with _lock_grabacion, open(path, "a", encoding="utf-8") as archivo:
+			archivo.write(linea + "\n")
+	except OSError:
+		pass
+
+
+def leer_grabacion(path: str) -> list[dict]:
+	"""
+	Lee una grabación y la devuelve ordenada por momento de envío.
+
+	Las líneas vacías o dañadas (por ejemplo, una escritura cortada) se saltean.
+	"""
+	registros = []
+	with open(path, encoding="utf-8") as archivo:
+		for linea in archivo:
+			try:
+				registro = json.loads(linea)
+			except ValueError:
+				continue
+			if isinstance(registro, dict) and isinstance(registro.get("carga"), dict):
+				registros.append(registro)
+	registros.sort(key=lambda r: r.get("t") or 0)
+	return registros
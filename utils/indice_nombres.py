@@ -0,0 +1,140 @@
+"""
+utils.indice_nombres
+Índice de prefijos y trigramas para nombres de localidades y repartidores.
+
+El operador escribe "cordoba", "Juan P" o "Avellanda"; el índice los lleva al
+nombre tal como figura en la base ("Córdoba", "Juan Pérez", "Avellaneda")
+antes de enviar la consulta:
+
+- Prefijos: lista ordenada de claves normalizadas (minúsculas, sin tildes),
+  una por nombre completo y una desde cada palabra, recorrida con búsqueda
+  binaria. "per" encuentra "Juan Pérez".
+- Trigramas: como `pg_trgm`, cada palabra se rellena ("  juan ") y se parte en
+  grupos de tres letras; la similitud es la proporción de trigramas en común.
+  Sirve para el "¿quisiste decir?" cuando hay errores de tipeo.
+
+Ambos se arman una vez por catálogo y se consultan sin recorrer la lista.
+"""
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+# Similitud mínima (0 a 1) para proponer un nombre parecido
+SIMILITUD_MINIMA = 0.3
+
+
+def normalizar_nombre(texto: str) -> str:
+	"""
+	Minúsculas, sin tildes y con un solo espacio entre palabras.
+
+	Examples:
+		>>> normalizar_nombre("  San  Martín ")
+		'san martin'
+	"""
+	sin_tildes = unicodedata.normalize("NFKD", texto.lower())
+	return " ".join("".join(c for c in sin_tildes if not unicodedata.combining(c)).split())
+
+
+def trigramas(texto: str) -> set[str]:
+	"""
+	Trigramas de un texto normalizado, con el mismo relleno que `pg_trgm`.
+
+	Examples:
+		>>> sorted(trigramas("sol"))
+		['  s', ' so', 'ol ', 'sol']
+	"""
+	grupos = set()
+	for palabra in texto.split():
+		relleno = f"  {palabra} "
+		grupos.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+	return grupos
+
+
+class IndiceNombres:
+	"""
+	Nombres canónicos indexados por prefijo y por trigramas.
+
+	El orden de `nombres` se respeta al desempatar: conviene pasarlos de más
+	a menos frecuente.
+
+	Usage:
+		indice = IndiceNombres(["Quilmes", "Bernal", "Avellaneda"])
+		indice.resolver("quilmes")     # "Quilmes"
+		indice.completar("be")         # ["Bernal"]
+		indice.sugerir("Avellanda")    # ["Avellaneda"]
+	"""
+
+	def __init__(self, nombres: list[str]):
+		self.nombres = list(dict.fromkeys(n for n in nombres if n and n.strip()))
+		self._normalizados = [normalizar_nombre(n) for n in self.nombres]
+		self._por_clave: dict[str, int] = {}
+		for posicion, clave in enumerate(self._normalizados):
+			self._por_clave.setdefault(clave, posicion)
+
+		prefijos = []
+		self._trigramas: dict[str, list[int]] = {}
+		self._cantidad_trigramas: list[int] = []
+		for posicion, clave in enumerate(self._normalizados):
+			palabras = clave.split()
+			for inicio in range(len(palabras)):
+				prefijos.append((" ".join(palabras[inicio:]), posicion))
+			grupos = trigramas(clave)
+			self._cantidad_trigramas.append(len(grupos))
+			for grupo in grupos:
+				self._trigramas.setdefault(grupo, []).append(posicion)
+		prefijos.sort()
+		self._claves_prefijo = [clave for clave, _ in prefijos]
+		self._posiciones_prefijo = [posicion for _, posicion in prefijos]
+
+	def __len__(self) -> int:
+		return len(self.nombres)
+
+	def _por_prefijo(self, prefijo: str) -> list[int]:
+		"""Posiciones de los nombres con alguna palabra que empieza con `prefijo`, sin repetir."""
+		encontradas = {}
+		desde = bisect_left(self._claves_prefijo, prefijo)
+		for i in range(desde, len(self._claves_prefijo)):
+			if not self._claves_prefijo[i].startswith(prefijo):
+				break
+			encontradas.setdefault(self._posiciones_prefijo[i], None)
+		return sorted(encontradas)
+
+	def completar(self, prefijo: str, limite: int = 10) -> list[str]:
+		"""Nombres con alguna palabra que empieza con `prefijo` (los que empiezan por él primero)."""
+		clave = normalizar_nombre(prefijo)
+		if not clave:
+			return self.nombres[:limite]
+		posiciones = self._por_prefijo(clave)
+		posiciones.sort(key=lambda p: not self._normalizados[p].startswith(clave))
+		return [self.nombres[p] for p in posiciones[:limite]]
+
+	def sugerir(self, texto: str, limite: int = 5, minimo: float = SIMILITUD_MINIMA) -> list[str]:
+		"""Nombres parecidos a `texto` por trigramas, del más al menos parecido."""
+		grupos = trigramas(normalizar_nombre(texto))
+		if not grupos:
+			return []
+		comunes = Counter()
+		for grupo in grupos:
+			comunes.update(self._trigramas.get(grupo, ()))
+		similitudes = [
+			(en_comun / (len(grupos) + self._cantidad_trigramas[posicion] - en_comun), posicion)
+			for posicion, en_comun in comunes.items()
+		]
+		similitudes = [(s, p) for s, p in similitudes if s >= minimo]
+		similitudes.sort(key=lambda sp: (-sp[0], sp[1]))
+		return [self.nombres[p] for _, p in similitudes[:limite]]
+
+	def resolver(self, texto: str) -> str | None:
+		"""
+		Nombre canónico de `texto`, o None si es desconocido o ambiguo.
+
+		Acepta el nombre sin tildes ni mayúsculas y también un prefijo que
+		corresponde a un único nombre ("Juan P" → "Juan Pérez").
+		"""
+		clave = normalizar_nombre(texto)
+		if not clave:
+			return None
+		if clave in self._por_clave:
+			return self.nombres[self._por_clave[clave]]
+		candidatos = [p for p in self._por_prefijo(clave) if self._normalizados[p].startswith(clave)]
+		return self.nombres[candidatos[0]] if len(candidatos) == 1 else None
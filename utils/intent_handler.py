@@ -107,12 +107,10 @@ def ejecutar_guardado_local_desde_chat(
             directorio=directorio
         )
         
-        if path:
-            # No llamar a mostrar_resultado_reporte porque ya se muestra en generar_reporte
-            return path
-        else:
-            print("❌ No se pudo generar el reporte.")
-            return None
+        # No llamar a mostrar_resultado_reporte porque ya se muestra en generar_reporte.
+        # Si path es None, exportar_reporte_local ya informó el error o que el
+        # reporte se está generando en segundo plano.
+        return path
             
     except Exception as e:
         print(f"❌ Error al guardar el reporte: {e}")
@@ -0,0 +1,91 @@
+"""
+utils.metricas
+Métricas en memoria del cliente (tiempos de espera, latencias, contadores).
+
+Cada métrica es una serie de observaciones identificada por un nombre y unas
+etiquetas (por ejemplo `planificador.espera_s` con `clase="lote"`). Se guardan
+las últimas `_MUESTRAS_POR_SERIE` observaciones para calcular percentiles,
+además del total acumulado desde el inicio.
+
+En el chat, `/metricas` muestra el resumen.
+"""
+import threading
+from collections import deque
+
+# Observaciones recientes que se conservan por serie para los percentiles
+_MUESTRAS_POR_SERIE = 1000
+
+_lock = threading.Lock()
+
+
+class Serie:
+	"""Observaciones de una métrica con un juego de etiquetas."""
+
+	def __init__(self):
+		self.cantidad = 0
+		self.suma = 0.0
+		self.maximo = 0.0
+		self.recientes: deque[float] = deque(maxlen=_MUESTRAS_POR_SERIE)
+
+	def observar(self, valor: float) -> None:
+		self.cantidad += 1
+		self.suma += valor
+		self.maximo = max(self.maximo, valor)
+		self.recientes.append(valor)
+
+	def percentil(self, p: float) -> float:
+		"""Percentil `p` (0 a 1) de las observaciones recientes."""
+		if not self.recientes:
+			return 0.0
+		ordenadas = sorted(self.recientes)
+		return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+_series: dict[tuple[str, tuple[tuple[str, str], ...]], Serie] = {}
+
+
+def observar(nombre: str, valor: float, **etiquetas) -> None:
+	"""
+	Registra una observación.
+
+	Examples:
+		>>> observar("ejemplo.espera_s", 0.25, clase="lote")
+		>>> resumen("ejemplo.")[0]["cantidad"]
+		1
+	"""
+	clave = (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+	with _lock:
+		serie = _series.get(clave)
+		if serie is None:
+			serie = _series[clave] = Serie()
+		serie.observar(valor)
+
+
+def resumen(prefijo: str = "") -> list[dict]:
+	"""
+	Resumen de las series cuyo nombre empieza con `prefijo`.
+
+	Returns:
+		list[dict]: Por serie: nombre, etiquetas, cantidad, media, p50, p90 y máximo.
+	"""
+	with _lock:
+		filas = []
+		for (nombre, etiquetas), serie in sorted(_series.items()):
+			if not nombre.startswith(prefijo):
+				continue
+			filas.append({
+				"nombre": nombre,
+				"etiquetas": dict(etiquetas),
+				"cantidad": serie.cantidad,
+				"media": serie.suma / serie.cantidad if serie.cantidad else 0.0,
+				"p50": serie.percentil(0.5),
+				"p90": serie.percentil(0.9),
+				"maximo": serie.maximo,
+			})
+		return filas
+
+
+def reiniciar() -> None:
+	"""Descarta todas las series (por ejemplo, al empezar una medición)."""
+	with _lock:
+		_series.clear()
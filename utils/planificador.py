@@ -0,0 +1,241 @@
+"""
+utils.planificador
+Planificador de consultas a n8n con prioridades y límites de ritmo.
+
+Las consultas interactivas (el operador esperando una respuesta), las de
+compartir, los lotes (reportes por fragmentos, sincronización de la réplica)
+y las de fondo (tablero en vivo) salen todas hacia el mismo webhook. Sin
+coordinación, un lote grande deja esperando la consulta de un operador y
+agota la cuota de Gemini que usa el agente.
+
+Cada consulta pide un turno antes de salir:
+
+- Los turnos se otorgan por prioridad: interactiva > compartir > lote > fondo.
+- Hay como máximo `PLANIFICADOR_CONCURRENCIA` consultas en vuelo, y
+  `PLANIFICADOR_RESERVA_INTERACTIVA` de esos lugares quedan para las interactivas.
+- `PLANIFICADOR_LIMITES` define cubos de tokens por clase o por intención.
+  "agente" limita todo lo que llega al LLM: los mensajes sin intención y las
+  intenciones que el workflow no resuelve por el ruteo directo
+  (`consulta_personalizada`, `compartir_fallidos`, el chat con streaming...).
+  Una consulta espera a que haya token en todos los cubos que le corresponden.
+- Cada clase (salvo la interactiva) admite `PLANIFICADOR_MAX_EN_ESPERA`
+  consultas esperando; los productores que superan ese número quedan
+  bloqueados hasta que se libere lugar.
+
+La espera de cada turno se registra en `planificador.espera_s` (utils.metricas).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+	PLANIFICADOR_CONCURRENCIA,
+	PLANIFICADOR_RESERVA_INTERACTIVA,
+	PLANIFICADOR_MAX_EN_ESPERA,
+	PLANIFICADOR_LIMITES,
+)
+from utils.metricas import observar
+
+PRIORIDAD_INTERACTIVA = "interactiva"
+PRIORIDAD_COMPARTIR = "compartir"
+PRIORIDAD_LOTE = "lote"
+PRIORIDAD_FONDO = "fondo"
+
+# Orden de atención (menor = antes)
+ORDEN_PRIORIDADES = {
+	PRIORIDAD_INTERACTIVA: 0,
+	PRIORIDAD_COMPARTIR: 1,
+	PRIORIDAD_LOTE: 2,
+	PRIORIDAD_FONDO: 3,
+}
+
+# Clave de cubo para los mensajes que atiende el agente
+CLAVE_AGENTE = "agente"
+
+# Intenciones que el nodo "Ruteo según la intención recibida" resuelve sin
+# pasar por PIKI; cualquier otra (o ninguna) llega al LLM
+INTENCIONES_SIN_AGENTE = frozenset({
+	"sync",
+	"compartir_directo",
+	"compartir_archivo",
+	"reporte_fallidos",
+	"reporte_repartidor_localidad",
+	"sql_directo",
+	"consultar_estado",
+	"resumen_envios",
+	"suscribir_eventos",
+	"paquete",
+	"catalogo_nombres",
+})
+
+
+def usa_agente(intencion: str | None) -> bool:
+	"""True si el workflow responde la intención con el agente (consume cuota de Gemini)."""
+	return intencion not in INTENCIONES_SIN_AGENTE
+
+
+def leer_limites(texto: str) -> dict[str, tuple[float, float]]:
+	"""
+	Interpreta `PLANIFICADOR_LIMITES`: "clave=tasa:capacidad" separados por coma.
+
+	La tasa es en consultas por segundo; la capacidad (ráfaga) es opcional y
+	por defecto 1. Las entradas mal formadas se ignoran.
+
+	Examples:
+		>>> leer_limites("agente=0.25:3, fondo=0.5, mal")
+		{'agente': (0.25, 3.0), 'fondo': (0.5, 1.0)}
+	"""
+	limites = {}
+	for parte in texto.split(","):
+		clave, _, valor = parte.strip().partition("=")
+		tasa, _, capacidad = valor.partition(":")
+		try:
+			tasa_f, capacidad_f = float(tasa), float(capacidad or 1)
+		except ValueError:
+			continue
+		if clave and tasa_f > 0 and capacidad_f >= 1:
+			limites[clave.strip()] = (tasa_f, capacidad_f)
+	return limites
+
+
+class CuboTokens:
+	"""Cubo de tokens: `tasa` por segundo con ráfagas de hasta `capacidad`."""
+
+	def __init__(self, tasa: float, capacidad: float):
+		self.tasa = tasa
+		self.capacidad = capacidad
+		self.tokens = capacidad
+		self._ultimo = time.monotonic()
+
+	def _recargar(self, ahora: float) -> None:
+		self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+		self._ultimo = ahora
+
+	def espera(self, ahora: float) -> float:
+		"""Segundos hasta que haya un token (0 si ya hay)."""
+		self._recargar(ahora)
+		return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.tasa
+
+	def tomar(self, ahora: float) -> None:
+		self._recargar(ahora)
+		self.tokens -= 1
+
+
+class _Turno:
+	__slots__ = ("orden", "secuencia", "clase", "claves", "llegada")
+
+	def __init__(self, secuencia: int, clase: str, claves: list[str]):
+		self.orden = ORDEN_PRIORIDADES.get(clase, ORDEN_PRIORIDADES[PRIORIDAD_FONDO])
+		self.secuencia = secuencia
+		self.clase = clase
+		self.claves = claves
+		self.llegada = time.monotonic()
+
+
+class Planificador:
+	"""Otorga turnos para consultar n8n según prioridad, lugares libres y cubos de tokens."""
+
+	def __init__(
+		self,
+		concurrencia: int = PLANIFICADOR_CONCURRENCIA,
+		reserva_interactiva: int = PLANIFICADOR_RESERVA_INTERACTIVA,
+		max_en_espera: int = PLANIFICADOR_MAX_EN_ESPERA,
+		limites: dict[str, tuple[float, float]] | None = None,
+	):
+		self.concurrencia = max(1, concurrencia)
+		# Las clases no interactivas nunca quedan sin ningún lugar
+		self.lugares_no_interactivos = max(1, self.concurrencia - max(0, reserva_interactiva))
+		self.max_en_espera = max(1, max_en_espera)
+		self._cubos = {clave: CuboTokens(*valor) for clave, valor in (limites or {}).items()}
+		self._cond = threading.Condition()
+		self._esperando: list[_Turno] = []
+		self._secuencia = 0
+		self._en_curso = 0
+		self._en_curso_no_interactivas = 0
+
+	def _hay_lugar(self, turno: _Turno) -> bool:
+		if self._en_curso >= self.concurrencia:
+			return False
+		return turno.clase == PRIORIDAD_INTERACTIVA or self._en_curso_no_interactivas < self.lugares_no_interactivos
+
+	def _siguiente(self, ahora: float) -> tuple[_Turno | None, float | None]:
+		"""
+		Turno que puede salir ahora, o (None, segundos hasta que alguno tenga token).
+
+		Se recorre por prioridad y orden de llegada; un turno sin token no frena
+		a los siguientes que usan otros cubos.
+		"""
+		demora = None
+		for turno in sorted(self._esperando, key=lambda t: (t.orden, t.secuencia)):
+			if not self._hay_lugar(turno):
+				continue
+			espera = max((self._cubos[c].espera(ahora) for c in turno.claves), default=0.0)
+			if espera == 0:
+				return turno, None
+			demora = espera if demora is None else min(demora, espera)
+		return None, demora
+
+	def _en_espera(self, clase: str) -> int:
+		return sum(1 for t in self._esperando if t.clase == clase)
+
+	def _esperar_turno(self, clase: str, intencion: str | None) -> None:
+		with self._cond:
+			# Contrapresión: el productor no encola más de lo que la clase admite
+			while clase != PRIORIDAD_INTERACTIVA and self._en_espera(clase) >= self.max_en_espera:
+				self._cond.wait()
+
+			agente = CLAVE_AGENTE if usa_agente(intencion) else None
+			claves = [c for c in dict.fromkeys((clase, intencion, agente)) if c in self._cubos]
+			self._secuencia += 1
+			turno = _Turno(self._secuencia, clase, claves)
+			self._esperando.append(turno)
+			try:
+				while True:
+					ahora = time.monotonic()
+					elegido, demora = self._siguiente(ahora)
+					if elegido is turno:
+						break
+					self._cond.wait(demora)
+			finally:
+				self._esperando.remove(turno)
+				self._cond.notify_all()
+
+			for clave in claves:
+				self._cubos[clave].tomar(ahora)
+			self._en_curso += 1
+			if clase != PRIORIDAD_INTERACTIVA:
+				self._en_curso_no_interactivas += 1
+		observar("planificador.espera_s", ahora - turno.llegada, clase=clase, intencion=intencion or CLAVE_AGENTE)
+
+	def _liberar(self, clase: str) -> None:
+		with self._cond:
+			self._en_curso -= 1
+			if clase != PRIORIDAD_INTERACTIVA:
+				self._en_curso_no_interactivas -= 1
+			self._cond.notify_all()
+
+	@contextmanager
+	def turno(self, clase: str = PRIORIDAD_INTERACTIVA, intencion: str | None = None):
+		"""
+		Espera un turno para la clase e intención dadas y lo libera al salir.
+
+		Usage:
+			with planificador.turno(PRIORIDAD_LOTE, "reporte_fallidos"):
+				respuesta = _cliente_http.post(...)
+		"""
+		self._esperar_turno(clase, intencion)
+		try:
+			yield
+		finally:
+			self._liberar(clase)
+
+	def estado(self) -> dict:
+		"""Consultas en vuelo y en espera por clase."""
+		with self._cond:
+			return {
+				"en_curso": self._en_curso,
+				"en_espera": {clase: self._en_espera(clase) for clase in ORDEN_PRIORIDADES},
+			}
+
+
+planificador = Planificador(limites=leer_limites(PLANIFICADOR_LIMITES))
@@ -0,0 +1,259 @@
+"""
+utils.plazos
+Plazos de espera (timeouts) por intención, aprendidos de la latencia observada.
+
+Con un único `TIMEOUT` global, una consulta de estado que tarda 2 segundos
+queda colgada dos minutos cuando algo falla, y un reporte grande que tarda
+más de lo habitual se corta aunque n8n siga trabajando. Por eso cada
+intención tiene su propio plazo:
+
+- Se guardan las últimas `_MUESTRAS` duraciones de las consultas exitosas de
+  cada intención en `PLAZOS_PATH`, así el aprendizaje sobrevive a reinicios.
+  El archivo se reescribe como mucho cada `_DEMORA_GUARDADO` segundos, en
+  segundo plano, y una última vez al cerrar la aplicación.
+- Los reportes se aprenden por intención y ancho del rango de fechas
+  ("reporte_fallidos:31d"): un reporte de un día no fija el plazo de uno de
+  un año. Además su plazo nunca baja de `TIMEOUT`.
+- El plazo de lectura es `TIMEOUT_FACTOR` veces el percentil 95, acotado
+  entre `TIMEOUT_MINIMO` y `TIMEOUT_MAXIMO`. Mientras no haya
+  `TIMEOUT_MUESTRAS_MINIMAS` muestras se usa `TIMEOUT`.
+- `TIMEOUTS_POR_INTENCION` fija plazos a mano ("intencion=segundos").
+- El plazo de conexión es `TIMEOUT_CONEXION` para todas.
+
+Una consulta que vence esperando la respuesta (no la conexión: un n8n caído
+no debe alargar los plazos) se registra con la duración del plazo, y cada
+vencimiento seguido multiplica el plazo aprendido por `TIMEOUT_FACTOR` hasta
+`TIMEOUT_MAXIMO`. Así, si una intención se vuelve más lenta que su plazo, el
+plazo crece hasta alcanzarla en lugar de cortar todas las consultas sin
+volver a aprender; la primera consulta exitosa quita el ensanche.
+"""
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from datetime import date
+
+from config import (
+	PLAZOS_PATH,
+	TIMEOUT,
+	TIMEOUT_CONEXION,
+	TIMEOUT_MINIMO,
+	TIMEOUT_MAXIMO,
+	TIMEOUT_FACTOR,
+	TIMEOUT_MUESTRAS_MINIMAS,
+	TIMEOUTS_POR_INTENCION,
+)
+from utils.planificador import CLAVE_AGENTE
+
+# Duraciones recientes que se conservan por intención
+_MUESTRAS = 200
+
+# Segundos entre una consulta registrada y la escritura de PLAZOS_PATH
+_DEMORA_GUARDADO = 30.0
+
+# Intenciones cuya duración depende del rango de fechas pedido
+INTENCIONES_REPORTE = frozenset({"reporte_fallidos", "reporte_repartidor_localidad"})
+
+# Franjas (en días) del rango de fechas de un reporte
+_FRANJAS_DIAS = (1, 7, 31, 92, 366)
+
+ORIGEN_MANUAL = "manual"
+ORIGEN_APRENDIDO = "aprendido"
+ORIGEN_POR_DEFECTO = "por defecto"
+
+
+def leer_plazos(texto: str) -> dict[str, float]:
+	"""
+	Interpreta `TIMEOUTS_POR_INTENCION`: "intencion=segundos" separados por coma.
+
+	Examples:
+		>>> leer_plazos("consultar_estado=15, reporte_fallidos=600, mal")
+		{'consultar_estado': 15.0, 'reporte_fallidos': 600.0}
+	"""
+	plazos = {}
+	for parte in texto.split(","):
+		clave, _, valor = parte.strip().partition("=")
+		try:
+			segundos = float(valor)
+		except ValueError:
+			continue
+		if clave and segundos > 0:
+			plazos[clave.strip()] = segundos
+	return plazos
+
+
+def clave_plazo(intencion: str | None, parametros: dict | None = None) -> str:
+	"""
+	Clave del historial: la intención y, en los reportes, la franja de su rango de fechas.
+
+	Examples:
+		>>> clave_plazo("reporte_fallidos", {"desde": "2024-01-01", "hasta": "2024-01-20"})
+		'reporte_fallidos:31d'
+		>>> clave_plazo("reporte_fallidos", {})
+		'reporte_fallidos:todo'
+		>>> clave_plazo("consultar_estado", {"codigo_envio": "X1"})
+		'consultar_estado'
+	"""
+	intencion = intencion or CLAVE_AGENTE
+	if intencion not in INTENCIONES_REPORTE:
+		return intencion
+	parametros = parametros or {}
+	try:
+		desde = date.fromisoformat(parametros["desde"])
+		hasta = date.fromisoformat(parametros.get("hasta") or date.today().isoformat())
+	except (KeyError, TypeError, ValueError):
+		return f"{intencion}:todo"
+	dias = (hasta - desde).days + 1
+	franja = next((f"{limite}d" for limite in _FRANJAS_DIAS if dias <= limite), "todo")
+	return f"{intencion}:{franja}"
+
+
+_manuales = leer_plazos(TIMEOUTS_POR_INTENCION)
+_historial: dict[str, deque[float]] | None = None
+_lock = threading.Lock()
+_guardado_pendiente: threading.Timer | None = None
+# Vencimientos seguidos por clave del historial (se reinicia con cada éxito)
+_vencimientos: dict[str, int] = {}
+
+
+def _cargar() -> dict[str, deque[float]]:
+	"""Historial de duraciones (se lee de PLAZOS_PATH la primera vez)."""
+	global _historial
+	if _historial is None:
+		try:
+			with open(PLAZOS_PATH, encoding="utf-8") as archivo:
+				guardado = json.load(archivo)
+		except (OSError, ValueError):
+			guardado = {}
+		_historial = {
+			intencion: deque((float(s) for s in muestras), maxlen=_MUESTRAS)
+			for intencion, muestras in guardado.items()
+			if isinstance(muestras, list)
+		}
+	return _historial
+
+
+def _guardar() -> None:
+	"""Escribe el historial en PLAZOS_PATH (fuera de `_lock`, sobre una copia)."""
+	global _guardado_pendiente
+	with _lock:
+		_guardado_pendiente = None
+		if _historial is None:
+			return
+		copia = {i: [round(s, 3) for s in m] for i, m in _historial.items()}
+	directorio = os.path.dirname(PLAZOS_PATH)
+	try:
+		if directorio:
+			os.makedirs(directorio, exist_ok=True)
+		with open(PLAZOS_PATH, "w", encoding="utf-8") as archivo:
+			json.dump(copia, archivo)
+	except OSError:
+		# Sin disco se sigue aprendiendo en memoria
+		pass
+
+
+def _programar_guardado() -> None:
+	"""Agenda una escritura en `_DEMORA_GUARDADO` segundos si no hay una pendiente; requiere `_lock`."""
+	global _guardado_pendiente
+	if _guardado_pendiente is None:
+		_guardado_pendiente = threading.Timer(_DEMORA_GUARDADO, _guardar)
+		_guardado_pendiente.daemon = True
+		_guardado_pendiente.start()
+
+
+def _guardar_al_salir() -> None:
+	if _guardado_pendiente is not None:
+		_guardado_pendiente.cancel()
+		_guardar()
+
+
+atexit.register(_guardar_al_salir)
+
+
+def registrar_latencia(intencion: str | None, segundos: float, parametros: dict | None = None) -> None:
+	"""Agrega la duración de una consulta exitosa al historial de su intención (y franja)."""
+	with _lock:
+		clave = clave_plazo(intencion, parametros)
+		_cargar().setdefault(clave, deque(maxlen=_MUESTRAS)).append(segundos)
+		_vencimientos.pop(clave, None)
+		_programar_guardado()
+
+
+def registrar_vencimiento(intencion: str | None, plazo: float, parametros: dict | None = None) -> None:
+	"""
+	Registra una consulta que venció esperando la respuesta.
+
+	Cuenta como una muestra de `plazo` segundos (tardó al menos eso) y ensancha
+	el plazo aprendido hasta la próxima consulta exitosa.
+
+	Usage:
+		except requests.ReadTimeout:
+			registrar_vencimiento(solicitud.intencion, plazo[1], solicitud.parametros)
+	"""
+	with _lock:
+		clave = clave_plazo(intencion, parametros)
+		_cargar().setdefault(clave, deque(maxlen=_MUESTRAS)).append(plazo)
+		_vencimientos[clave] = _vencimientos.get(clave, 0) + 1
+		_programar_guardado()
+
+
+def _percentil(muestras: deque[float], p: float) -> float:
+	ordenadas = sorted(muestras)
+	return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+def _calcular(clave: str) -> tuple[float, str, deque[float]]:
+	"""(plazo de lectura, origen, muestras) de una clave del historial; requiere `_lock`."""
+	intencion = clave.partition(":")[0]
+	muestras = _cargar().get(clave, deque())
+	if intencion in _manuales:
+		return _manuales[intencion], ORIGEN_MANUAL, muestras
+	if len(muestras) < TIMEOUT_MUESTRAS_MINIMAS:
+		return TIMEOUT, ORIGEN_POR_DEFECTO, muestras
+	lectura = _percentil(muestras, 0.95) * TIMEOUT_FACTOR ** (1 + _vencimientos.get(clave, 0))
+	# Un reporte puede tardar mucho más que los que se vieron: nunca menos que TIMEOUT
+	minimo = TIMEOUT if intencion in INTENCIONES_REPORTE else TIMEOUT_MINIMO
+	return min(max(TIMEOUT_MAXIMO, minimo), max(minimo, lectura)), ORIGEN_APRENDIDO, muestras
+
+
+def plazo_para(intencion: str | None, parametros: dict | None = None) -> tuple[float, float]:
+	"""
+	Plazos (conexión, lectura) en segundos para una consulta, listos para `requests`.
+
+	Usage:
+		_cliente_http.post(url, json=carga, timeout=plazo_para(solicitud.intencion, solicitud.parametros))
+	"""
+	with _lock:
+		lectura, _, _ = _calcular(clave_plazo(intencion, parametros))
+	return TIMEOUT_CONEXION, lectura
+
+
+def describir_espera(intencion: str | None, parametros: dict | None = None) -> str | None:
+	"""Texto con la espera habitual de la intención ("suele tardar ~3 s"), o None si no se conoce."""
+	with _lock:
+		muestras = _cargar().get(clave_plazo(intencion, parametros))
+		if not muestras or len(muestras) < TIMEOUT_MUESTRAS_MINIMAS:
+			return None
+		mediana = _percentil(muestras, 0.5)
+	if mediana < 1:
+		return "suele tardar menos de 1 s"
+	return f"suele tardar ~{mediana:.0f} s"
+
+
+def resumen_plazos() -> list[dict]:
+	"""Por intención: muestras, p50, p95, plazo de lectura vigente y su origen."""
+	with _lock:
+		intenciones = sorted(set(_cargar()) | set(_manuales))
+		filas = []
+		for intencion in intenciones:
+			lectura, origen, muestras = _calcular(intencion)
+			filas.append({
+				"intencion": intencion,
+				"muestras": len(muestras),
+				"p50": _percentil(muestras, 0.5) if muestras else None,
+				"p95": _percentil(muestras, 0.95) if muestras else None,
+				"plazo": lectura,
+				"origen": origen,
+			})
+		return filas
@@ -0,0 +1,360 @@
+"""
+utils.router_local
+Ruteo local de los mensajes del chat, antes de enviarlos al agente.
+
+Muchos mensajes del chat son pedidos que ya tienen un camino estructurado:
+"estado de ABC123", "reporte de fallidos", "envíos del repartidor Juan Pérez".
+Mandarlos a Piki cuesta una vuelta completa por el LLM; acá se reconocen con
+expresiones compiladas y un árbol de palabras clave (trie) y se resuelven con
+las intenciones estructuradas del workflow o con la réplica local.
+
+Solo se rutea lo que se entiende por completo. Ante cualquier duda (preguntas
+abiertas, agregaciones, fechas relativas) el mensaje sigue yendo al agente.
+"""
+import re
+import unicodedata
+from datetime import date
+
+INTENCION_ESTADO = "consultar_estado"
+INTENCION_FALLIDOS = "reporte_fallidos"
+INTENCION_REPARTO = "reporte_repartidor_localidad"
+
+MAX_CODIGOS = 10
+
+# Un código de envío tiene letras y dígitos (ABC123, ENV00000042); exigir ambos
+# evita tomar como código palabras sueltas o números (fechas, cantidades).
+_CODIGO = re.compile(r"\b(?=[A-Za-z]*\d)(?=\d*[A-Za-z])[A-Za-z0-9]{4,20}\b")
+_FECHA = re.compile(r"\b(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})/(\d{1,2})/(\d{4}))\b")
+_PALABRA = re.compile(r"\w+|,", re.UNICODE)
+
+# Categorías del árbol de palabras clave
+REPORTE = "reporte"          # pide un listado
+ESTADO = "estado"            # pregunta por el estado de un envío
+FILTRO_ESTADO = "filtro"     # estado de envío usado como filtro (valor = estado canónico)
+REPARTIDOR = "repartidor"
+LOCALIDAD = "localidad"
+ABIERTA = "abierta"          # pregunta que necesita al agente
+RELATIVA = "relativa"        # fecha relativa que el ruteo local no interpreta
+
+_PALABRAS_CLAVE: dict[str, tuple[str, ...]] = {
+	REPORTE: (
+		"reporte", "reportes", "informe", "listado", "lista", "listar", "mostrar", "mostrame",
+		"muestrame", "ver", "dame", "traeme", "pasame", "envios", "envio", "entregas", "paquetes", "pedidos",
+	),
+	ESTADO: (
+		"estado", "estado del envio", "donde esta", "donde anda", "rastrear", "rastreo",
+		"seguimiento", "tracking", "que paso con", "como viene", "info", "codigo",
+	),
+	REPARTIDOR: ("repartidor", "repartidora", "repartidores", "chofer", "choferes"),
+	LOCALIDAD: ("localidad", "localidades", "ciudad", "ciudades", "zona"),
+	ABIERTA: (
+		"cuantos", "cuantas", "cuanto", "cual", "cuales", "quien", "quienes", "por que", "porque",
+		"cuando", "promedio", "porcentaje", "total", "totales", "comparar", "compara", "ranking",
+		"mejor", "peor", "mas", "menos", "tendencia", "explica", "explicame", "resumen", "resumi",
+		"agrupado", "agrupados", "por dia", "por mes", "graficar", "grafico", "compartir", "drive",
+		"enviar por", "mail", "correo", "guardar", "descargar",
+	),
+	RELATIVA: (
+		"hoy", "ayer", "manana", "semana", "mes", "meses", "ano", "anio", "dias", "ultimo", "ultimos",
+		"ultima", "ultimas", "pasado", "pasada", "reciente", "recientes", "enero", "febrero", "marzo",
+		"abril", "mayo", "junio", "julio", "agosto", "septiembre", "setiembre", "octubre", "noviembre",
+		"diciembre",
+	),
+}
+
+# Estados de envío tal como están en la base (el workflow compara sin mayúsculas)
+_ESTADOS: dict[str, tuple[str, ...]] = {
+	"Fallido": ("fallido", "fallidos", "fallida", "fallidas", "no entregado", "no entregados"),
+	"Entregado": ("entregado", "entregados", "entregada", "entregadas"),
+	"En tránsito": ("en transito", "transito"),
+	"En distribución": ("en distribucion", "en reparto", "en camino"),
+	"En preparación": ("en preparacion", "preparacion", "pendiente", "pendientes"),
+}
+
+# Conectores que se saltean entre la palabra clave y el nombre ("localidad de
+# Quilmes"); los de _CONECTORES_EN_NOMBRE también pueden formar parte de un nombre
+# propio ("Lomas de Zamora", "Juan de la Fuente")
+_CONECTORES = {"de", "del", "la", "las", "los", "el", "en", "a", "para"}
+_CONECTORES_EN_NOMBRE = {"de", "del", "la", "las", "los", "el"}
+_SEPARADORES = {",", "y", "e"}
+_FIN_DE_NOMBRE = {"desde", "hasta", "entre", "con", "que", "sin", "por", "segun"}
+
+# Palabras que indican el papel de una fecha en un rango ("del 01/01 al 31/01")
+_ARTICULOS = {"el", "la"}
+_PARES_DE_FECHAS = {
+	("desde", "hasta"), ("desde", "al"), ("desde", "a"),
+	("del", "al"), ("del", "hasta"), ("de", "a"), ("entre", "y"),
+}
+
+# Palabras que no cambian el pedido ("por favor, dame todos los envíos desde ...")
+_RELLENO = _CONECTORES | _SEPARADORES | {
+	"desde", "hasta", "entre", "al", "me", "mis", "todos", "todas", "quiero", "necesito", "podes",
+	"podrias", "hola", "piki", "por", "favor", "porfa", "gracias", "sobre", "un", "una", "actual",
+}
+
+
+def _normalizar(texto: str) -> str:
+	"""Minúsculas y sin tildes, para comparar palabras."""
+	sin_tildes = unicodedata.normalize("NFKD", texto.lower())
+	return "".join(c for c in sin_tildes if not unicodedata.combining(c))
+
+
+class ArbolPalabras:
+	"""
+	Trie de frases indexado por palabra.
+
+	Cada frase ("donde esta", "en transito") se guarda como una secuencia de
+	palabras normalizadas. `buscar` recorre el mensaje una sola vez y en cada
+	posición toma la frase más larga que coincide.
+	"""
+
+	def __init__(self):
+		self._raiz: dict = {}
+
+	def agregar(self, frase: str, categoria: str, valor: str | None = None) -> None:
+		nodo = self._raiz
+		for palabra in _normalizar(frase).split():
+			nodo = nodo.setdefault(palabra, {})
+		nodo[None] = (categoria, valor)
+
+	def buscar(self, palabras: list[str]) -> list[tuple[int, int, str, str | None]]:
+		"""
+		Devuelve las coincidencias como (inicio, fin, categoría, valor), sin solaparse.
+		"""
+		coincidencias = []
+		i = 0
+		while i < len(palabras):
+			nodo = self._raiz
+			mejor = None
+			j = i
+			while j < len(palabras) and palabras[j] in nodo:
+				nodo = nodo[palabras[j]]
+				j += 1
+				if None in nodo:
+					mejor = (i, j) + nodo[None]
+			if mejor:
+				coincidencias.append(mejor)
+				i = mejor[1]
+			else:
+				i += 1
+		return coincidencias
+
+
+def _construir_arbol() -> ArbolPalabras:
+	arbol = ArbolPalabras()
+	for categoria, frases in _PALABRAS_CLAVE.items():
+		for frase in frases:
+			arbol.agregar(frase, categoria)
+	for estado, frases in _ESTADOS.items():
+		for frase in frases:
+			arbol.agregar(frase, FILTRO_ESTADO, estado)
+	return arbol
+
+
+_ARBOL = _construir_arbol()
+
+
+def _palabra_previa(texto: str) -> str:
+	"""Última palabra normalizada de `texto`, salteando artículos ("hasta el" → "hasta")."""
+	palabras = [_normalizar(p) for p in _PALABRA.findall(texto)]
+	while palabras and palabras[-1] in _ARTICULOS:
+		palabras.pop()
+	return palabras[-1] if palabras else ""
+
+
+def _fechas(texto: str) -> dict[str, str] | None:
+	"""
+	Fechas explícitas del mensaje en formato ISO, según la palabra que las precede.
+
+	Una fecha sola necesita "desde" o "hasta"; dos fechas, un par como
+	"desde … hasta", "del … al" o "entre … y".
+
+	Examples:
+		>>> _fechas("fallidos hasta el 31/01/2025")
+		{'hasta': '2025-01-31'}
+		>>> _fechas("entre 2025-01-01 y 2025-01-31")
+		{'desde': '2025-01-01', 'hasta': '2025-01-31'}
+		>>> _fechas("fallidos del 2025-01-01") is None
+		True
+
+	Returns:
+		dict[str, str] | None: {"desde": ..., "hasta": ...} con las que haya
+		(vacío si no hay fechas), o None si alguna no es válida o no se sabe
+		si es el comienzo o el final del rango.
+	"""
+	encontradas = []
+	for coincidencia in _FECHA.finditer(texto):
+		anio, mes, dia, dia2, mes2, anio2 = coincidencia.groups()
+		try:
+			if anio:
+				fecha = date(int(anio), int(mes), int(dia)).isoformat()
+			else:
+				fecha = date(int(anio2), int(mes2), int(dia2)).isoformat()
+		except ValueError:
+			return None
+		encontradas.append((_palabra_previa(texto[:coincidencia.start()]), fecha))
+
+	if not encontradas:
+		return {}
+	if len(encontradas) == 1:
+		previa, fecha = encontradas[0]
+		return {previa: fecha} if previa in ("desde", "hasta") else None
+	if len(encontradas) == 2:
+		(previa_desde, desde), (previa_hasta, hasta) = encontradas
+		if (previa_desde, previa_hasta) in _PARES_DE_FECHAS and desde <= hasta:
+			return {"desde": desde, "hasta": hasta}
+	return None
+
+
+def _nombres_desde(
+	tokens: list[str],
+	normalizados: list[str],
+	inicio: int,
+	ocupadas: set[int],
+) -> tuple[list[str], set[int]]:
+	"""
+	Extrae los nombres que siguen a una palabra clave ("repartidor Juan Pérez y Ana").
+
+	Los conectores iniciales se saltean salvo que empiecen con mayúscula ("La
+	Plata"); dentro de un nombre solo se conservan si les sigue una palabra con
+	mayúscula ("Lomas de Zamora"). Las comas, "y" y "e" separan nombres;
+	cualquier otra palabra clave, fecha o preposición termina la lista.
+
+	Returns:
+		tuple[list[str], set[int]]: Nombres encontrados y posiciones que ocupan.
+	"""
+	nombres: list[str] = []
+	usadas: set[int] = set()
+	actual: list[str] = []
+	i = inicio
+	while i < len(tokens) and normalizados[i] in _CONECTORES and i not in ocupadas and not tokens[i][:1].isupper():
+		i += 1
+	while i < len(tokens):
+		palabra = normalizados[i]
+		if i in ocupadas or palabra in _FIN_DE_NOMBRE or palabra.isdigit():
+			break
+		if palabra in _SEPARADORES:
+			if actual:
+				nombres.append(" ".join(actual))
+				actual = []
+		elif palabra in _CONECTORES and not tokens[i][:1].isupper():
+			siguiente = i + 1
+			while siguiente < len(tokens) and normalizados[siguiente] in _CONECTORES_EN_NOMBRE:
+				siguiente += 1
+			if (
+				not actual
+				or palabra not in _CONECTORES_EN_NOMBRE
+				or siguiente >= len(tokens)
+				or siguiente in ocupadas
+				or not tokens[siguiente][:1].isupper()
+			):
+				break
+			actual.extend(tokens[i:siguiente])
+			usadas.update(range(i, siguiente))
+			i = siguiente
+			continue
+		else:
+			actual.append(tokens[i])
+		usadas.add(i)
+		i += 1
+	if actual:
+		nombres.append(" ".join(actual))
+	return nombres, usadas
+
+
+def rutear_mensaje(texto: str) -> tuple[str, dict] | None:
+	"""
+	Decide si un mensaje del chat puede resolverse sin el agente.
+
+	Examples:
+		>>> rutear_mensaje("estado de ABC123")
+		('consultar_estado', {'codigo': ['ABC123']})
+		>>> rutear_mensaje("reporte de fallidos desde 2025-01-01")
+		('reporte_fallidos', {'desde': '2025-01-01'})
+		>>> rutear_mensaje("reporte de fallidos hasta 2025-02-01")
+		('reporte_fallidos', {'hasta': '2025-02-01'})
+		>>> rutear_mensaje("reporte de fallidos del 2025-02-01") is None
+		True
+		>>> rutear_mensaje("envíos del repartidor Juan Pérez en Lomas de Zamora")
+		('reporte_repartidor_localidad', {'repartidor': ['Juan Pérez'], 'localidad': ['Lomas de Zamora']})
+		>>> rutear_mensaje("¿cuántos envíos fallaron en Quilmes?") is None
+		True
+
+	Returns:
+		tuple[str, dict] | None: (intención estructurada, parámetros), o None si
+		el mensaje debe ir al agente.
+	"""
+	texto = texto.strip()
+	if not texto:
+		return None
+
+	fechas = _fechas(texto)
+	sin_fechas = _FECHA.sub(" ", texto)
+	codigos = list(dict.fromkeys(c.upper() for c in _CODIGO.findall(sin_fechas)))
+	tokens = _PALABRA.findall(sin_fechas)
+	normalizados = [_normalizar(t) for t in tokens]
+	coincidencias = _ARBOL.buscar(normalizados)
+	categorias = {categoria for _, _, categoria, _ in coincidencias}
+
+	if fechas is None or ABIERTA in categorias or "?" in texto and not codigos:
+		return None
+
+	# Estado de uno o más envíos: el mensaje nombra códigos y, a lo sumo, pide su estado
+	if codigos:
+		if len(codigos) > MAX_CODIGOS or categorias - {ESTADO, REPORTE} or fechas:
+			return None
+		palabras_en_codigos = {_normalizar(c) for c in codigos}
+		sueltas = [
+			p for i, p in enumerate(normalizados)
+			if p not in palabras_en_codigos and p not in _RELLENO
+			and not any(inicio <= i < fin for inicio, fin, _, _ in coincidencias)
+		]
+		# Palabras que no se reconocen ("por qué se demoró...") son una pregunta abierta
+		if sueltas:
+			return None
+		return INTENCION_ESTADO, {"codigo": codigos}
+
+	if RELATIVA in categorias or not categorias & {REPORTE, FILTRO_ESTADO, REPARTIDOR, LOCALIDAD}:
+		return None
+
+	ocupadas = {i for inicio, fin, _, _ in coincidencias for i in range(inicio, fin)}
+	repartidores: list[str] = []
+	localidades: list[str] = []
+	estados: list[str] = []
+	for inicio, fin, categoria, valor in coincidencias:
+		if categoria == FILTRO_ESTADO and valor not in estados:
+			estados.append(valor)
+		elif categoria in (REPARTIDOR, LOCALIDAD):
+			nombres, usadas = _nombres_desde(tokens, normalizados, fin, ocupadas)
+			(repartidores if categoria == REPARTIDOR else localidades).extend(nombres)
+			ocupadas |= usadas
+
+	# "en Quilmes": un nombre propio después de "en" se toma como localidad
+	for i, palabra in enumerate(normalizados[:-1]):
+		if palabra == "en" and i not in ocupadas and i + 1 not in ocupadas and tokens[i + 1][:1].isupper():
+			nombres, usadas = _nombres_desde(tokens, normalizados, i + 1, ocupadas)
+			localidades.extend(nombres)
+			ocupadas |= usadas
+
+	# "del repartidor" sin nombre, o palabras que no se entendieron: mejor el agente
+	sueltas = [
+		p for i, p in enumerate(normalizados)
+		if i not in ocupadas and p not in _RELLENO
+	]
+	if sueltas or (REPARTIDOR in categorias and not repartidores) or (LOCALIDAD in categorias and not localidades):
+		return None
+
+	parametros: dict = dict(fechas)
+
+	if not repartidores and not localidades and estados == ["Fallido"]:
+		return INTENCION_FALLIDOS, parametros
+	if not repartidores and not localidades and not estados:
+		return None
+
+	if estados:
+		parametros["estados"] = estados
+	if repartidores:
+		parametros["repartidor"] = repartidores
+	if localidades:
+		parametros["localidad"] = localidades
+	return INTENCION_REPARTO, parametros
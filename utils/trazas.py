@@ -0,0 +1,247 @@
+"""
+utils.trazas
+Trazas de punta a punta de las consultas a n8n, en formato OpenTelemetry.
+
+Cada `SolicitudN8n` lleva un ID de traza (`id_traza`, 32 caracteres hex) que
+viaja a n8n en el encabezado W3C `traceparent` y en el cuerpo (`traceId`). Los
+nodos "Respond to Webhook" del workflow lo devuelven en `X-Trace-Id`, junto
+con el número de ejecución (`X-N8n-Execution-Id`); así una consulta lenta del
+cliente se ubica en el historial de ejecuciones de n8n.
+
+En el cliente, `span()` mide cada fase: turno en el planificador, consulta
+HTTP, decodificación, normalización, vista previa y escritura del reporte. Los
+spans terminados se exportan como JSON de OTLP (`resourceSpans`) a
+`TRAZAS_PATH` (una línea por lote) y/o a un colector OTLP/HTTP en
+`TRAZAS_URL`. Sin ninguno de los dos los IDs se propagan igual, pero solo se
+conservan en memoria los spans recientes (`/traza` en el chat).
+
+Los spans que empiezan fuera de una consulta (por ejemplo, al escribir el
+reporte con los datos recibidos) se asocian a la última traza del mismo hilo.
+"""
+import atexit
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+
+from config import TRAZAS_PATH, TRAZAS_URL, TRAZAS_SERVICIO
+
+# Tipos de span de OpenTelemetry (SpanKind)
+TIPO_INTERNO = 1
+TIPO_CLIENTE = 3
+
+# Segundos entre exportaciones y spans que se acumulan como máximo si el destino
+# falla (los lotes que no se pudieron exportar se reintentan en la próxima vuelta)
+_INTERVALO_EXPORTACION = 2.0
+_MAX_PENDIENTES = 5000
+
+# Spans recientes que se conservan para `/traza`
+_RECIENTES = 200
+
+
+class Span:
+	"""Una fase medida de una traza."""
+
+	__slots__ = ("nombre", "id_traza", "id_span", "id_padre", "tipo", "inicio_ns", "fin_ns", "atributos", "error")
+
+	def __init__(self, nombre: str, id_traza: str, id_padre: str | None, tipo: int, atributos: dict):
+		self.nombre = nombre
+		self.id_traza = id_traza
+		self.id_span = secrets.token_hex(8)
+		self.id_padre = id_padre
+		self.tipo = tipo
+		self.inicio_ns = time.time_ns()
+		self.fin_ns: int | None = None
+		self.atributos = {k: v for k, v in atributos.items() if v is not None}
+		self.error: str | None = None
+
+	def atributo(self, clave: str, valor) -> None:
+		"""Agrega un atributo (los valores None se ignoran)."""
+		if valor is not None:
+			self.atributos[clave] = valor
+
+	@property
+	def duracion_s(self) -> float:
+		return ((self.fin_ns or time.time_ns()) - self.inicio_ns) / 1e9
+
+	def como_otlp(self) -> dict:
+		span = {
+			"traceId": self.id_traza,
+			"spanId": self.id_span,
+			"name": self.nombre,
+			"kind": self.tipo,
+			"startTimeUnixNano": str(self.inicio_ns),
+			"endTimeUnixNano": str(self.fin_ns or self.inicio_ns),
+			"attributes": _atributos_otlp(self.atributos),
+			# 1 = OK, 2 = ERROR
+			"status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+		}
+		if self.id_padre:
+			span["parentSpanId"] = self.id_padre
+		return span
+
+
+def _atributos_otlp(atributos: dict) -> list[dict]:
+	"""Atributos en el formato `KeyValue` de OTLP/JSON."""
+	convertidos = []
+	for clave, valor in atributos.items():
+		if isinstance(valor, bool):
+			convertido = {"boolValue": valor}
+		elif isinstance(valor, int):
+			convertido = {"intValue": str(valor)}
+		elif isinstance(valor, float):
+			convertido = {"doubleValue": valor}
+		else:
+			convertido = {"stringValue": str(valor)}
+		convertidos.append({"key": clave, "value": convertido})
+	return convertidos
+
+
+_span_actual: ContextVar[Span | None] = ContextVar("span_actual", default=None)
+_ultima = threading.local()
+_recientes: deque[Span] = deque(maxlen=_RECIENTES)
+_pendientes: list[Span] = []
+_lock = threading.Lock()
+_exportador: threading.Thread | None = None
+
+
+def nuevo_id_traza() -> str:
+	"""ID de traza W3C: 16 bytes aleatorios en hexadecimal."""
+	return secrets.token_hex(16)
+
+
+def exportacion_activa() -> bool:
+	return bool(TRAZAS_PATH or TRAZAS_URL)
+
+
+def traceparent() -> str | None:
+	"""Encabezado W3C `traceparent` del span en curso (None si no hay ninguno)."""
+	actual = _span_actual.get()
+	if actual is None:
+		return None
+	return f"00-{actual.id_traza}-{actual.id_span}-01"
+
+
+@contextmanager
+def span(nombre: str, id_traza: str | None = None, tipo: int = TIPO_INTERNO, **atributos):
+	"""
+	Mide una fase como span de la traza indicada.
+
+	Sin `id_traza`, el span se agrega a la traza del span en curso o, si no
+	hay ninguno, a la última traza usada en este hilo.
+
+	Usage:
+		with span("n8n.consulta", solicitud.id_traza, intencion="reporte_fallidos") as actual:
+			...
+			actual.atributo("n8n.execution_id", id_ejecucion)
+	"""
+	padre = _span_actual.get()
+	if id_traza is None:
+		id_traza = padre.id_traza if padre else getattr(_ultima, "id_traza", None) or nuevo_id_traza()
+	id_padre = padre.id_span if padre is not None and padre.id_traza == id_traza else None
+
+	actual = Span(nombre, id_traza, id_padre, tipo, atributos)
+	_ultima.id_traza = id_traza
+	token = _span_actual.set(actual)
+	try:
+		yield actual
+	except BaseException as error:
+		actual.error = f"{type(error).__name__}: {error}"
+		raise
+	finally:
+		actual.fin_ns = time.time_ns()
+		_span_actual.reset(token)
+		_terminar(actual)
+
+
+def _terminar(actual: Span) -> None:
+	with _lock:
+		_recientes.append(actual)
+		if not exportacion_activa():
+			return
+		if len(_pendientes) < _MAX_PENDIENTES:
+			_pendientes.append(actual)
+		_iniciar_exportador()
+
+
+def spans_de_traza(id_traza: str) -> list[Span]:
+	"""Spans recientes de una traza, en orden de inicio."""
+	with _lock:
+		return sorted((s for s in _recientes if s.id_traza == id_traza), key=lambda s: s.inicio_ns)
+
+
+def ultima_traza() -> str | None:
+	"""ID de la última traza que terminó un span en esta terminal."""
+	with _lock:
+		return _recientes[-1].id_traza if _recientes else None
+
+
+# ── Exportación ───────────────────────────────────────────────────────────
+
+def _iniciar_exportador() -> None:
+	"""Arranca (una sola vez) el hilo que exporta los spans pendientes."""
+	global _exportador
+	if _exportador is not None:
+		return
+	_exportador = threading.Thread(target=_exportar_periodicamente, name="trazas", daemon=True)
+	_exportador.start()
+	atexit.register(exportar_pendientes)
+
+
+def _exportar_periodicamente() -> None:
+	while True:
+		time.sleep(_INTERVALO_EXPORTACION)
+		exportar_pendientes()
+
+
+def exportar_pendientes() -> None:
+	"""Envía los spans terminados al archivo y/o colector configurados."""
+	with _lock:
+		if not _pendientes:
+			return
+		lote = list(_pendientes)
+		_pendientes.clear()
+
+	documento = {
+		"resourceSpans": [{
+			"resource": {"attributes": _atributos_otlp({"service.name": TRAZAS_SERVICIO})},
+			"scopeSpans": [{"scope": {"name": "utils.trazas"}, "spans": [s.como_otlp() for s in lote]}],
+		}]
+	}
+	exportado = True
+	if TRAZAS_PATH:
+		directorio = os.path.dirname(TRAZAS_PATH)
+		try:
+			if directorio:
+				os.makedirs(directorio, exist_ok=True)
+			with open(TRAZAS_PATH, "a", encoding="utf-8") as archivo:
+				archivo.write(json.dumps(documento, ensure_ascii=False) + "\n")
+		except OSError:
+			exportado = False
+	if TRAZAS_URL:
+		try:
+			if not requests.post(TRAZAS_URL, json=documento, timeout=5).ok:
+				exportado = False
+		except requests.RequestException:
+			# Un colector caído no debe afectar las consultas
+			exportado = False
+	if not exportado:
+		_devolver(lote)
+
+
+def _devolver(lote: list[Span]) -> None:
+	"""
+	Vuelve a encolar un lote que no se pudo exportar, delante de los spans
+	que terminaron mientras tanto y sin pasar de `_MAX_PENDIENTES` (como en
+	`_terminar`, se descartan los más nuevos). Si hay dos destinos y falló
+	uno solo, el otro recibe el lote de nuevo en el próximo intento.
+	"""
+	with _lock:
+		_pendientes[:0] = lote
+		del _pendientes[_MAX_PENDIENTES:]